@@ -12,7 +12,8 @@ try:
 except ImportError:
     from django.db.models.loading import get_model
 
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from passage.metrics import get_metrics
 
 try:
     model = get_model(settings.HEALTH_MODEL)
@@ -49,3 +50,8 @@ def check_data(request):
         )
 
     return HttpResponse("Data OK", content_type="text/plain", status=200)
+
+
+def metrics(request):
+    # the counters of the current (worker) process
+    return JsonResponse(get_metrics())
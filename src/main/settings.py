@@ -35,6 +35,101 @@ INTERNAL_IPS = ("127.0.0.1", "0.0.0.0")
 # The token that is allowed to post data to protected endpoints
 AUTHORIZATION_TOKEN = os.environ['AUTHORIZATION_TOKEN']
 
+# The maximum number of passages that can be posted in a single bulk request
+PASSAGE_BULK_MAX_SIZE = int(os.getenv('PASSAGE_BULK_MAX_SIZE', 10000))
+# How bulk requests are written: 'insert' (multi-row INSERT) or 'copy' (COPY)
+PASSAGE_BULK_WRITER = os.getenv('PASSAGE_BULK_WRITER', 'insert')
+
+# Opt-in write-behind buffer: single passage posts are written in batches of
+# at most PASSAGE_BUFFER_MAX_SIZE rows, or after PASSAGE_BUFFER_MAX_DELAY_MS.
+# PASSAGE_BUFFER_ACK determines when a post is acknowledged: 'flush' (after the
+# passage is written, duplicates result in a 409) or 'enqueue' (immediately,
+# duplicates are only logged). A failed write is retried PASSAGE_BUFFER_RETRIES
+# times, after which the passages are lost when they were acknowledged on
+# enqueue: they are logged and counted in the passage_buffer_failed metric.
+PASSAGE_BUFFER_ENABLED = os.getenv('PASSAGE_BUFFER_ENABLED', False) == 'true'
+PASSAGE_BUFFER_MAX_SIZE = int(os.getenv('PASSAGE_BUFFER_MAX_SIZE', 100))
+PASSAGE_BUFFER_MAX_DELAY_MS = int(os.getenv('PASSAGE_BUFFER_MAX_DELAY_MS', 50))
+PASSAGE_BUFFER_ACK = os.getenv('PASSAGE_BUFFER_ACK', 'flush')
+PASSAGE_BUFFER_TIMEOUT = int(os.getenv('PASSAGE_BUFFER_TIMEOUT', 30))
+PASSAGE_BUFFER_RETRIES = int(os.getenv('PASSAGE_BUFFER_RETRIES', 2))
+
+# The minute counts (passage_minute_counts) recount the minutes of the
+# passages which were created (created_at) since the previous update, minus
+# PASSAGE_MINUTE_COUNTS_OVERLAP_SECONDS. The overlap covers the passages which
+# were committed after the previous update, e.g. by the write-behind buffer
+# (the created_at is set when the passage is written), and the clock skew
+# between the API and the command. The counts are up to date until the update.
+PASSAGE_MINUTE_COUNTS_OVERLAP_SECONDS = int(
+    os.getenv('PASSAGE_MINUTE_COUNTS_OVERLAP_SECONDS', 5 * 60)
+)
+
+# The number of seconds between the checks of the (in-process) camera cache
+# for a new version of the camera helper table.
+PASSAGE_CAMERA_CACHE_CHECK_SECONDS = int(
+    os.getenv('PASSAGE_CAMERA_CACHE_CHECK_SECONDS', 60)
+)
+
+# camera_hulptable_import updates the camera information of the passages of
+# the last PASSAGE_CAMERA_ENRICH_DAYS days of the cameras which changed, the
+# older passages are updated by enrich_passages.
+PASSAGE_CAMERA_ENRICH_DAYS = int(os.getenv('PASSAGE_CAMERA_ENRICH_DAYS', 7))
+
+# Pre-seed the cache of the (memoised) camelcase to snakecase key conversion
+# with all keys of the v2 schema at startup.
+PASSAGE_KEY_CACHE_PRESEED = os.getenv('PASSAGE_KEY_CACHE_PRESEED', 'true') == 'true'
+
+# The maximum number of days the aggregation commands process concurrently
+# (--jobs), each on its own database connection.
+AGGREGATION_MAX_JOBS = int(os.getenv('AGGREGATION_MAX_JOBS', 4))
+
+# The passage partitions are created PASSAGE_PARTITION_HORIZON_DAYS ahead by
+# manage_partitions, which drops the partitions older than
+# PASSAGE_PARTITION_RETENTION_DAYS (0 keeps all partitions), or archives them
+# (--archive, see PASSAGE_ARCHIVE_DIR).
+PASSAGE_PARTITION_HORIZON_DAYS = int(os.getenv('PASSAGE_PARTITION_HORIZON_DAYS', 6))
+PASSAGE_PARTITION_RETENTION_DAYS = int(
+    os.getenv('PASSAGE_PARTITION_RETENTION_DAYS', 0)
+)
+
+# archive_partitions writes the passage partitions older than
+# PASSAGE_ARCHIVE_AFTER_DAYS days to (Parquet) files in PASSAGE_ARCHIVE_DIR and
+# drops them, the day aggregation and the exports read the archived days there.
+PASSAGE_ARCHIVE_DIR = os.getenv('PASSAGE_ARCHIVE_DIR', '/data/archive')
+PASSAGE_ARCHIVE_AFTER_DAYS = int(os.getenv('PASSAGE_ARCHIVE_AFTER_DAYS', 28))
+
+# partitioned_vacuum vacuums the passage partitions with at least
+# PASSAGE_VACUUM_DEAD_RATIO dead rows, analyzes the partitions of which at least
+# PASSAGE_VACUUM_ANALYZE_RATIO of the rows were modified since the last analyze,
+# throttled by PASSAGE_VACUUM_COST_DELAY_MS, for at most
+# PASSAGE_VACUUM_MAX_SECONDS.
+PASSAGE_VACUUM_DEAD_RATIO = float(os.getenv('PASSAGE_VACUUM_DEAD_RATIO', 0.1))
+PASSAGE_VACUUM_ANALYZE_RATIO = float(os.getenv('PASSAGE_VACUUM_ANALYZE_RATIO', 0.1))
+PASSAGE_VACUUM_COST_DELAY_MS = float(os.getenv('PASSAGE_VACUUM_COST_DELAY_MS', 2))
+PASSAGE_VACUUM_MAX_SECONDS = int(os.getenv('PASSAGE_VACUUM_MAX_SECONDS', 3600))
+
+# The number of rows the exports fetch from the (server-side) cursor at once
+EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 2000))
+
+# The (gzip compressed) exports of closed weeks are cached on the filesystem in
+# EXPORT_CACHE_DIR (per API container), for EXPORT_CACHE_TIMEOUT seconds. A
+# cached export is not used anymore once the hour aggregation of one of the
+# days of the week is recalculated, which increments the version of the week in
+# the database.
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', '/tmp/iotsignals/export')
+EXPORT_CACHE_TIMEOUT = int(os.getenv('EXPORT_CACHE_TIMEOUT', 30 * 24 * 60 * 60))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'export': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': EXPORT_CACHE_DIR,
+        'TIMEOUT': EXPORT_CACHE_TIMEOUT,
+    },
+}
+
 ROOT_URLCONF = "main.urls"
 
 WSGI_APPLICATION = "main.wsgi.application"
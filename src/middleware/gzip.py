@@ -9,5 +9,7 @@ class UWSGIGZipMiddleware:
 
     def __call__(self, request):
         response = self.get_response(request)
-        response['uWSGI-Encoding'] = 'gzip'
+        # unless the response is compressed already
+        if 'Content-Encoding' not in response:
+            response['uWSGI-Encoding'] = 'gzip'
         return response
@@ -0,0 +1,536 @@
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .archive import create_passage_table, get_archived_days_between
+from .camera_cache import CAMERA_FIELDS, CAMERAS_QUERY, get_enriched_since
+from .models import AggregationWatermark
+
+log = logging.getLogger(__name__)
+
+# passages are only considered for an incremental run once they are at least
+# this old (created_at), so passages which were still being inserted
+# (uncommitted) at the time of the previous run are not missed.
+WATERMARK_MARGIN = timedelta(minutes=5)
+
+# the temporary table with the live and archived passages, which is used by
+# the aggregations of the days which are (partly) archived.
+ARCHIVED_TABLE = 'passage_archived'
+
+# the camera information (see passage.camera_cache) of the passages which were
+# written before it was stored with them (NULL), from the Camera helper table.
+# It is only joined for the days before the information was stored, see
+# Aggregation.uses_camera_fallback.
+CAMERA_FALLBACK_JOIN = f"""
+        left join ({CAMERAS_QUERY}) AS c
+        on p.camera_naam = c.camera_naam
+        AND p.rijrichting = c.rijrichting
+        AND p.camera_kijkrichting = c.camera_kijkrichting
+"""
+STORED_CAMERA = {field: f"p.{field}" for field in CAMERA_FIELDS}
+FALLBACK_CAMERA = {field: f"coalesce(p.{field}, c.{field})" for field in CAMERA_FIELDS}
+
+# suffix of the name of the watermark which records the progress of a
+# (--from-date) backfill, to be able to --resume it.
+BACKFILL_SUFFIX = '_backfill'
+
+
+def to_utc_naive(value):
+    """
+    Convert an (aware) datetime to the naive UTC datetime which can be
+    compared to the DateTimeUTCField columns (passage_at, created_at).
+    """
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def local_passage_at(time_zone, alias='p'):
+    """
+    :return: SQL expression for the passage_at of the passage table with the
+        given alias, converted to the given time zone (or as is, in UTC).
+    """
+    if time_zone is None:
+        return f"{alias}.passage_at"
+    return f"{alias}.passage_at at time zone 'utc' at time zone '{time_zone}'"
+
+
+def get_changed_hours(since, until, lookback_start, time_zone=None):
+    """
+    Get the (date, hour) buckets which received passages that were created
+    after ``since`` up to and including ``until``.
+
+    Only passages from ``lookback_start`` onwards (passage_at) are considered,
+    this bounds the number of partitions that have to be scanned. Late
+    arrivals (a passage_at long before the created_at) within that window are
+    found as well.
+
+    :param since: Only consider passages created after this (aware) datetime.
+    :param until: Only consider passages created until this (aware) datetime.
+    :param lookback_start: The (aware) datetime of the oldest passage_at.
+    :param time_zone: The time zone of the buckets, None for UTC.
+
+    :return: Sorted list of (date, hour) tuples.
+    """
+    passage_at = local_passage_at(time_zone)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT date_trunc('hour', {passage_at})
+            FROM passage_passage AS p
+            WHERE p.created_at > %s
+            AND p.created_at <= %s
+            AND p.passage_at >= %s
+            """,
+            [to_utc_naive(since), to_utc_naive(until), to_utc_naive(lookback_start)],
+        )
+        return sorted((hour.date(), hour.hour) for hour, in cursor.fetchall())
+
+
+def get_bounds(run_date, hour=None):
+    """
+    :return: Tuple with the start and end of the given day, or of the given
+        hour of that day.
+    """
+    if hour is None:
+        return run_date, run_date + timedelta(days=1)
+    start = datetime.datetime.combine(run_date, datetime.time(hour))
+    return start, start + timedelta(hours=1)
+
+
+def to_utc_bounds(start, end, time_zone=None):
+    """
+    Convert the (local) start and end (dates or naive datetimes) in the given
+    time zone to naive UTC datetimes, which can be compared to passage_at.
+    """
+    start, end = (
+        value
+        if isinstance(value, datetime.datetime)
+        else datetime.datetime.combine(value, datetime.time())
+        for value in (start, end)
+    )
+    if time_zone is None:
+        return start, end
+    tz = ZoneInfo(time_zone)
+    return (
+        to_utc_naive(start.replace(tzinfo=tz)),
+        to_utc_naive(end.replace(tzinfo=tz)),
+    )
+
+
+def _run_day(run_day, run_date, close_connection):
+    started = time.monotonic()
+    try:
+        run_day(run_date)
+    finally:
+        # the connection of a worker thread is not closed by Django
+        if close_connection:
+            connection.close()
+    return time.monotonic() - started
+
+
+def run_days(name, run_day, dates, jobs=1, backfill=False, resume=False):
+    """
+    Run ``run_day(run_date)`` for each of the given (independent) dates.
+
+    With more than one job, the days are processed concurrently by at most
+    ``jobs`` (capped by AGGREGATION_MAX_JOBS) threads, each using its own
+    database connection.
+
+    For a ``backfill`` (--from-date), the progress is recorded in the watermark
+    named ``name`` + BACKFILL_SUFFIX, as the first date which has not been
+    completed yet (all earlier dates have), together with the range of dates
+    of the backfill. With ``resume``, the dates before that date are skipped,
+    so an interrupted backfill can be continued. The watermark of a backfill
+    from another date, or until a later date, is ignored.
+    """
+    dates = sorted(dates)
+    if not dates:
+        return
+
+    watermark_name = f"{name}{BACKFILL_SUFFIX}"
+    from_date, to_date = dates[0], dates[-1]
+
+    if backfill and resume:
+        watermark = AggregationWatermark.objects.filter(name=watermark_name).first()
+        if watermark is None:
+            log.info(f"{name}: no backfill to resume")
+        elif watermark.from_date == from_date and watermark.to_date <= to_date:
+            first_date = watermark.watermark.astimezone(datetime.timezone.utc).date()
+            log.info(f"{name}: resume from {first_date}")
+            dates = [run_date for run_date in dates if run_date >= first_date]
+        else:
+            log.info(
+                f"{name}: not resuming the backfill of {watermark.from_date} "
+                f"until {watermark.to_date}"
+            )
+
+    if not dates:
+        return
+
+    jobs = max(1, min(jobs, settings.AGGREGATION_MAX_JOBS))
+    pending = set(dates)
+
+    def completed(run_date, duration):
+        pending.remove(run_date)
+        log.info(
+            f"{name}: {run_date} done in {duration:.1f}s "
+            f"({len(dates) - len(pending)}/{len(dates)})"
+        )
+        if not backfill:
+            return
+        first_pending = min(pending) if pending else dates[-1] + timedelta(days=1)
+        AggregationWatermark.objects.update_or_create(
+            name=watermark_name,
+            defaults=dict(
+                watermark=datetime.datetime.combine(
+                    first_pending, datetime.time(), tzinfo=datetime.timezone.utc
+                ),
+                from_date=from_date,
+                to_date=to_date,
+            ),
+        )
+
+    started = time.monotonic()
+    if jobs == 1:
+        for run_date in dates:
+            completed(run_date, _run_day(run_day, run_date, close_connection=False))
+    else:
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        futures = {
+            executor.submit(_run_day, run_day, run_date, True): run_date
+            for run_date in dates
+        }
+        try:
+            for future in as_completed(futures):
+                completed(futures[future], future.result())
+        finally:
+            # on failure, do not start the remaining days
+            executor.shutdown(cancel_futures=True)
+
+    log.info(
+        f"{name}: processed {len(dates)} days using {jobs} jobs "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+
+
+class Aggregation:
+    """
+    Declaration of an aggregation of the passages into ``table``.
+
+    The aggregations are (re)calculated per day, or per hour, by deleting the
+    existing aggregations of that day (hour) and inserting the new ones using
+    a single INSERT ... SELECT ... GROUP BY query.
+
+    The SQL expressions of the dimensions, measures and filters can use
+    ``{passage_at}``, which is replaced by the passage_at converted to the
+    time zone of the aggregation (so literal braces have to be doubled), and
+    ``{camera[<field>]}``, which is replaced by the camera information (see
+    passage.camera_cache.CAMERA_FIELDS) stored with the passage, or that of
+    the helper table for the passages written before it was stored.
+    """
+
+    # name of the aggregation, used for logging and the incremental watermark
+    name = None
+    table = None
+    # the date and hour columns of the table, the aggregations are deleted per
+    # day (and hour) using these.
+    date_column = None
+    hour_column = None
+    # the time zone of the dates and hours, None for UTC
+    time_zone = None
+    # number of days (before today) to aggregate by default
+    default_days = 1
+
+    # list of (column, expression) tuples, the aggregations are grouped by
+    # the dimensions.
+    dimensions = []
+    # list of (column, aggregate expression) tuples
+    measures = []
+    # additional expressions to group by, which are not inserted
+    extra_group_by = []
+
+    # the table(s) to select the passages (with alias p) from, and the joins.
+    # {passage_table} is replaced by the table containing the passages.
+    source = '{passage_table} AS p'
+    joins = ''
+    # list of additional conditions the passages should meet
+    filters = []
+    # optional list of the (output) columns to order the inserted rows by
+    order_by = []
+
+    @property
+    def passage_at(self):
+        return local_passage_at(self.time_zone)
+
+    def _expand(self, sql, camera_fallback=False):
+        return sql.format(
+            passage_at=self.passage_at,
+            camera=FALLBACK_CAMERA if camera_fallback else STORED_CAMERA,
+        )
+
+    def uses_camera_fallback(self, start, end):
+        """
+        :return: Whether the passages from (local) start until end can have
+            been written before the camera information was stored with them,
+            which then is taken from the helper table. This includes the day
+            the information was first stored, of which the passages can have
+            been written by processes which were not updated yet.
+        """
+        enriched_since = get_enriched_since()
+        if enriched_since is None:
+            return True
+        utc_start, _ = to_utc_bounds(start, end, self.time_zone)
+        first_day = to_utc_naive(enriched_since).date()
+        return utc_start < datetime.datetime.combine(
+            first_day + timedelta(days=1), datetime.time()
+        )
+
+    def get_delete_query(self, run_date, hour=None):
+        query = f"""
+        DELETE FROM {self.table}
+        WHERE {self.date_column} = '{run_date}'
+        """
+        if hour is not None:
+            query += f"AND {self.hour_column} = {hour}"
+        return query
+
+    def get_time_filter(self, start, end):
+        """
+        :return: The conditions selecting the passages from (local) start until
+            end. These are computed in UTC so they apply to passage_at as is,
+            which allows Postgres to prune the partitions and use the index.
+        """
+        start, end = to_utc_bounds(start, end, self.time_zone)
+        return [
+            f"p.passage_at >= '{start}'",
+            f"p.passage_at < '{end}'",
+        ]
+
+    def get_aggregation_query(self, start, end, passage_table='passage_passage'):
+        """
+        :param start: The start (date or datetime) of the passages to aggregate,
+            in the time zone of the aggregation.
+        :param end: The end (exclusive) of the passages to aggregate.
+        :param passage_table: The table to select the passages from, for
+            example a temporary table with the passages of a single day.
+
+        :return: The INSERT ... SELECT query for the aggregation.
+        """
+        columns = self.dimensions + self.measures
+        expressions = (
+            [expression for _, expression in columns]
+            + self.filters
+            + self.extra_group_by
+        )
+        joins = self.joins
+        fallback = any(
+            '{camera[' in expression for expression in expressions
+        ) and self.uses_camera_fallback(start, end)
+        if fallback:
+            joins += CAMERA_FALLBACK_JOIN
+
+        def expand(sql):
+            return self._expand(sql, camera_fallback=fallback)
+
+        select = ',\n            '.join(
+            f"{expand(expression)} AS {column}" for column, expression in columns
+        )
+        where = '\n        AND '.join(
+            self.get_time_filter(start, end)
+            + [expand(condition) for condition in self.filters]
+        )
+        group_by = [str(i) for i in range(1, len(self.dimensions) + 1)]
+        group_by += [expand(expression) for expression in self.extra_group_by]
+
+        query = f"""
+        INSERT INTO {self.table} (
+            {', '.join(column for column, _ in columns)}
+        )
+        SELECT
+            {select}
+        FROM {self.source.format(passage_table=passage_table)}
+        {joins}
+        WHERE {where}
+        GROUP BY {', '.join(group_by)}
+        """
+        if self.order_by:
+            query += f"ORDER BY {', '.join(self.order_by)}"
+        return query
+
+    def prepare(self, start, end, passage_table):
+        """
+        Hook which is run (in the transaction) before the aggregations of the
+        passages from start until end are calculated.
+        """
+
+    def run(self, run_date, hour=None, passage_table='passage_passage'):
+        """
+        (Re)calculate the aggregations of the given day (or hour of that day),
+        in a single transaction.
+
+        When the passages of the day are (partly) archived, and they are read
+        from the passage table, the live and archived passages are copied into
+        a temporary table first. Otherwise the aggregations of the archived
+        passages would be deleted and not inserted again.
+
+        :param passage_table: The table to select the passages from.
+
+        :return: Tuple with the number of deleted and inserted rows.
+        """
+        start, end = get_bounds(run_date, hour)
+        started = time.monotonic()
+
+        with transaction.atomic():
+            if passage_table == 'passage_passage':
+                utc_start, utc_end = to_utc_bounds(start, end, self.time_zone)
+                if get_archived_days_between(utc_start, utc_end):
+                    create_passage_table(ARCHIVED_TABLE, utc_start, utc_end)
+                    passage_table = ARCHIVED_TABLE
+
+            self.prepare(start, end, passage_table)
+
+            with connection.cursor() as cursor:
+                delete_query = self.get_delete_query(run_date, hour)
+                log.debug(f"Run the following query: {delete_query}")
+                cursor.execute(delete_query)
+                deleted = cursor.rowcount
+
+                aggregation_query = self.get_aggregation_query(
+                    start, end, passage_table
+                )
+                log.debug(f"Run the following query: {aggregation_query}")
+                cursor.execute(aggregation_query)
+                inserted = cursor.rowcount
+
+        log.info(
+            f"{self.name}: aggregated {start} until {end}, deleted {deleted} and "
+            f"inserted {inserted} records in {time.monotonic() - started:.1f}s"
+        )
+        return deleted, inserted
+
+
+def add_backfill_arguments(parser):
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help=(
+            'With --from-date, the number of days to process concurrently '
+            '(at most AGGREGATION_MAX_JOBS)'
+        ),
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help=(
+            'With --from-date, skip the days which were completed by a previous '
+            '(interrupted) run'
+        ),
+    )
+
+
+class AggregationCommand(BaseCommand):
+    """
+    Base class for the aggregation commands, which run ``aggregation``: by
+    default for the last ``default_days`` days, from a given date, or
+    incrementally.
+    """
+
+    aggregation = None
+
+    def add_arguments(self, parser):
+        # Named (optional) argument
+        parser.add_argument(
+            '--from-date',
+            type=datetime.date.fromisoformat,
+            help='Run the aggregations from this date',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'Only aggregate the hours which received new passages since '
+                'the previous incremental run'
+            ),
+        )
+        parser.add_argument(
+            '--lookback-days',
+            type=int,
+            default=7,
+            help=(
+                'In incremental mode, the number of days passages are allowed '
+                'to arrive late'
+            ),
+        )
+        add_backfill_arguments(parser)
+
+    def run_dates(self, dates, jobs=1, backfill=False, resume=False):
+        run_days(
+            self.aggregation.name,
+            self.aggregation.run,
+            dates,
+            jobs=jobs,
+            backfill=backfill,
+            resume=resume,
+        )
+
+    def _get_default_dates(self):
+        return [
+            date.today() - timedelta(days=i)
+            for i in range(self.aggregation.default_days, 0, -1)
+        ]
+
+    def _run_incremental(self, lookback_days):
+        aggregation = self.aggregation
+        until = timezone.now() - WATERMARK_MARGIN
+        watermark = AggregationWatermark.objects.filter(name=aggregation.name).first()
+
+        if watermark is None:
+            # the default days are aggregated completely, the hours of today
+            # (the first day which is not) from the start of the day
+            log.info(
+                f"No watermark for {aggregation.name} yet, run the default aggregation"
+            )
+            self.run_dates(self._get_default_dates())
+            tz = ZoneInfo(aggregation.time_zone or 'UTC')
+            since = datetime.datetime.combine(date.today(), datetime.time(), tzinfo=tz)
+        else:
+            since = watermark.watermark
+
+        hours = get_changed_hours(
+            since=since,
+            until=until,
+            lookback_start=until - timedelta(days=lookback_days),
+            time_zone=aggregation.time_zone,
+        )
+        log.info(f"{len(hours)} hours changed between {since} and {until}")
+        for run_date, hour in hours:
+            aggregation.run(run_date, hour)
+
+        AggregationWatermark.objects.update_or_create(
+            name=aggregation.name, defaults=dict(watermark=until)
+        )
+
+    def handle(self, *args, **options):
+        if options['from_date']:
+            run_date = options['from_date']
+            dates = []
+            while run_date < date.today():
+                dates.append(run_date)
+                run_date = run_date + timedelta(days=1)
+            self.run_dates(
+                dates, options['jobs'], backfill=True, resume=options['resume']
+            )
+
+        elif options['incremental']:
+            self._run_incremental(options['lookback_days'])
+
+        else:
+            self.run_dates(self._get_default_dates())
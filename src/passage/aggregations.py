@@ -0,0 +1,466 @@
+"""
+The aggregations of the passages, see passage.aggregation.Aggregation.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+
+from .aggregation import Aggregation
+from .export_cache import invalidate_week
+
+# join the camera helper table, for the camera information which is not
+# stored with the passages (see passage.camera_cache), e.g. the location
+CAMERA_JOIN = """
+        left join passage_camera AS h
+        on p.camera_naam = h.camera_naam
+        AND p.camera_kijkrichting = h.camera_kijkrichting
+        AND p.rijrichting = h.rijrichting
+"""
+
+DAY_OF_WEEK_NAME = """CASE
+                WHEN extract(DOW FROM {passage_at})::int = 0 then '7 zondag'
+                WHEN extract(DOW FROM {passage_at})::int = 1 then '1 maandag'
+                WHEN extract(DOW FROM {passage_at})::int = 2 then '2 dinsdag'
+                WHEN extract(DOW FROM {passage_at})::int = 3 then '3 woensdag'
+                WHEN extract(DOW FROM {passage_at})::int = 4 then '4 donderdag'
+                WHEN extract(DOW FROM {passage_at})::int = 5 then '5 vrijdag'
+                WHEN extract(DOW FROM {passage_at})::int = 6 then '6 zaterdag'
+                ELSE 'onbekend '
+            END"""
+
+MASSA_LEDIG_VOERTUIG_KLASSE = """CASE
+                WHEN massa_ledig_voertuig <= 3500 THEN 'klasse01_0-3500'
+                WHEN massa_ledig_voertuig <= 7500 THEN 'klasse02_3501-7500'
+                WHEN massa_ledig_voertuig <= 11250 THEN 'klasse03_7501-11250'
+                WHEN massa_ledig_voertuig <= 15000 THEN 'klasse04_11251-15000'
+                WHEN massa_ledig_voertuig <= 20000 THEN 'klasse05_15001-20000'
+                WHEN massa_ledig_voertuig <= 30000 THEN 'klasse06_20001-30000'
+                WHEN massa_ledig_voertuig <= 45000 THEN 'klasse07_30001-45000'
+                WHEN massa_ledig_voertuig >  45000 THEN 'klasse08_45001'
+                ELSE 'onbekend'
+            END"""
+
+TOEGESTANE_MAXIMUM_MASSA_KLASSE = """CASE
+                WHEN toegestane_maximum_massa_voertuig <= 3500 THEN 'klasse01_0-3500'
+                WHEN toegestane_maximum_massa_voertuig <= 7500 THEN 'klasse02_3501-7500'
+                WHEN toegestane_maximum_massa_voertuig <= 10000 THEN 'klasse03_7501-10000'
+                WHEN toegestane_maximum_massa_voertuig <= 20000 THEN 'klasse04_10001-20000'
+                WHEN toegestane_maximum_massa_voertuig <= 30000 THEN 'klasse05_20001-30000'
+                WHEN toegestane_maximum_massa_voertuig <= 40000 THEN 'klasse06_30001-40000'
+                WHEN toegestane_maximum_massa_voertuig <= 50000 THEN 'klasse07_40001-50000'
+                WHEN toegestane_maximum_massa_voertuig <= 60000 THEN 'klasse08_50001-60000'
+                WHEN toegestane_maximum_massa_voertuig <= 70000 THEN 'klasse09_60001-70000'
+                WHEN toegestane_maximum_massa_voertuig >  70000 THEN 'klasse10_70001'
+                ELSE 'onbekend'
+            END"""
+
+BREEDTE_KLASSE = """CASE
+                WHEN breedte < 140 THEN '01 0-140'
+                WHEN breedte > 140 THEN '02 >140'
+                ELSE '03 onbekend'
+            END"""
+
+
+# resolve the gebieden of the camera names selected by {names}, using the
+# (substring) camera_id of the taxi dashboard helper table.
+RESOLVE_CAMERA_GEBIEDEN = """
+    INSERT INTO passage_taxicameragebied (camera_naam, gebiedstype, gebied)
+    SELECT n.camera_naam, h.gebiedstype, h.gebied
+    FROM ({names}) AS n (camera_naam)
+    LEFT JOIN passage_hulptabelcameragebiedentaxidashboard h
+    ON n.camera_naam LIKE '%' || h.camera_id || '%'
+    AND h.camera_id != ''
+    GROUP BY 1, 2, 3
+"""
+
+
+def refresh_camera_gebieden():
+    """
+    Resolve the gebieden of all known camera names again, after the taxi
+    dashboard helper table has been replaced.
+    """
+    query = RESOLVE_CAMERA_GEBIEDEN.format(
+        names='SELECT DISTINCT camera_naam FROM deleted'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH deleted AS (
+                DELETE FROM passage_taxicameragebied RETURNING camera_naam
+            )
+            {query}
+            """
+        )
+        return cursor.rowcount
+
+
+def update_camera_hour_rollup(run_date, hour=None):
+    """
+    Roll up the hour aggregations of the given day (or hour of that day) to
+    the number of passages per camera per hour, which is what is exported.
+
+    :return: The number of inserted rows.
+    """
+    start = datetime.combine(run_date, time(hour or 0))
+    end = start + (timedelta(days=1) if hour is None else timedelta(hours=1))
+    where = f"date = '{run_date}'"
+    if hour is not None:
+        where += f" AND hour = {hour}"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM passage_passagecamerahourrollup
+            WHERE bucket >= '{start}' AND bucket < '{end}'
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO passage_passagecamerahourrollup (
+                bucket, year, week, camera_id, camera_naam, count
+            )
+            SELECT
+                date + make_interval(hours => hour),
+                year,
+                week,
+                camera_id,
+                camera_naam,
+                sum(count)
+            FROM passage_passagehouraggregation
+            WHERE {where}
+            GROUP BY 1, 2, 3, 4, 5
+            """
+        )
+        return cursor.rowcount
+
+
+def bus_only(column):
+    return f"CASE WHEN voertuig_soort = 'Bus' THEN {column} ELSE NULL END"
+
+
+class PassageHourAggregation(Aggregation):
+    name = 'passage_hour_aggregation'
+    table = 'passage_passagehouraggregation'
+    date_column = 'date'
+    hour_column = 'hour'
+
+    dimensions = [
+        ('date', "DATE({passage_at})"),
+        ('year', "EXTRACT(YEAR FROM {passage_at})::int"),
+        ('month', "EXTRACT(MONTH FROM {passage_at})::int"),
+        ('day', "EXTRACT(DAY FROM {passage_at})::int"),
+        ('week', "EXTRACT(WEEK FROM {passage_at})::int"),
+        ('dow', "EXTRACT(DOW FROM {passage_at})::int"),
+        ('hour', "EXTRACT(HOUR FROM {passage_at})::int"),
+        ('camera_id', "camera_id"),
+        ('camera_naam', "camera_naam"),
+        ('rijrichting', "rijrichting"),
+        ('camera_kijkrichting', "camera_kijkrichting"),
+        ('kenteken_land', "CASE WHEN kenteken_land = 'NL' THEN 'NL' ELSE 'overig' END"),
+        ('voertuig_soort', "voertuig_soort"),
+        ('europese_voertuigcategorie', "europese_voertuigcategorie"),
+        ('taxi_indicator', "taxi_indicator"),
+        ('diesel', "diesel"),
+        ('gasoline', "gasoline"),
+        ('electric', "electric"),
+        ('toegestane_maximum_massa_voertuig', """CASE
+                WHEN toegestane_maximum_massa_voertuig <= 3500 THEN 'klasse01_0-3500'
+                WHEN toegestane_maximum_massa_voertuig < 7500 THEN 'klasse02_3501-7500'
+                WHEN toegestane_maximum_massa_voertuig <= 10000 THEN 'klasse03_7501-10000'
+                WHEN toegestane_maximum_massa_voertuig <= 20000 THEN 'klasse04_10001-20000'
+                WHEN toegestane_maximum_massa_voertuig <= 30000 THEN 'klasse05_20001-30000'
+                WHEN toegestane_maximum_massa_voertuig <= 40000 THEN 'klasse06_30001-40000'
+                WHEN toegestane_maximum_massa_voertuig <= 50000 THEN 'klasse07_40001-50000'
+                WHEN toegestane_maximum_massa_voertuig <= 60000 THEN 'klasse08_50001-60000'
+                WHEN toegestane_maximum_massa_voertuig <= 70000 THEN 'klasse09_60001-70000'
+                WHEN toegestane_maximum_massa_voertuig <= 80000 THEN 'klasse10_70001-80000'
+                ELSE 'klasse11_80001'
+            END"""),
+    ]
+    measures = [('count', "COUNT(*)")]
+    order_by = ['camera_id', 'date', 'hour']
+
+    def run(self, run_date, hour=None, passage_table='passage_passage'):
+        with transaction.atomic():
+            result = super().run(run_date, hour, passage_table)
+            update_camera_hour_rollup(run_date, hour)
+            # the (cached) exports of the week are outdated
+            invalidate_week(run_date)
+        return result
+
+
+class IGORHourAggregation(Aggregation):
+    """Aggregation for IGOR and Druktebeeld."""
+
+    name = 'passage_igor_hour_aggregation'
+    table = 'passage_igorhouraggregation'
+    date_column = 'passage_at_date'
+    hour_column = 'passage_at_hour'
+    # by default update the aggregations for the last three days
+    default_days = 3
+
+    dimensions = [
+        ('passage_at_timestamp', "date_trunc('hour', {passage_at})"),
+        ('passage_at_date', "date({passage_at})"),
+        ('passage_at_year', "extract(YEAR FROM {passage_at})::int"),
+        ('passage_at_month', "extract(MONTH FROM {passage_at})::int"),
+        ('passage_at_day', "extract(DAY FROM {passage_at})::int"),
+        ('passage_at_week', "extract(WEEK FROM {passage_at})::int"),
+        ('passage_at_day_of_week', "extract(DOW FROM {passage_at})::int"),
+        ('passage_at_hour', "extract(HOUR FROM {passage_at})::int"),
+        # camera information
+        ('camera_id', "h.camera_id"),
+        ('camera_naam', "h.camera_naam"),
+        ('vma_linknr', "h.vma_linknr"),
+        ('order_kaart', "{camera[order_kaart]}"),
+        ('order_naam', "{camera[order_naam]}"),
+        ('cordon', "{camera[cordon]}"),
+        ('richting', "{camera[richting]}"),
+        ('location', "h.location"),
+        ('geom', "h.geom"),
+        ('azimuth', "h.azimuth"),
+        # vehicle information
+        ('kenteken_land', "p.kenteken_land"),
+        ('taxi_indicator', "p.taxi_indicator"),
+        ('europese_voertuigcategorie', "p.europese_voertuigcategorie"),
+    ]
+    measures = [('intensiteit', "count(*)")]
+    joins = CAMERA_JOIN
+
+
+class TaxiHourAggregation(Aggregation):
+    name = 'passage_taxi_hour_aggregation'
+    table = 'passage_taxihouraggregation'
+    date_column = 'passage_at_date'
+    hour_column = 'hh'
+    # by default update the aggregations for the last three days
+    default_days = 3
+
+    dimensions = [
+        ('passage_at_date', "({passage_at})::date"),
+        ('hh', "extract(hour from {passage_at})"),
+        ('gebiedstype', "gebiedstype"),
+        ('gebied', "gebied"),
+        ('electric', "electric"),
+    ]
+    measures = [
+        ('unieke_passages', "count(distinct kenteken_hash)"),
+        ('check_on_camera_count', "count(distinct p.camera_naam)"),
+    ]
+    # the gebieden of the camera names are resolved in passage_taxicameragebied
+    source = """{passage_table} AS p
+        join passage_taxicameragebied h
+        on h.camera_naam = p.camera_naam"""
+    filters = [
+        "p.taxi_indicator = true",
+        "electric is not null",
+        "h.gebied is not null",
+    ]
+    order_by = ['gebiedstype', 'gebied', 'passage_at_date', 'hh', 'electric']
+
+    def prepare(self, start, end, passage_table):
+        # resolve the gebieden of the camera names which are new
+        where = '\n            AND '.join(self.get_time_filter(start, end))
+        names = f"""
+            SELECT DISTINCT p.camera_naam
+            FROM {passage_table} AS p
+            WHERE {where}
+            AND p.taxi_indicator = true
+            AND p.camera_naam NOT IN (
+                SELECT camera_naam FROM passage_taxicameragebied
+            )
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(RESOLVE_CAMERA_GEBIEDEN.format(names=names))
+
+
+class HeavyTrafficHourAggregation(Aggregation):
+    """Aggregation for the zone zwaar verkeer."""
+
+    name = 'passage_zwaar_verkeer_hour_aggregation'
+    table = 'passage_heavytraffichouraggregation'
+    date_column = 'passage_at_date'
+    hour_column = 'passage_at_hour'
+    # by default update the aggregations for the last three days
+    default_days = 3
+
+    dimensions = [
+        ('passage_at_timestamp', "date_trunc('hour', {passage_at})"),
+        ('passage_at_date', "date({passage_at})"),
+        ('passage_at_year', "extract(YEAR FROM {passage_at})::int"),
+        ('passage_at_month', "extract(MONTH FROM {passage_at})::int"),
+        ('passage_at_day', "extract(DAY FROM {passage_at})::int"),
+        ('passage_at_week', "extract(WEEK FROM {passage_at})::int"),
+        ('passage_at_day_of_week', DAY_OF_WEEK_NAME),
+        ('passage_at_hour', "extract(HOUR FROM {passage_at})::int"),
+        # camera information
+        ('order_kaart', "{camera[order_kaart]}"),
+        ('order_naam', "{camera[order_naam]}"),
+        ('cordon', "{camera[cordon]}"),
+        ('richting', "{camera[richting]}"),
+        ('location', "h.location"),
+        ('geom', "h.geom"),
+        ('azimuth', "h.azimuth"),
+        # vehicle information
+        ('kenteken_land', "CASE WHEN p.kenteken_land = 'NL' then 'NL' ELSE 'buitenland' END"),
+        ('voertuig_soort', "p.voertuig_soort"),
+        ('inrichting', """CASE
+                WHEN p.voertuig_soort = 'Personenauto' then 'Personenauto'
+                ELSE inrichting
+            END"""),
+        ('voertuig_klasse_toegestaan_gewicht', """CASE
+                WHEN p.kenteken_land <> 'NL' then 'buitenland'
+                WHEN p.toegestane_maximum_massa_voertuig <=  3500 then 'klasse 0 <= 3500'
+                WHEN p.toegestane_maximum_massa_voertuig <=  7500 then 'klasse 1 <= 7500'
+                WHEN p.toegestane_maximum_massa_voertuig <= 11250 then 'klasse 2 <= 11250'
+                WHEN p.toegestane_maximum_massa_voertuig <= 30000 then 'klasse 3 <= 30000'
+                WHEN p.toegestane_maximum_massa_voertuig <= 50000 then 'klasse 4 <= 50000'
+                WHEN p.toegestane_maximum_massa_voertuig > 50000 then 'klasse 5 > 50000'
+                ELSE 'onbekend'
+            END"""),
+    ]
+    measures = [('intensiteit', "count(*)")]
+    joins = CAMERA_JOIN
+    filters = ["{camera[cordon]} in ('S100','A10')"]
+
+
+class HeavyTrafficHourAggregationV2(Aggregation):
+    name = 'passage_zwaar_verkeer_hour_aggregation_v2'
+    table = 'passage_heavytraffichouraggregation_v2'
+    date_column = 'passage_at_date'
+    hour_column = 'passage_at_hour'
+    time_zone = 'Europe/Amsterdam'
+
+    dimensions = [
+        ('passage_at_date', "DATE({passage_at})"),
+        ('passage_at_year', "EXTRACT(YEAR FROM {passage_at})::int"),
+        ('passage_at_month', "EXTRACT(MONTH FROM {passage_at})::int"),
+        ('passage_at_day', "EXTRACT(DAY FROM {passage_at})::int"),
+        ('passage_at_week', "EXTRACT(WEEK FROM {passage_at})::int"),
+        ('passage_at_day_of_week', "EXTRACT(DOW FROM {passage_at})::int"),
+        ('passage_at_hour', "EXTRACT(HOUR FROM {passage_at})::int"),
+        ('camera_id', "p.camera_id"),
+        ('camera_naam', "p.camera_naam"),
+        ('camera_locatie', "p.camera_locatie"),
+        ('camera_kijkrichting', "p.camera_kijkrichting"),
+        ('rijrichting', "p.rijrichting"),
+        ('rijrichting_correct', "{camera[rijrichting_correct]}"),
+        ('straat', "p.straat"),
+        ('cordon', "{camera[cordon]}"),
+        ('cordon_order_kaart', "{camera[order_kaart]}"),
+        ('cordon_order_naam', "{camera[order_naam]}"),
+        ('richting', "{camera[richting]}"),
+        ('kenteken_land', "kenteken_land"),
+        ('massa_ledig_voertuig', MASSA_LEDIG_VOERTUIG_KLASSE),
+        ('toegestane_maximum_massa_voertuig', TOEGESTANE_MAXIMUM_MASSA_KLASSE),
+        ('voertuig_soort', "voertuig_soort"),
+        ('inrichting', "inrichting"),
+        ('europese_voertuigcategorie', "europese_voertuigcategorie"),
+        ('europese_voertuigcategorie_toevoeging', "europese_voertuigcategorie_toevoeging"),
+        ('brandstoffen', "brandstoffen"),
+        ('diesel', "diesel"),
+        ('gasoline', "gasoline"),
+        ('electric', "electric"),
+        ('lengte', """CASE
+                WHEN lengte <= 1000 THEN '01 0t/m1000'
+                WHEN lengte >  1000 THEN '02 >1000'
+                ELSE '03 onbekend'
+            END"""),
+        ('breedte', BREEDTE_KLASSE),
+        ('aantal_staanplaatsen', bus_only('aantal_staanplaatsen')),
+        ('aantal_zitplaatsen', bus_only('aantal_zitplaatsen')),
+        ('merk', bus_only('merk')),
+        ('handelsbenaming', bus_only('handelsbenaming')),
+    ]
+    measures = [('count', "COUNT(*)")]
+    # the original query also grouped by the breedte of the Bedrijfsauto's
+    extra_group_by = [
+        """CASE
+                WHEN voertuig_soort = 'Bedrijfsauto' AND breedte < 140 THEN '01 0t/m140'
+                WHEN voertuig_soort = 'Bedrijfsauto' AND breedte > 140 THEN '02 >140'
+                ELSE NULL
+            END"""
+    ]
+    filters = [
+        "(p.voertuig_soort = 'Bedrijfsauto' OR p.toegestane_maximum_massa_voertuig > 3500)",
+        "{camera[rijrichting_correct]} = True",
+    ]
+    order_by = ['camera_id', 'rijrichting', 'passage_at_date', 'passage_at_hour']
+
+
+class HeavyTrafficMinuteAggregation(Aggregation):
+    name = 'passage_zwaar_verkeer_minute_aggregation'
+    table = 'passage_heavytrafficminuteaggregation'
+    date_column = 'passage_at_date'
+    hour_column = 'passage_at_hour'
+    time_zone = 'Europe/Amsterdam'
+
+    dimensions = [
+        ('passage_at_date', "DATE({passage_at})"),
+        ('passage_at_year', "EXTRACT(YEAR FROM {passage_at})::int"),
+        ('passage_at_month', "EXTRACT(MONTH FROM {passage_at})::int"),
+        ('passage_at_day', "EXTRACT(DAY FROM {passage_at})::int"),
+        ('passage_at_week', "EXTRACT(WEEK FROM {passage_at})::int"),
+        ('passage_at_day_of_week', "EXTRACT(DOW FROM {passage_at})::int"),
+        ('passage_at_hour', "EXTRACT(HOUR FROM {passage_at})::int"),
+        ('passage_at_minute', "EXTRACT(MINUTE FROM {passage_at})::int"),
+        ('camera_id', "p.camera_id"),
+        ('camera_naam', "p.camera_naam"),
+        ('camera_locatie', "p.camera_locatie"),
+        ('camera_kijkrichting', "p.camera_kijkrichting"),
+        ('rijrichting', "p.rijrichting"),
+        ('rijrichting_correct', "{camera[rijrichting_correct]}"),
+        ('straat', "p.straat"),
+        ('cordon', "{camera[cordon]}"),
+        ('cordon_order_kaart', "{camera[order_kaart]}"),
+        ('cordon_order_naam', "{camera[order_naam]}"),
+        ('richting', "{camera[richting]}"),
+        ('kenteken_hash', "p.kenteken_hash"),
+        ('kenteken_land', "kenteken_land"),
+        ('massa_ledig_voertuig', MASSA_LEDIG_VOERTUIG_KLASSE),
+        ('toegestane_maximum_massa_voertuig', TOEGESTANE_MAXIMUM_MASSA_KLASSE),
+        ('voertuig_soort', "voertuig_soort"),
+        ('inrichting', "inrichting"),
+        ('europese_voertuigcategorie', "europese_voertuigcategorie"),
+        ('europese_voertuigcategorie_toevoeging', "europese_voertuigcategorie_toevoeging"),
+        ('brandstoffen', "brandstoffen"),
+        ('diesel', "diesel"),
+        ('gasoline', "gasoline"),
+        ('electric', "electric"),
+        ('lengte', """CASE
+                WHEN lengte <= 1000 THEN '01 <=1000'
+                WHEN lengte >  1000 THEN '02 >1000'
+                ELSE '03 onbekend'
+            END"""),
+        ('breedte', BREEDTE_KLASSE),
+        ('aantal_staanplaatsen', bus_only('aantal_staanplaatsen')),
+        ('aantal_zitplaatsen', bus_only('aantal_zitplaatsen')),
+        ('merk', bus_only('merk')),
+        ('handelsbenaming', bus_only('handelsbenaming')),
+    ]
+    measures = [('count', "COUNT(*)")]
+    filters = [
+        "p.toegestane_maximum_massa_voertuig > 3500",
+        "{camera[rijrichting_correct]} = True",
+    ]
+    order_by = [
+        'camera_id',
+        'rijrichting',
+        'passage_at_date',
+        'passage_at_hour',
+        'passage_at_minute',
+        'kenteken_hash',
+    ]
+
+
+AGGREGATIONS = {
+    aggregation.name: aggregation()
+    for aggregation in (
+        PassageHourAggregation,
+        IGORHourAggregation,
+        TaxiHourAggregation,
+        HeavyTrafficHourAggregation,
+        HeavyTrafficHourAggregationV2,
+        HeavyTrafficMinuteAggregation,
+    )
+}
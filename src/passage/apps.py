@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PassageConfig(AppConfig):
     name = 'passage'
+
+    def ready(self):
+        if settings.PASSAGE_KEY_CACHE_PRESEED:
+            from .case_converters import seed_snakecase_cache
+            from .conversion import V2_KEYS
+
+            seed_snakecase_cache(V2_KEYS)
@@ -0,0 +1,311 @@
+"""
+Archive of the cold passage partitions, as (zstd compressed) Parquet files.
+
+An archived partition is dropped, but its passages can still be read: they
+are loaded into a (temporary) table for the aggregations (load_archives and
+create_passage_table), or read from the file for the exports (archive_rows).
+
+The archives are registered (PassageArchive) in the transaction which drops
+the partition. A (late) passage of an archived day recreates its partition
+(see passage.partitions.retry_missing_partition), so the passages of a day
+can be both archived and live: they are always read together. Archiving the
+recreated partition adds another archive of the day.
+"""
+import datetime
+import io
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+
+from .camera_cache import enrich_table
+from .export import get_arrow_schema, query_rows, write_parquet
+from .models import Passage, PassageArchive
+from .partitions import (
+    PARENT_TABLE,
+    detach_partition,
+    get_partition_days,
+    partition_name,
+)
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = '.parquet'
+COMPRESSION = 'zstd'
+# the number of passages which are read from an archive at a time
+BATCH_SIZE = 64 * 1024
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow.csv
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured('The passage archive requires pyarrow')
+    return pyarrow.parquet, pyarrow.csv
+
+
+def get_archive_path(day, number=0, directory=None):
+    """
+    :return: The path of the (``number``-th, from 0) archive of the given day.
+    """
+    directory = directory or settings.PASSAGE_ARCHIVE_DIR
+    name = partition_name(day) + (f'.{number}' if number else '')
+    return os.path.join(directory, f'{name}{ARCHIVE_SUFFIX}')
+
+
+def get_archive_paths(day, directory=None):
+    """
+    :return: The paths of the archives of the given day.
+    """
+    directory = directory or settings.PASSAGE_ARCHIVE_DIR
+    return [
+        os.path.join(directory, name)
+        for name in PassageArchive.objects.filter(day=day)
+        .order_by('id')
+        .values_list('name', flat=True)
+    ]
+
+
+def get_archived_days():
+    """
+    :return: Sorted list of the days which are (partly) archived.
+    """
+    return list(
+        PassageArchive.objects.order_by('day')
+        .values_list('day', flat=True)
+        .distinct()
+    )
+
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def archive_partition(day, directory=None):
+    """
+    Write the passages of the partition of the given day to a Parquet file,
+    and drop the partition once the file is complete and synced to disk. The
+    partition is locked against writes (and other archive runs) in the
+    meantime. The archive is registered when the partition is dropped.
+
+    :return: The number of archived passages.
+    """
+    pq, _ = _import_pyarrow()
+    name = partition_name(day)
+    partial = None
+    started = time.monotonic()
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {name} IN SHARE ROW EXCLUSIVE MODE")
+            path = get_archive_path(
+                day, PassageArchive.objects.filter(day=day).count(), directory
+            )
+            partial = f'{path}.partial'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cursor.execute(f"SELECT count(*) FROM {name}")
+            count = cursor.fetchone()[0]
+
+            # sorted, so the row group statistics allow skipping row groups
+            columns, rows = query_rows(f"SELECT * FROM {name} ORDER BY passage_at")
+            with open(partial, 'wb') as f:
+                for chunk in write_parquet(
+                    columns,
+                    rows,
+                    get_arrow_schema(Passage, columns),
+                    compression=COMPRESSION,
+                ):
+                    f.write(chunk)
+
+                # the file is on disk before the partition is dropped
+                f.flush()
+                os.fsync(f.fileno())
+
+            archived = pq.ParquetFile(partial).metadata.num_rows
+            if archived != count:
+                raise RuntimeError(
+                    f"Archived {archived} of the {count} passages of {name}"
+                )
+            os.replace(partial, path)
+            # and so is the rename
+            _fsync_directory(os.path.dirname(path))
+            PassageArchive.objects.create(
+                day=day, name=os.path.basename(path), passages=count
+            )
+            detach_partition(name)
+    finally:
+        if partial and os.path.exists(partial):
+            os.remove(partial)
+
+    log.info(
+        f"Archived {count} passages of {name} to {path} "
+        f"({os.path.getsize(path)} bytes) in {time.monotonic() - started:.1f}s"
+    )
+    return count
+
+
+def archive_partitions(before, directory=None):
+    """
+    Archive the partitions of the days before the given day, including the
+    recreated partitions of archived days.
+
+    :return: Dict with the archived days and their number of passages.
+    """
+    return {
+        day: archive_partition(day, directory)
+        for day in get_partition_days()
+        if day < before
+    }
+
+
+def get_archived_days_between(start, end):
+    """
+    :return: The (partly) archived days with passages from start until end
+        (naive UTC).
+    """
+    days = []
+    for day in get_archived_days():
+        day_start = datetime.datetime.combine(day, datetime.time())
+        if day_start < end and start < day_start + timedelta(days=1):
+            days.append(day)
+    return days
+
+
+def load_archives(table, start, end, directory=None):
+    """
+    Load the archived passages from start until end (naive UTC) into the given
+    table, which has the columns of the passage table.
+
+    :return: The number of loaded passages.
+    """
+    days = get_archived_days_between(start, end)
+    if not days:
+        return 0
+
+    _, csv = _import_pyarrow()
+    loaded = 0
+    with connection.cursor() as cursor:
+        for day in days:
+            count = 0
+            for path in get_archive_paths(day, directory):
+                for batch in _read_batches(path, start=start, end=end):
+                    data = io.BytesIO()
+                    csv.write_csv(batch, data)
+                    data.seek(0)
+                    cursor.copy_expert(
+                        f"""
+                        COPY {table} ({', '.join(batch.schema.names)})
+                        FROM STDIN WITH (FORMAT csv, HEADER)
+                        """,
+                        data,
+                    )
+                    count += batch.num_rows
+            loaded += count
+            log.info(f"Loaded {count} archived passages of {day}")
+    return loaded
+
+
+def create_passage_table(table, start, end):
+    """
+    Copy the live and the archived passages from start until end (naive UTC)
+    into a new temporary table, which is dropped at the end of the
+    transaction. Only a single scan of the (one or two) partitions is needed.
+
+    The camera information of the archived passages is updated to the
+    current Camera helper table, like that of the partitions is when the
+    helper table is imported.
+
+    :return: The number of copied passages.
+    """
+    started = time.monotonic()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE {table} ON COMMIT DROP AS
+            SELECT * FROM {PARENT_TABLE}
+            WHERE passage_at >= %s
+            AND passage_at < %s
+            """,
+            [start, end],
+        )
+        count = cursor.rowcount
+        log.info(
+            f"Copied {count} passages between {start} and {end} "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        archived = load_archives(table, start, end)
+        if archived:
+            enrich_table(table)
+        count += archived
+        cursor.execute(f"ANALYZE {table}")
+    return count
+
+
+def _read_batches(path, columns=None, start=None, end=None, camera_ids=None):
+    """
+    :return: Iterator of the record batches of the given archive (of the given
+        columns), of the passages from start until end (naive UTC) of the
+        cameras with the given ids. The archive is read one batch (of at most
+        BATCH_SIZE passages) at a time.
+    """
+    pq, _ = _import_pyarrow()
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    read = columns
+    if columns is not None and camera_ids and 'camera_id' not in columns:
+        read = [*columns, 'camera_id']
+    if columns is not None and (start or end) and 'passage_at' not in read:
+        read = [*read, 'passage_at']
+
+    for batch in pq.ParquetFile(path).iter_batches(
+        batch_size=BATCH_SIZE, columns=read
+    ):
+        conditions = []
+        passage_at = batch.column('passage_at') if start or end else None
+        if start:
+            conditions.append(
+                pc.greater_equal(passage_at, pa.scalar(start, passage_at.type))
+            )
+        if end:
+            conditions.append(pc.less(passage_at, pa.scalar(end, passage_at.type)))
+        if camera_ids:
+            conditions.append(
+                pc.is_in(
+                    batch.column('camera_id'), value_set=pa.array(list(camera_ids))
+                )
+            )
+        for condition in conditions:
+            batch = batch.filter(condition)
+        if columns is not None:
+            batch = pa.RecordBatch.from_arrays(
+                [batch.column(column) for column in columns], names=columns
+            )
+        if batch.num_rows:
+            yield batch
+
+
+def archive_rows(day, fields, camera_ids=None, directory=None):
+    """
+    :return: Tuple with the column names and an iterator of the rows of the
+        given fields of the archived passages of the given day (of the cameras
+        with the given ids). The archive is read one batch at a time.
+    """
+    columns = list(fields)
+
+    def iterate():
+        for path in get_archive_paths(day, directory):
+            for batch in _read_batches(path, columns, camera_ids=camera_ids):
+                yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    return columns, iterate()
@@ -0,0 +1,171 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .bulk import insert_passages
+from .errors import DuplicateIdError
+from .metrics import increment
+
+log = logging.getLogger(__name__)
+
+ACK_FLUSH = 'flush'
+ACK_ENQUEUE = 'enqueue'
+
+
+class PassageBuffer:
+    """
+    In-process write-behind buffer for passages.
+
+    Passages submitted to the buffer are written by a background thread using
+    a single multi-row insert as soon as ``max_size`` passages are waiting, or
+    when the oldest waiting passage has waited for ``max_delay_ms``. A failed
+    write is retried ``retries`` times, after ``retry_delay_ms`` which doubles
+    with every retry.
+    """
+
+    def __init__(
+        self,
+        max_size,
+        max_delay_ms,
+        writer=insert_passages,
+        retries=0,
+        retry_delay_ms=100,
+    ):
+        self.max_size = max_size
+        self.max_delay = max_delay_ms / 1000
+        self.writer = writer
+        self.retries = retries
+        self.retry_delay = retry_delay_ms / 1000
+
+        self._condition = threading.Condition()
+        self._pending = []
+        self._oldest = None
+        self._thread = None
+        self._pid = None
+
+    def submit(self, passage):
+        """
+        Add an (unsaved) passage to the buffer.
+
+        :return: A Future which resolves to the passage once it is written,
+            or raises DuplicateIdError when the passage already existed.
+        """
+        future = Future()
+        with self._condition:
+            self._ensure_thread()
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((passage, future))
+            if len(self._pending) >= self.max_size:
+                self._condition.notify()
+        return future
+
+    def flush(self):
+        """Write all pending passages (in the calling thread)."""
+        with self._condition:
+            batch = self._take()
+        self._write(batch)
+
+    def _ensure_thread(self):
+        # uwsgi forks the workers after the application is loaded, threads do
+        # not survive a fork so (re)start it in the current process.
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='passage-buffer', daemon=True
+            )
+            self._thread.start()
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        self._oldest = None
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._is_due():
+                    timeout = None
+                    if self._oldest is not None:
+                        timeout = self._oldest + self.max_delay - time.monotonic()
+                    self._condition.wait(timeout)
+                batch = self._take()
+            self._write(batch)
+
+    def _is_due(self):
+        if not self._pending:
+            return False
+        return (
+            len(self._pending) >= self.max_size
+            or time.monotonic() - self._oldest >= self.max_delay
+        )
+
+    def _write(self, batch):
+        if not batch:
+            return
+
+        passages = [passage for passage, _ in batch]
+        try:
+            inserted = self._write_with_retries(passages)
+        except Exception as e:
+            # the passages of posts which were acknowledged on enqueue are lost
+            increment('passage_buffer_failed', len(passages))
+            log.exception(
+                f"Failed to write {len(passages)} buffered passages, passage_ids: "
+                f"{', '.join(str(passage.passage_id) for passage in passages)}"
+            )
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for passage, future in batch:
+            if passage.pk in inserted:
+                future.set_result(passage)
+            else:
+                log.info(
+                    f"DuplicateIdError for passage_id {passage.passage_id}, "
+                    f"volgnummer {passage.volgnummer}"
+                )
+                future.set_exception(DuplicateIdError())
+
+    def _write_with_retries(self, passages):
+        for attempt in range(self.retries + 1):
+            # the background thread keeps its own connection, make sure it is
+            # still usable (and respects CONN_MAX_AGE), also after an error.
+            close_old_connections()
+            try:
+                return self.writer(passages)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                increment('passage_buffer_retries')
+                log.warning(
+                    f"Failed to write {len(passages)} buffered passages, retrying",
+                    exc_info=True,
+                )
+                time.sleep(self.retry_delay * 2**attempt)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Get the process wide passage buffer, configured from the settings."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = PassageBuffer(
+                max_size=settings.PASSAGE_BUFFER_MAX_SIZE,
+                max_delay_ms=settings.PASSAGE_BUFFER_MAX_DELAY_MS,
+                retries=settings.PASSAGE_BUFFER_RETRIES,
+            )
+            # make sure nothing is left behind when the worker stops
+            atexit.register(_buffer.flush)
+        return _buffer
@@ -0,0 +1,62 @@
+import logging
+
+from django.conf import settings
+from django.db import router
+from django.db.models.constants import OnConflict
+from django.db.models.sql import InsertQuery
+
+from .camera_cache import enrich_passages
+from .copy_writer import copy_passages
+from .models import Passage
+from .partitions import retry_missing_partition
+
+log = logging.getLogger(__name__)
+
+
+def insert_passages(passages):
+    """
+    Insert the given (unsaved) passages using a single multi-row INSERT.
+
+    Passages that conflict with an existing (passage_id, volgnummer,
+    passage_at) are skipped instead of failing the whole statement, the
+    caller can use the returned ids to find out which passages were
+    duplicates.
+
+    :param passages: List of unsaved Passage instances.
+
+    :return: Set with the primary keys (Passage.id) of the inserted passages.
+    """
+    if not passages:
+        return set()
+
+    opts = Passage._meta
+    enrich_passages(passages)
+
+    def insert():
+        query = InsertQuery(Passage, on_conflict=OnConflict.IGNORE)
+        query.insert_values(opts.concrete_fields, passages)
+        compiler = query.get_compiler(using=router.db_for_write(Passage))
+        return compiler.execute_sql(returning_fields=[opts.pk])
+
+    rows = retry_missing_partition(
+        insert, (passage.passage_at for passage in passages)
+    )
+    # a single-row insert which hit a conflict returns no row (None)
+    inserted = {row[0] for row in rows if row}
+    log.info(f"Inserted {len(inserted)} of {len(passages)} passages")
+    return inserted
+
+
+def write_passages(passages):
+    """
+    Write the given (unsaved) passages, skipping duplicates, using the writer
+    configured by settings.PASSAGE_BULK_WRITER ('insert' or 'copy').
+
+    :return: Set with the primary keys (Passage.id) of the inserted passages.
+    """
+    if settings.PASSAGE_BULK_WRITER == 'copy':
+        return retry_missing_partition(
+            lambda: copy_passages(passages, ignore_conflicts=True),
+            (passage.passage_at for passage in passages),
+        )
+    return insert_passages(passages)
@@ -0,0 +1,250 @@
+"""
+The camera information of the passages: the columns of the Camera helper
+table which the aggregations need (CAMERA_FIELDS), which are stored with the
+passages so the aggregations do not have to join the helper table.
+
+The information is added when the passages are written, using an in-process
+cache of the helper table. The cameras are looked up by (camera_naam,
+rijrichting, camera_kijkrichting). The cache is reloaded when the helper table
+is imported again, which adds a CameraVersion; every process checks the
+version at most once per settings.PASSAGE_CAMERA_CACHE_CHECK_SECONDS.
+
+The import also updates the recent passages of the cameras which changed
+(enrich_table, settings.PASSAGE_CAMERA_ENRICH_DAYS), the older passages and
+the passages written before the information existed are updated by the
+enrich_passages command. Until then, the aggregations of the days before the
+information was stored (get_enriched_since) take it from the helper table.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import increment
+from .models import Camera, CameraVersion
+
+log = logging.getLogger(__name__)
+
+CAMERA_FIELDS = [
+    'cordon',
+    'richting',
+    'rijrichting_correct',
+    'order_kaart',
+    'order_naam',
+]
+CAMERA_KEY = ['camera_naam', 'rijrichting', 'camera_kijkrichting']
+
+# the camera information of the passages of unknown cameras
+UNKNOWN = dict.fromkeys(CAMERA_FIELDS)
+
+# the camera information per camera key, the first camera (by id) is used of
+# duplicate cameras
+CAMERAS_QUERY = f"""
+    SELECT DISTINCT ON ({', '.join(CAMERA_KEY)})
+        {', '.join(CAMERA_KEY + CAMERA_FIELDS)}
+    FROM passage_camera
+    WHERE rijrichting IS NOT NULL
+    AND camera_kijkrichting IS NOT NULL
+    ORDER BY {', '.join(CAMERA_KEY)}, id
+"""
+
+
+def get_version():
+    """:return: The current version of the Camera helper table, or None."""
+    return CameraVersion.objects.order_by('-id').values_list('id', flat=True).first()
+
+
+def get_enriched_since():
+    """
+    :return: The (aware) datetime from which the passages are written with the
+        camera information, the creation of the first version (see migration
+        0047), or None.
+    """
+    versions = CameraVersion.objects.order_by('id')
+    return versions.values_list('created_at', flat=True).first()
+
+
+def add_version():
+    """
+    Add a version of the Camera helper table, which makes the camera caches
+    reload the table (after the transaction is committed).
+    """
+    return CameraVersion.objects.create().id
+
+
+def load_cameras():
+    """
+    :return: Dict with the camera information (CAMERA_FIELDS) per
+        (camera_naam, rijrichting, camera_kijkrichting). Cameras without
+        rijrichting or kijkrichting are skipped, and of duplicate cameras the
+        first (by id) is used.
+    """
+    cameras = {}
+    rows = (
+        Camera.objects.filter(
+            rijrichting__isnull=False, camera_kijkrichting__isnull=False
+        )
+        .order_by('id')
+        .values(*CAMERA_KEY, *CAMERA_FIELDS)
+    )
+    for row in rows:
+        key = tuple(row.pop(column) for column in CAMERA_KEY)
+        cameras.setdefault(key, row)
+    return cameras
+
+
+def get_changed_keys(old, new):
+    """
+    :param old: The cameras before an import, see load_cameras.
+    :param new: The cameras after the import.
+
+    :return: Sorted list of the keys of the cameras of which the information
+        changed, including the cameras which were added or removed.
+    """
+    return sorted(
+        key
+        for key in old.keys() | new.keys()
+        if old.get(key, UNKNOWN) != new.get(key, UNKNOWN)
+    )
+
+
+class CameraCache:
+    """
+    Process wide cache of the cameras, which is reloaded when the version of
+    the Camera helper table changes.
+    """
+
+    def __init__(self):
+        self._cameras = {}
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get_cameras(self):
+        """
+        :return: Dict with the camera information per (camera_naam,
+            rijrichting, camera_kijkrichting), see load_cameras.
+        """
+        with self._lock:
+            now = time.monotonic()
+            interval = settings.PASSAGE_CAMERA_CACHE_CHECK_SECONDS
+            if self._checked_at is None or now - self._checked_at >= interval:
+                version = get_version()
+                if self._checked_at is None or version != self._version:
+                    self._cameras = load_cameras()
+                    self._version = version
+                    increment('camera_cache_reloads')
+                    log.info(
+                        f"Loaded {len(self._cameras)} cameras (version {version})"
+                    )
+                self._checked_at = now
+            return self._cameras
+
+    def clear(self):
+        with self._lock:
+            self._cameras = {}
+            self._version = None
+            self._checked_at = None
+
+
+_cache = CameraCache()
+
+
+def get_cache():
+    return _cache
+
+
+def enrich_passage(passage, cameras):
+    """
+    Set the camera information (the CAMERA_FIELDS) of the given (unsaved)
+    Passage instance.
+
+    :param cameras: The cameras, see CameraCache.get_cameras.
+
+    :return: The passage.
+    """
+    key = tuple(getattr(passage, column) for column in CAMERA_KEY)
+    for field, value in cameras.get(key, UNKNOWN).items():
+        setattr(passage, field, value)
+    return passage
+
+
+def enrich_passages(passages):
+    """
+    Set the camera information of the given (unsaved) Passage instances.
+    """
+    cameras = _cache.get_cameras()
+    for passage in passages:
+        enrich_passage(passage, cameras)
+
+
+def enrich_data(data):
+    """
+    Add the camera information to the given (validated) passage data.
+    """
+    key = tuple(data.get(column) for column in CAMERA_KEY)
+    data.update(_cache.get_cameras().get(key, UNKNOWN))
+
+
+def enrich_table(table, keys=None):
+    """
+    Update the camera information of the passages in the given table (e.g. a
+    partition) to that of the Camera helper table. Only the passages of which
+    the information differs are updated.
+
+    :param keys: Optional list of the keys (camera_naam, rijrichting,
+        camera_kijkrichting) of the cameras to update the passages of.
+
+    :return: The number of updated passages.
+    """
+    if keys is not None and not keys:
+        return 0
+
+    key = ', '.join(f'p.{column}' for column in CAMERA_KEY)
+    camera_key = ', '.join(f'h.{column}' for column in CAMERA_KEY)
+    stored = ', '.join(f'p.{field}' for field in CAMERA_FIELDS)
+    camera = ', '.join(f'h.{field}' for field in CAMERA_FIELDS)
+    where = ''
+    params = []
+    if keys is not None:
+        where = (
+            f"AND ({key}) IN "
+            "(SELECT * FROM unnest(%s::varchar[], %s::int[], %s::float8[]))"
+        )
+        params = [list(values) for values in zip(*keys)]
+
+    with connection.cursor() as cursor:
+        # the passages of the known cameras
+        cursor.execute(
+            f"""
+            UPDATE {table} AS p
+            SET ({', '.join(CAMERA_FIELDS)}) = ({camera})
+            FROM ({CAMERAS_QUERY}) AS h
+            WHERE ({key}) = ({camera_key})
+            AND ({stored}) IS DISTINCT FROM ({camera})
+            {where}
+            """,
+            params,
+        )
+        updated = cursor.rowcount
+
+        # the passages of the unknown (e.g. removed) cameras
+        cursor.execute(
+            f"""
+            UPDATE {table} AS p
+            SET {', '.join(f'{field} = NULL' for field in CAMERA_FIELDS)}
+            WHERE ({' OR '.join(f'p.{field} IS NOT NULL' for field in CAMERA_FIELDS)})
+            AND NOT EXISTS (
+                SELECT 1 FROM ({CAMERAS_QUERY}) AS h
+                WHERE ({key}) = ({camera_key})
+            )
+            {where}
+            """,
+            params,
+        )
+        updated += cursor.rowcount
+
+    log.info(f"Updated the camera information of {updated} passages of {table}")
+    return updated
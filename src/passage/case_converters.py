@@ -1,8 +1,14 @@
 import re
+from functools import lru_cache
 
 first_cap_re = re.compile('(.)([A-Z][a-z]+)')
 all_cap_re = re.compile('([a-z0-9])([A-Z])')
 
+# The number of converted keys to remember, the (v2) schema only has about 50
+# different keys so this leaves plenty of room for unknown keys.
+CACHE_SIZE = 1024
+
+
 def to_snakecase(camel_str):
     s1 = first_cap_re.sub(r'\1_\2', camel_str)
     return all_cap_re.sub(r'\1_\2', s1).lower()
@@ -11,4 +17,16 @@ def to_camelcase(snake_str):
     components = snake_str.split('_')
     # We capitalize the first letter of each component except the first one
     # with the 'title' method and join them together.
-    return components[0] + ''.join(x.title() for x in components[1:])
\ No newline at end of file
+    return components[0] + ''.join(x.title() for x in components[1:])
+
+
+# Memoised versions of the converters, use ``.cache_info()`` for the number of
+# hits and misses.
+to_snakecase_cached = lru_cache(maxsize=CACHE_SIZE)(to_snakecase)
+to_camelcase_cached = lru_cache(maxsize=CACHE_SIZE)(to_camelcase)
+
+
+def seed_snakecase_cache(keys):
+    """Pre-seed the to_snakecase cache with the given (camelcase) keys."""
+    for key in keys:
+        to_snakecase_cached(key)
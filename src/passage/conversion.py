@@ -4,6 +4,9 @@ from datetime import date
 
 from django.contrib.gis.geos import GEOSGeometry
 
+from .case_converters import to_snakecase_cached
+from .util import keymap_snakecase
+
 NEW_FIELDS = [
     'kenteken_hash',
     'massa_ledig_voertuig',
@@ -22,6 +25,60 @@ NEW_FIELDS = [
 ]
 
 
+# All (camelcase) keys of the v2 payload, see docs/api_spec_1.0.4.yml
+V2_KEYS = [
+    'aantalAssen',
+    'aantalStaanplaatsen',
+    'aantalWielen',
+    'aantalZitplaatsen',
+    'automatischVerwerkbaar',
+    'betrouwbaarheid',
+    'brandstoffen',
+    'breedte',
+    'camera',
+    'co2UitstootGecombineerd',
+    'co2UitstootGewogen',
+    'emissieklasse',
+    'europeseVoertuigcategorie',
+    'europeseVoertuigcategorieToevoeging',
+    'handelsbenaming',
+    'id',
+    'indicatieSnelheid',
+    'inrichting',
+    'jaarEersteToelating',
+    'karaktersBetrouwbaarheid',
+    'kenteken',
+    'kentekenBetrouwbaarheid',
+    'kentekenHash',
+    'kijkrichting',
+    'landcode',
+    'landcodeBetrouwbaarheid',
+    'latitude',
+    'lengte',
+    'locatie',
+    'longitude',
+    'massaLedigVoertuig',
+    'maximaleConstructiesnelheidBromSnorfiets',
+    'maximumMassaTrekkenGeremd',
+    'maximumMassaTrekkenOngeremd',
+    'merk',
+    'milieuklasseEgGoedkeuringZwaar',
+    'naam',
+    'positie',
+    'rijrichting',
+    'rijstrook',
+    'straat',
+    'taxiIndicator',
+    'timestamp',
+    'toegestaneMaximumMassaVoertuig',
+    'version',
+    'versitKlasse',
+    'voertuig',
+    'voertuigSoort',
+    'volgnummer',
+]
+
+
 RIJRICHTING_MAPPING = {'VAN': 1, 'NAAR': -1}
 RIJRICHTING_MAPPING_INVERSE = {value: key for key, value in RIJRICHTING_MAPPING.items()}
 
@@ -97,3 +154,89 @@ def convert_to_v1(passage):
     )
 
     return passage_v1
+
+
+def _snakecase(value):
+    # the same as keymap(to_snakecase, ...), but only for a single level
+    if isinstance(value, dict):
+        return {to_snakecase_cached(key): item for key, item in value.items()}
+    return value
+
+
+def _remainder(dictionary):
+    # the remaining (unmapped) items, nested dictionaries are snakecased
+    return {
+        key: keymap_snakecase(value) if isinstance(value, dict) else value
+        for key, value in dictionary.items()
+    }
+
+
+def normalize_v2(payload):
+    """
+    Convert the given (camelcase) v2 payload to the flat, snakecase, data
+    expected by the serializer, in a single pass over the document.
+
+    The result is the same as ``convert_to_v1(keymap(to_snakecase, payload))``,
+    but each (nested) dictionary is only snakecased once (one level at a time)
+    and the fields are taken from these new dictionaries, so the payload
+    does not have to be (deep)copied.
+
+    :param payload: The passage payload (keys in camelcase).
+    :return: Dictionary with the payload converted to 'version 1' format.
+    """
+    passage = _snakecase(payload)
+    camera = _snakecase(passage['camera'])
+    camera_location = _snakecase(camera.pop('locatie', {}))
+    vehicle = _snakecase(passage['voertuig'])
+    number_plate = _snakecase(vehicle.pop('kenteken', {}))
+    betrouwbaarheid = _snakecase(number_plate.pop('betrouwbaarheid', {}))
+    fuels = vehicle.pop('brandstoffen', [])
+    fuel_names = {fuel['naam'] for fuel in fuels or []}
+
+    datum_eerste_toelating = date(vehicle.pop('jaar_eerste_toelating'), 1, 1) \
+        if 'jaar_eerste_toelating' in vehicle else None
+
+    rijrichting = passage.get('rijrichting')
+    if 'latitude' in camera_location and 'longitude' in camera_location:
+        camera_locatie = {
+            "type": "Point",
+            "coordinates": [camera_location['latitude'], camera_location['longitude']]
+        }
+    else:
+        camera_locatie = None
+
+    return dict(
+        # passage properties
+        id=passage['id'],
+        volgnummer=passage['volgnummer'],
+        automatisch_verwerkbaar=passage.get('automatisch_verwerkbaar'),
+        indicatie_snelheid=vehicle.pop('indicatie_snelheid', None),
+        passage_at=passage['timestamp'],
+        version='passage-v2',
+        kenteken_land_betrouwbaarheid=betrouwbaarheid.get('landcode_betrouwbaarheid'),
+        kenteken_nummer_betrouwbaarheid=betrouwbaarheid.get('kenteken_betrouwbaarheid'),
+        kenteken_karakters_betrouwbaarheid=betrouwbaarheid.get('karakters_betrouwbaarheid'),
+        # vehicle properties
+        kenteken_land=number_plate.pop('landcode', None),
+        diesel=int('Diesel' in fuel_names) if fuel_names else None,
+        gasoline=int('Benzine' in fuel_names) if fuel_names else None,
+        electric=int('Elektriciteit' in fuel_names) if fuel_names else None,
+        datum_eerste_toelating=datum_eerste_toelating,
+        extra_data=None,
+        maximale_constructie_snelheid_bromsnorfiets=vehicle.pop('maximale_constructiesnelheid_brom_snorfiets', None),
+        brandstoffen=[
+            dict(brandstof=fuel['naam'], **{k: v for k, v in fuel.items() if k != 'naam'})
+            for fuel in fuels
+        ],
+        datum_tenaamstelling=None,
+        **_remainder(vehicle),
+        **_remainder(number_plate),
+        # camera properties
+        camera_id=camera.pop('id'),
+        camera_naam=camera.pop('naam', None),
+        camera_kijkrichting=camera.pop('kijkrichting', None),
+        camera_locatie=camera_locatie,
+        rijstrook=passage.get('rijstrook'),
+        rijrichting=RIJRICHTING_MAPPING[rijrichting] if rijrichting else None,
+        **_remainder(camera),
+    )
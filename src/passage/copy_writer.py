@@ -0,0 +1,189 @@
+import csv
+import json
+import logging
+
+from django.contrib.gis.geos import GEOSGeometry
+from django.db import connections, router, transaction
+
+from .camera_cache import enrich_passage, get_cache
+from .models import Passage
+
+log = logging.getLogger(__name__)
+
+# The columns (in order) of the rows that are written using COPY
+FIELDS = Passage._meta.concrete_fields
+COLUMNS = [field.column for field in FIELDS]
+
+NULL = r'\N'
+
+
+def _format_geometry(field, value):
+    if not isinstance(value, GEOSGeometry):
+        value = GEOSGeometry(json.dumps(value) if isinstance(value, dict) else value)
+    if value.srid is None:
+        value = value.clone()
+        value.srid = field.srid
+    # hex encoded EWKB is accepted as geometry input by PostGIS, and (unlike
+    # WKT) does not lose any precision.
+    return value.hexewkb.decode()
+
+
+def _format_json(field, value):
+    return json.dumps(value, cls=field.encoder)
+
+
+def _format_boolean(field, value):
+    return 't' if value else 'f'
+
+
+def _format_date(field, value):
+    return value.isoformat()
+
+
+def _format_datetime(field, value):
+    # get_prep_value converts to UTC, which is what the (timezone naive)
+    # DateTimeUTCField columns hold.
+    return field.get_prep_value(value).isoformat()
+
+
+def _format_str(field, value):
+    return str(value)
+
+
+FORMATTERS = {
+    'BooleanField': _format_boolean,
+    'DateField': _format_date,
+    'DateTimeField': _format_datetime,
+    'JSONField': _format_json,
+}
+
+
+def _get_formatter(field):
+    if hasattr(field, 'geom_type'):
+        return _format_geometry
+    return FORMATTERS.get(field.get_internal_type(), _format_str)
+
+
+_formatters = [(field, _get_formatter(field)) for field in FIELDS]
+
+
+def format_row(row):
+    """
+    Format a row (tuple of python values, ordered as COLUMNS) to the values
+    expected by COPY in csv format.
+    """
+    return [
+        NULL if value is None else formatter(field, value)
+        for (field, formatter), value in zip(_formatters, row)
+    ]
+
+
+def passage_to_row(passage):
+    """
+    Convert an (unsaved) Passage instance to a row ordered as COLUMNS. Fields
+    with automatically generated values (e.g. created_at) are populated.
+    """
+    return tuple(field.pre_save(passage, True) for field in FIELDS)
+
+
+class _CSVReader:
+    """
+    File-like object which lazily formats the given rows as csv, COPY reads
+    from this object so the rows are never all held in memory as text.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.count = 0
+        self._buffer = []
+        self._size = 0
+        self._writer = csv.writer(self)
+
+    def write(self, value):
+        self._buffer.append(value)
+        self._size += len(value)
+
+    def read(self, size=-1):
+        while size < 0 or self._size < size:
+            try:
+                row = next(self.rows)
+            except StopIteration:
+                break
+            self._writer.writerow(format_row(row))
+            self.count += 1
+
+        data = ''.join(self._buffer)
+        self._buffer.clear()
+        self._size = 0
+        return data
+
+
+def _copy_sql(table):
+    columns = ', '.join(COLUMNS)
+    return f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+
+
+def copy_rows(rows, table=Passage._meta.db_table, using=None):
+    """
+    Stream the given rows into ``table`` using ``COPY ... FROM STDIN``.
+
+    Note that COPY fails completely when a single row violates a constraint
+    (e.g. a duplicate passage), use ``copy_passages(ignore_conflicts=True)``
+    when duplicates are to be expected.
+
+    :param rows: Iterable of tuples, ordered as COLUMNS.
+    :param table: Name of the table to copy into, defaults to passage_passage.
+    :param using: Database alias to use.
+
+    :return: Number of copied rows.
+    """
+    using = using or router.db_for_write(Passage)
+    reader = _CSVReader(rows)
+    with connections[using].cursor() as cursor:
+        cursor.copy_expert(_copy_sql(table), reader)
+    log.info(f"Copied {reader.count} rows into {table}")
+    return reader.count
+
+
+def copy_passages(passages, ignore_conflicts=False, using=None):
+    """
+    Write the given (unsaved) passages using COPY. The camera information of
+    the passages is set while they are written.
+
+    :param passages: Iterable of unsaved Passage instances.
+    :param ignore_conflicts: When True, the passages are copied into a
+        temporary table first and inserted from there, skipping passages that
+        already exist.
+    :param using: Database alias to use.
+
+    :return: The number of copied passages, or, when ignoring conflicts, the
+        set with the primary keys of the inserted passages.
+    """
+    cameras = get_cache().get_cameras()
+    rows = (passage_to_row(enrich_passage(passage, cameras)) for passage in passages)
+    if not ignore_conflicts:
+        return copy_rows(rows, using=using)
+
+    using = using or router.db_for_write(Passage)
+    table = Passage._meta.db_table
+    columns = ', '.join(COLUMNS)
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            # the table of a previous call in the same (outer) transaction
+            # still exists
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {table}_copy "
+                f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.execute(f"TRUNCATE {table}_copy")
+        copy_rows(rows, table=f'{table}_copy', using=using)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {columns} FROM {table}_copy "
+                f"ON CONFLICT DO NOTHING RETURNING {Passage._meta.pk.column}"
+            )
+            inserted = {row[0] for row in cursor.fetchall()}
+
+    log.info(f"Inserted {len(inserted)} passages")
+    return inserted
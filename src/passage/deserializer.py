@@ -0,0 +1,231 @@
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from django.core.validators import (
+    MaxLengthValidator,
+    MaxValueValidator,
+    MinValueValidator,
+    ProhibitNullCharactersValidator,
+)
+from rest_framework import fields as drf_fields
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty, get_error_detail
+from rest_framework.validators import ProhibitSurrogateCharactersValidator
+
+from .copy_writer import FIELDS
+from .models import Passage
+from .serializers import PassageDetailSerializer
+
+
+def _has_only_validators(field, *types):
+    return all(isinstance(validator, types) for validator in field.validators)
+
+
+def _compile_char(field):
+    if not _has_only_validators(
+        field,
+        MaxLengthValidator,
+        ProhibitNullCharactersValidator,
+        ProhibitSurrogateCharactersValidator,
+    ) or not field.trim_whitespace or field.min_length is not None:
+        return field.run_validation
+
+    max_length = field.max_length or float('inf')
+    run_validation = field.run_validation
+
+    def coerce(value):
+        # ascii strings can not contain surrogate characters
+        if type(value) is str:
+            value = value.strip()
+            if (
+                value
+                and len(value) <= max_length
+                and value.isascii()
+                and '\x00' not in value
+            ):
+                return value
+        return run_validation(value)
+
+    return coerce
+
+
+def _compile_integer(field):
+    if not _has_only_validators(field, MaxValueValidator, MinValueValidator):
+        return field.run_validation
+
+    min_value = float('-inf') if field.min_value is None else field.min_value
+    max_value = float('inf') if field.max_value is None else field.max_value
+    run_validation = field.run_validation
+
+    def coerce(value):
+        if type(value) is int and min_value <= value <= max_value:
+            return value
+        return run_validation(value)
+
+    return coerce
+
+
+def _compile_float(field):
+    if field.validators:
+        return field.run_validation
+
+    run_validation = field.run_validation
+
+    def coerce(value):
+        if type(value) is float or type(value) is int:
+            return float(value)
+        return run_validation(value)
+
+    return coerce
+
+
+def _compile_boolean(field):
+    if field.validators:
+        return field.run_validation
+
+    run_validation = field.run_validation
+
+    def coerce(value):
+        if value is True or value is False:
+            return value
+        return run_validation(value)
+
+    return coerce
+
+
+COMPILERS = {
+    drf_fields.CharField: _compile_char,
+    drf_fields.IntegerField: _compile_integer,
+    drf_fields.FloatField: _compile_float,
+    drf_fields.BooleanField: _compile_boolean,
+}
+
+
+def _compile(field):
+    """
+    Compile a coerce function for the given serializer field. The compiled
+    function handles the common, valid, values (e.g. an int in range for an
+    IntegerField) inline and falls back to the field itself for everything
+    else, so errors and edge cases are handled exactly like the serializer.
+    Fields without a compiler (dates, uuids, json, geometry) always use the
+    field itself.
+    """
+    coerce = field.run_validation
+    compiler = COMPILERS.get(type(field))
+    if compiler is not None:
+        coerce = compiler(field)
+
+    def run(value):
+        if value is None:
+            # the same as Field.validate_empty_values
+            if not field.allow_null:
+                field.fail('null')
+            return None
+        return coerce(value)
+
+    return run
+
+
+class PassageDeserializer:
+    """
+    Fast-path alternative for PassageDetailSerializer.run_validation, which
+    deserializes a (snakecase) passage payload straight into a tuple which is
+    ready to be inserted (ordered as copy_writer.COLUMNS).
+
+    The serializer fields are constructed only once, and the coercion of the
+    simple (string, number, boolean) fields is compiled to plain functions.
+    The privacy rules (the validate_* methods of the serializer) are applied
+    by the serializer itself, so both paths always result in the same data.
+    """
+
+    def __init__(self):
+        self._serializer = serializer = PassageDetailSerializer()
+        self.validate = serializer.validate
+
+        self._fields = []
+        for field in serializer._writable_fields:
+            if field.read_only:
+                continue
+            validate_method = getattr(serializer, f'validate_{field.field_name}', None)
+            self._fields.append(
+                (field.field_name, field.source, field, _compile(field), validate_method)
+            )
+
+        # (attname, default) per column, a callable default (e.g. the uuid of
+        # the primary key) is called per row.
+        self._columns = []
+        for model_field in FIELDS:
+            if getattr(model_field, 'auto_now_add', False):
+                default = timezone.now
+            elif model_field.has_default() and callable(model_field.default):
+                default = model_field.default
+            else:
+                default = model_field.get_default()
+            self._columns.append((model_field.attname, default))
+
+    def to_internal_value(self, data):
+        """
+        Validate the given data, and apply the privacy rules.
+
+        :return: Dict with the validated data, keyed by model field.
+        :raises ValidationError: With the same errors as the serializer.
+        """
+        if not isinstance(data, Mapping):
+            # raises the error for the invalid data
+            return self._serializer.run_validation(data)
+
+        validated_data = {}
+        errors = {}
+        for name, source, field, coerce, validate_method in self._fields:
+            value = data.get(name, empty)
+            try:
+                if value is empty:
+                    # raises the 'required' error or SkipField
+                    value = field.run_validation(value)
+                else:
+                    value = coerce(value)
+                if validate_method is not None:
+                    value = validate_method(value)
+            except ValidationError as exc:
+                errors[name] = exc.detail
+            except DjangoValidationError as exc:
+                errors[name] = get_error_detail(exc)
+            except SkipField:
+                pass
+            else:
+                validated_data[source] = value
+
+        if errors:
+            raise ValidationError(errors)
+
+        return self.validate(validated_data)
+
+    def to_row(self, data):
+        """
+        Deserialize the given data to a tuple ordered as copy_writer.COLUMNS,
+        which can be written using COPY or turned into a Passage using
+        ``Passage(*row)``.
+        """
+        validated_data = self.to_internal_value(data)
+        return tuple(
+            validated_data[attname]
+            if attname in validated_data
+            else default() if callable(default) else default
+            for attname, default in self._columns
+        )
+
+    def to_passage(self, data):
+        """Deserialize the given data to an unsaved Passage."""
+        return Passage(*self.to_row(data))
+
+
+_deserializer = None
+
+
+def get_deserializer():
+    """Get the (lazily constructed) process wide PassageDeserializer."""
+    global _deserializer
+    if _deserializer is None:
+        _deserializer = PassageDeserializer()
+    return _deserializer
@@ -0,0 +1,328 @@
+"""
+Streaming export of (large) query results as CSV, NDJSON or Parquet.
+
+The rows are read from a server-side cursor, ``fetch_size`` rows at a time,
+and written into chunks of about CHUNK_SIZE bytes, which keeps the memory
+usage constant and the number of chunks passed to the (streaming) response
+small.
+
+CSV can also be produced by Postgres itself (COPY ... TO STDOUT), in which
+case Python only passes the chunks on.
+
+Parquet is written using pyarrow, with an explicit schema derived from the
+model fields of the columns (get_arrow_schema).
+"""
+import csv
+import io
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django_datetime_utc.fields import DateTimeUTCField
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+PARQUET = 'parquet'
+
+CONTENT_TYPES = {
+    CSV: 'text/csv',
+    NDJSON: 'application/x-ndjson',
+    PARQUET: 'application/vnd.apache.parquet',
+}
+FORMATS = list(CONTENT_TYPES)
+
+
+def queryset_rows(queryset, fields, fetch_size=None):
+    """
+    :return: Tuple with the column names and an iterator of the rows (tuples)
+        of the given fields of the queryset, read using a server-side cursor.
+    """
+    fetch_size = fetch_size or settings.EXPORT_FETCH_SIZE
+    return list(fields), queryset.values_list(*fields).iterator(
+        chunk_size=fetch_size
+    )
+
+
+def query_rows(query, params=None, fetch_size=None, using='default'):
+    """
+    Execute the given (raw) query using a named server-side cursor.
+
+    :return: Tuple with the column names and an iterator of the rows.
+    """
+    fetch_size = fetch_size or settings.EXPORT_FETCH_SIZE
+    connection = connections[using]
+    connection.ensure_connection()
+    cursor = connection.chunked_cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchmany(fetch_size)
+    columns = [column.name for column in cursor.description]
+
+    def iterate(rows):
+        try:
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany(fetch_size)
+        finally:
+            cursor.close()
+
+    return columns, iterate(rows)
+
+
+def copy_csv(query, params=None, using='default'):
+    """
+    Stream the result of the given query as CSV (with header) using
+    ``COPY (query) TO STDOUT``.
+
+    Postgres formats the CSV. The output of COPY is written by psycopg2 into a
+    pipe (from a separate thread), from which it is read in chunks of
+    CHUNK_SIZE bytes, so there is no per-row work in Python.
+
+    :return: Iterator of the chunks (bytes) of the CSV.
+    """
+    connection = connections[using]
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(query, params).decode()
+    copy = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    errors = []
+
+    def write(write_fd):
+        try:
+            with os.fdopen(write_fd, 'wb', buffering=CHUNK_SIZE) as f:
+                with connection.connection.cursor() as cursor:
+                    cursor.copy_expert(copy, f)
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        read_fd, write_fd = os.pipe()
+        thread = threading.Thread(
+            target=write, args=(write_fd,), name='copy-csv', daemon=True
+        )
+        thread.start()
+        with os.fdopen(read_fd, 'rb') as f:
+            try:
+                while chunk := f.read(CHUNK_SIZE):
+                    yield chunk
+            except GeneratorExit:
+                # the reader stopped (e.g. the client disconnected): cancel the
+                # query and discard what is still written, so the COPY ends
+                # properly and the connection remains usable
+                connection.connection.cancel()
+                while f.read(CHUNK_SIZE):
+                    pass
+                thread.join()
+                return
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    return read()
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_csv(columns, rows, **fmtparams):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, **fmtparams)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_ndjson(columns, rows):
+    encoder = DjangoJSONEncoder()
+    lines = []
+    size = 0
+    for row in rows:
+        line = encoder.encode(dict(zip(columns, row)))
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+            size = 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+class _ParquetSink(io.RawIOBase):
+    """File-like object which collects the bytes written by pyarrow."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _to_arrow(value):
+    # values which arrow cannot convert itself (e.g. json, uuid, geometry)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value
+    return str(value)
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return str(value)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured('The parquet export requires pyarrow')
+    return pyarrow, pyarrow.parquet
+
+
+def get_arrow_schema(model, columns, **sources):
+    """
+    :param sources: The names of the model fields of the columns which are
+        named differently, e.g. ``sum='count'``.
+
+    :return: The (arrow) schema of the given columns of the model. The columns
+        of types without arrow equivalent (uuid, json, geometry) are text, the
+        timestamps of DateTimeUTCFields are naive (UTC), like in the database.
+    """
+    pa, _ = _import_pyarrow()
+    types = {
+        'AutoField': pa.int32(),
+        'BigAutoField': pa.int64(),
+        'BigIntegerField': pa.int64(),
+        'BooleanField': pa.bool_(),
+        'DateField': pa.date32(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+        'FloatField': pa.float64(),
+        'IntegerField': pa.int32(),
+        'PositiveIntegerField': pa.int32(),
+        'PositiveSmallIntegerField': pa.int16(),
+        'SmallIntegerField': pa.int16(),
+    }
+    fields = {field.column: field for field in model._meta.concrete_fields}
+    schema = []
+    for column in columns:
+        field = fields[sources.get(column, column)]
+        if isinstance(field, DateTimeUTCField):
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = types.get(field.get_internal_type(), pa.string())
+        schema.append(pa.field(column, arrow_type))
+    return pa.schema(schema)
+
+
+def write_parquet(columns, rows, schema, row_group_size=None, compression='snappy'):
+    """
+    Write the rows as Parquet with the given schema (see get_arrow_schema), one
+    row group per ``row_group_size`` rows.
+    """
+    pa, pq = _import_pyarrow()
+    row_group_size = row_group_size or settings.EXPORT_FETCH_SIZE
+    convert = [
+        _to_text if pa.types.is_string(field.type) else _to_arrow for field in schema
+    ]
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    for batch in _batches(rows, row_group_size):
+        data = {
+            column: [convert[i](row[i]) for row in batch]
+            for i, column in enumerate(columns)
+        }
+        writer.write_table(pa.Table.from_pydict(data, schema=schema))
+        yield sink.pop()
+    writer.close()
+    yield sink.pop()
+
+
+WRITERS = {
+    CSV: write_csv,
+    NDJSON: write_ndjson,
+    PARQUET: write_parquet,
+}
+
+
+def export(columns, rows, export_format=CSV, schema=None):
+    """
+    :param schema: The (arrow) schema of the rows, required for Parquet.
+
+    :return: Iterator of the chunks (str, or bytes for Parquet) of the rows
+        in the given format.
+    """
+    try:
+        writer = WRITERS[export_format]
+    except KeyError:
+        raise ValueError(f'Unknown export format {export_format!r}')
+    if export_format == PARQUET:
+        if schema is None:
+            raise ValueError('The parquet export requires a schema')
+        return writer(columns, rows, schema)
+    return writer(columns, rows)
+
+
+def download_response(filename, chunks, export_format=CSV):
+    """
+    :return: A StreamingHttpResponse which downloads the chunks as file.
+    """
+    response = StreamingHttpResponse(
+        chunks, content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = (
+        f"attachment; filename={filename}.{export_format}"
+    )
+    return response
+
+
+def export_response(filename, columns, rows, export_format=CSV, schema=None):
+    """
+    :return: A StreamingHttpResponse which downloads the rows as file.
+    """
+    return download_response(
+        filename, export(columns, rows, export_format, schema), export_format
+    )
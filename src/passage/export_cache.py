@@ -0,0 +1,173 @@
+"""
+Cache of the exports (of the hour aggregation) of whole weeks.
+
+The export of a closed week only changes when the hour aggregation of one of
+its days is recalculated, which invalidates the cached exports of that week
+(see invalidate_week). The cache keys contain the version of the week, which
+is stored in the database (ExportVersion), so the invalidation by the
+aggregation (in its own container) is seen by every API process, whatever
+their cache. The exports are cached gzip compressed, and sent as is to the
+clients which accept gzip.
+"""
+import gzip
+import hashlib
+import io
+import logging
+import time
+from datetime import date, timedelta
+
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .export import CHUNK_SIZE, CONTENT_TYPES
+from .models import ExportVersion
+
+log = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'export'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_week_key(year, week):
+    """
+    :return: The cache key of the export of the given year and (ISO) week, as
+        filtered on the year and week of the hour aggregation.
+    """
+    return f'week:{year}:{week}'
+
+
+def get_monday_key(monday):
+    """
+    :return: The cache key of the export of the week starting at the given
+        monday (the default export of the previous week).
+    """
+    return f'monday:{monday:%Y-%m-%d}'
+
+
+def get_week_end(year, week):
+    """
+    :return: The last day of the hour aggregations with the given year and
+        week, or None if there is no such week. Note that the year is the
+        calendar year, so (the end of) week 1 can be in the next ISO year.
+    """
+    try:
+        if week == 1:
+            return date.fromisocalendar(year + 1, 1, 7)
+        return date.fromisocalendar(year, week, 7)
+    except ValueError:
+        return None
+
+
+def is_closed(last_day):
+    return last_day is not None and last_day < date.today()
+
+
+def get_version(key):
+    """
+    :return: The version of the export with the given key (0 if it has never
+        been invalidated).
+    """
+    version = (
+        ExportVersion.objects.filter(key=key).values_list('version', flat=True).first()
+    )
+    return version or 0
+
+
+def invalidate_week(day):
+    """
+    Invalidate the cached exports of the week of the given day, by incrementing
+    its versions. Call it in the transaction which recalculates the day, so the
+    new version is visible together with the new aggregations.
+    """
+    monday = day - timedelta(days=day.weekday())
+    keys = [get_week_key(day.year, day.isocalendar()[1]), get_monday_key(monday)]
+    with connection.cursor() as cursor:
+        for key in keys:
+            cursor.execute(
+                """
+                INSERT INTO passage_exportversion (key, version, updated_at)
+                VALUES (%s, 1, now())
+                ON CONFLICT (key) DO UPDATE SET
+                    version = passage_exportversion.version + 1,
+                    updated_at = now()
+                """,
+                [key],
+            )
+    log.debug(f"Invalidated the cached exports of the week of {day}")
+
+
+def _accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+def _decompress(content):
+    with gzip.GzipFile(fileobj=io.BytesIO(content)) as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+def _cache_chunks(key, chunks):
+    """
+    Pass on the chunks, and cache them (compressed) once they are all sent.
+    """
+    started = time.time()
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+        for chunk in chunks:
+            yield chunk
+            f.write(chunk.encode() if isinstance(chunk, str) else chunk)
+
+    content = buffer.getvalue()
+    etag = f'"{hashlib.md5(content).hexdigest()}"'
+    get_cache().set(key, (etag, int(started), content))
+    log.info(f"Cached the export {key} ({len(content)} bytes)")
+
+
+def cached_download_response(request, key, filename, export_format, get_chunks):
+    """
+    :param key: The cache key of the week, see get_week_key and get_monday_key.
+    :param get_chunks: Function which returns the chunks of the export, called
+        when it is not cached.
+
+    :return: A response which downloads the cached export, a 304 (not
+        modified) response if the client has the cached export already, or a
+        StreamingHttpResponse which downloads (and caches) the export.
+    """
+    # an export of an older version of the week is never read again (an
+    # export which is invalidated while it is downloaded is cached as such)
+    cache_key = f'{key}:{get_version(key)}:{export_format}'
+    entry = get_cache().get(cache_key)
+    if entry is None:
+        response = StreamingHttpResponse(
+            _cache_chunks(cache_key, get_chunks()),
+            content_type=CONTENT_TYPES[export_format],
+        )
+    else:
+        etag, last_modified, content = entry
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+
+        if _accepts_gzip(request):
+            response = HttpResponse(content, content_type=CONTENT_TYPES[export_format])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = StreamingHttpResponse(
+                _decompress(content), content_type=CONTENT_TYPES[export_format]
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+
+    response['Content-Disposition'] = (
+        f"attachment; filename={filename}.{export_format}"
+    )
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
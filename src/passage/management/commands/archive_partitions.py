@@ -0,0 +1,30 @@
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from passage.archive import archive_partitions
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive the cold passage partitions to (compressed) Parquet files and '
+        'drop them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.PASSAGE_ARCHIVE_AFTER_DAYS,
+            help='Archive the partitions of the days before this number of days ago',
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_partitions(date.today() - timedelta(days=options['days']))
+        for day, count in archived.items():
+            self.stdout.write(f'Archived {day:%Y-%m-%d}: {count} passages')
+        self.stdout.write(self.style.SUCCESS(f'Archived {len(archived)} partitions'))
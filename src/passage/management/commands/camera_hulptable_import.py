@@ -11,6 +11,14 @@ from django.db import transaction
 from django.apps import apps
 from django.db import connection
 
+from passage.camera_cache import (
+    add_version,
+    enrich_table,
+    get_changed_keys,
+    load_cameras,
+)
+from passage.partitions import get_partition_days, partition_name
+
 log = logging.getLogger(__name__)
 
 
@@ -22,6 +30,7 @@ class Command(BaseCommand):
             settings.BASE_DIR, 'passage', 'helpertable.csv'
         )
         with transaction.atomic():
+            cameras = load_cameras()
             CameraModel.objects.all().delete()
 
             with open(helper_table_csv_path, newline='') as csvfile:
@@ -63,4 +72,27 @@ class Command(BaseCommand):
 
                     inserts.append(CameraModel(**row))
 
-            CameraModel.objects.bulk_create(inserts)
\ No newline at end of file
+            CameraModel.objects.bulk_create(inserts)
+            # make the camera caches reload the cameras
+            add_version()
+            changed = get_changed_keys(cameras, load_cameras())
+
+        # update the camera information of the recent passages of the cameras
+        # which changed, one partition at a time (after the import). The
+        # aggregations of their days are only updated once these are
+        # aggregated again.
+        self.stdout.write(f'{len(changed)} cameras changed')
+        oldest = date.today() - timedelta(days=settings.PASSAGE_CAMERA_ENRICH_DAYS)
+        for day in get_partition_days():
+            if day < oldest:
+                continue
+            name = partition_name(day)
+            with transaction.atomic():
+                updated = enrich_table(name, changed)
+            if updated:
+                self.stdout.write(f'Updated {updated} passages of {name}')
+        if changed:
+            self.stdout.write(
+                'The passages before '
+                f'{oldest} are updated by enrich_passages --to-date {oldest}'
+            )
@@ -0,0 +1,47 @@
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from passage.camera_cache import enrich_table
+from passage.partitions import get_partitions, partition_name
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Update the camera information of the passages to the Camera helper '
+        'table, one partition at a time, e.g. for the passages which were '
+        'written before it was stored'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-date',
+            type=datetime.date.fromisoformat,
+            help='Only update the partitions from this date',
+        )
+        parser.add_argument(
+            '--to-date',
+            type=datetime.date.fromisoformat,
+            help='Only update the partitions until (excluding) this date',
+        )
+
+    def handle(self, *args, **options):
+        names = list(get_partitions())
+        if options['from_date']:
+            first = partition_name(options['from_date'])
+            names = [name for name in names if name >= first]
+        if options['to_date']:
+            last = partition_name(options['to_date'])
+            names = [name for name in names if name < last]
+
+        total = 0
+        for name in names:
+            with transaction.atomic():
+                updated = enrich_table(name)
+            self.stdout.write(f'Updated {updated} passages of {name}')
+            total += updated
+        self.stdout.write(self.style.SUCCESS(f'Updated {total} passages'))
@@ -0,0 +1,147 @@
+import datetime
+import itertools
+import logging
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from passage.archive import archive_rows, get_archived_days
+from passage.export import (
+    CSV,
+    FORMATS,
+    PARQUET,
+    export,
+    get_arrow_schema,
+    query_rows,
+)
+from passage.models import Passage
+from passage.partitions import partition_name
+
+log = logging.getLogger(__name__)
+
+# the fields of the passages which are exported by default (the fields of the
+# data requests)
+DEFAULT_FIELDS = [
+    'id',
+    'passage_at',
+    'created_at',
+    'version',
+    'straat',
+    'rijrichting',
+    'rijstrook',
+    'camera_id',
+    'camera_naam',
+    'camera_kijkrichting',
+    'camera_locatie',
+    'kenteken_land',
+    'kenteken_nummer_betrouwbaarheid',
+    'kenteken_land_betrouwbaarheid',
+    'kenteken_karakters_betrouwbaarheid',
+    'automatisch_verwerkbaar',
+    'voertuig_soort',
+    'inrichting',
+    'toegestane_maximum_massa_voertuig',
+    'europese_voertuigcategorie',
+    'europese_voertuigcategorie_toevoeging',
+    'brandstoffen',
+    'extra_data',
+    'diesel',
+    'gasoline',
+    'electric',
+    'indicatie_snelheid',
+]
+
+
+def export_day(day, path, fields, camera_ids=None, export_format=CSV):
+    """
+    Export the passages of the given day (of the cameras with the given ids)
+    to a file at the given path. The passages of a day which is (partly)
+    archived are read from the archive as well.
+
+    :return: The number of exported passages.
+    """
+    query = f"""
+        SELECT {', '.join(fields)}
+        FROM passage_passage
+        WHERE passage_at >= %s AND passage_at < %s
+    """
+    params = [day, day + timedelta(days=1)]
+    if camera_ids:
+        query += "AND camera_id IN %s"
+        params.append(tuple(camera_ids))
+    columns, rows = query_rows(query, params)
+    if day in get_archived_days():
+        _, archived = archive_rows(day, fields, camera_ids)
+        rows = itertools.chain(archived, rows)
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for count, row in enumerate(rows, 1):
+            yield row
+
+    schema = None
+    if export_format == PARQUET:
+        schema = get_arrow_schema(Passage, columns)
+        f = open(path, 'wb')
+    else:
+        f = open(path, 'w', newline='')
+    with f:
+        for chunk in export(columns, counted(rows), export_format, schema):
+            f.write(chunk)
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Export the (raw) passages per day, one file per day (partition)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-date',
+            type=datetime.date.fromisoformat,
+            required=True,
+            help='Export the passages from this date',
+        )
+        parser.add_argument(
+            '--to-date',
+            type=datetime.date.fromisoformat,
+            help='Export the passages until (excluding) this date, default today',
+        )
+        parser.add_argument(
+            '--camera-id',
+            action='append',
+            help=(
+                'Only export the passages of this camera (can be given multiple '
+                'times)'
+            ),
+        )
+        parser.add_argument(
+            '--fields', nargs='+', default=DEFAULT_FIELDS, help='The fields to export'
+        )
+        parser.add_argument('--format', choices=FORMATS, default=CSV)
+        parser.add_argument(
+            '--output', default='.', help='The directory to write the files to'
+        )
+
+    def handle(self, *args, **options):
+        fields = [field.attname for field in Passage._meta.concrete_fields]
+        unknown = set(options['fields']) - set(fields)
+        if unknown:
+            raise CommandError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        day = options['from_date']
+        to_date = options['to_date'] or datetime.date.today()
+        while day < to_date:
+            path = os.path.join(
+                options['output'], f"{partition_name(day)}.{options['format']}"
+            )
+            count = export_day(
+                day,
+                path,
+                options['fields'],
+                options['camera_id'],
+                options['format'],
+            )
+            log.info(f"Exported {count} passages to {path}")
+            day += timedelta(days=1)
@@ -5,6 +5,7 @@ import pytz
 from django.core.management.base import BaseCommand
 from factory.django import DjangoModelFactory
 
+from passage.copy_writer import copy_passages
 from passage.management.commands.make_partitions import make_partitions
 from passage.models import Passage
 from tests.passage.factories import PassageFactory
@@ -59,6 +60,6 @@ class Command(BaseCommand):
             created_at=dt
         )
 
-        Passage.objects.bulk_create(passages)
+        copy_passages(passages)
 
         log.info(f"Created {len(passages)} passages")
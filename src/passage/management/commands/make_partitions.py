@@ -4,23 +4,9 @@ from datetime import timedelta, datetime
 from django.core.management.base import BaseCommand
 from django.db import connection
 
-log = logging.getLogger(__name__)
-
-
-def make_partition_sql(timestamp):
-    """
-    Get the SQL for making a partition for the passage table for a particular day
-
-    :param timestamp: datetime of the date to get the sql for.
+from passage.partitions import create_partition
 
-    :return: SQL query for generating the the passage partition.
-    """
-    return f"""
-        CREATE table IF NOT EXISTS passage_passage_{timestamp.strftime("%Y%m%d")}
-        PARTITION OF passage_passage
-        FOR VALUES
-        FROM ('{timestamp.date()}') TO ('{timestamp.date() + timedelta(1)}');
-    """
+log = logging.getLogger(__name__)
 
 
 def check_postgres_major_version(cursor, required):
@@ -51,10 +37,8 @@ def make_partitions(timestamps):
     with connection.cursor() as cursor:
         check_postgres_major_version(cursor, 11)
 
-        for timestamp in timestamps:
-            query = make_partition_sql(timestamp)
-            log.info(query)
-            cursor.execute(query)
+    for timestamp in timestamps:
+        create_partition(timestamp.date())
 
     with connection.cursor() as cursor:
         for timestamp in timestamps:
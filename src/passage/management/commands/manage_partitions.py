@@ -0,0 +1,73 @@
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from passage.archive import archive_partitions
+from passage.partitions import get_partitions, manage_partitions
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the passage partitions for the coming days, drop (or archive) '
+        'the partitions past the retention window and report the partitions '
+        'and their sizes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.PASSAGE_PARTITION_HORIZON_DAYS,
+            help='The number of days ahead to create the partitions for',
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.PASSAGE_PARTITION_RETENTION_DAYS,
+            help=(
+                'Detach the partitions of the days before this number of days '
+                'ago, 0 to keep all partitions'
+            ),
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help=(
+                'Archive the partitions past the retention window (see '
+                'archive_partitions) instead of dropping them'
+            ),
+        )
+
+    def report(self):
+        partitions = get_partitions()
+        daily = sorted(partitions)
+        self.stdout.write(
+            f'{len(daily)} daily partitions'
+            + (f' ({daily[0]} - {daily[-1]})' if daily else '')
+            + f', total size {filesizeformat(sum(partitions.values()))}'
+        )
+        for name in daily:
+            self.stdout.write(f'{name}: {filesizeformat(partitions[name])}')
+
+    def handle(self, *args, **options):
+        today = date.today()
+        if options['archive'] and options['retention_days']:
+            archived = archive_partitions(
+                today - timedelta(days=options['retention_days'])
+            )
+            self.stdout.write(
+                f'Archived: {", ".join(map(str, archived)) or "-"}'
+            )
+        created, detached = manage_partitions(
+            today,
+            horizon_days=options['days'],
+            retention_days=options['retention_days'],
+        )
+        self.stdout.write(f'Created: {", ".join(created) or "-"}')
+        self.stdout.write(f'Detached: {", ".join(detached) or "-"}')
+        self.report()
@@ -1,81 +1,105 @@
 import logging
-import time
-from datetime import timedelta
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db import connection
-from django.db.models import Max, Min
-from django.db.models.functions import TruncDay
 from django.template.defaultfilters import filesizeformat
 
-from main import settings
-from passage.models import Passage
+from passage.vacuum import get_partition_stats, plan_maintenance, run_maintenance
 
 logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
+    help = (
+        'Vacuum and/or analyze the passage partitions which need it, according '
+        'to their statistics, and report the removed dead rows (and the space '
+        'reclaimed by rewriting)'
+    )
+
     def add_arguments(self, parser):
-        parser.add_argument('--sleep', nargs='?', default=1, type=int)
+        parser.add_argument(
+            '--dead-ratio',
+            type=float,
+            default=settings.PASSAGE_VACUUM_DEAD_RATIO,
+            help='Vacuum the partitions with at least this fraction of dead rows',
+        )
+        parser.add_argument(
+            '--analyze-ratio',
+            type=float,
+            default=settings.PASSAGE_VACUUM_ANALYZE_RATIO,
+            help=(
+                'Analyze the partitions of which at least this fraction of the '
+                'rows was modified since the last analyze'
+            ),
+        )
+        parser.add_argument(
+            '--full-bloat-ratio',
+            type=float,
+            help=(
+                'Rewrite (VACUUM FULL, which locks the partition) the partitions '
+                'with at least this estimated fraction of bloat, default never'
+            ),
+        )
+        parser.add_argument(
+            '--max-seconds',
+            type=int,
+            default=settings.PASSAGE_VACUUM_MAX_SECONDS,
+            help='Do not start processing partitions after this number of seconds',
+        )
+        parser.add_argument(
+            '--cost-delay',
+            type=float,
+            default=settings.PASSAGE_VACUUM_COST_DELAY_MS,
+            help='The vacuum_cost_delay (ms), which throttles the IO',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only show which partitions would be processed',
+        )
 
     def handle(self, **options):
-        logger.info("message")
-
-        sleep = options['sleep']
-
-        dates = Passage.objects.aggregate(
-            min=TruncDay(Min('passage_at')), max=TruncDay(Max('passage_at'))
+        stats = get_partition_stats()
+        plan = plan_maintenance(
+            stats,
+            dead_ratio=options['dead_ratio'],
+            analyze_ratio=options['analyze_ratio'],
+            full_bloat_ratio=options['full_bloat_ratio'],
         )
-
-        print(dates)
-        if not dates['min']:
-            self.stdout.write('No data to be processed')
+        self.stdout.write(
+            f'{len(plan)} of {len(stats)} partitions need maintenance'
+        )
+        if options['dry_run']:
+            for name, command in plan:
+                self.stdout.write(f'{command} {name}')
             return
 
-        date_min = dates['min'] + timedelta(days=1)
-        date_max = dates['max'] + timedelta(days=2)
-
-        i = 0
-        initial_size = initial_size_pretty = None
-        for date in (
-            date_min + timedelta(n) for n in range((date_max - date_min).days)
-        ):
-            i += 1
-            partition_name = f'passage_passage_{date:%Y%m%d}'
-            vacuum_query = f'VACUUM FULL ANALYZE {partition_name}'
-            size_query = (
-                "SELECT pg_database_size("
-                f"'{settings.DATABASES['default']['NAME']}');"
+        report = run_maintenance(
+            plan,
+            max_seconds=options['max_seconds'],
+            cost_delay_ms=options['cost_delay'],
+        )
+        for result in report:
+            line = (
+                f"{result['command']} {result['name']}: "
+                f"{result['dead_before']} -> {result['dead_after']} dead rows"
             )
-
-            self.stdout.write(f'Starting vacuum: {vacuum_query}')
-            try:
-                with connection.cursor() as cursor:
-                    cursor.execute(size_query)
-                    size = cursor.fetchone()[0]
-
-                    if not initial_size:
-                        initial_size = size
-                        initial_size_pretty = filesizeformat(size)
-
-                    size_pretty = filesizeformat(size)
-                    change = size - initial_size
-                    change_pretty = filesizeformat(change)
-                    procentual_change = change / initial_size * 100
-
-                    self.stdout.write(f'Total DB size: {self.style.SUCCESS(size_pretty)} '
-                                      f'(initial: {initial_size_pretty}, '
-                                      f'change: {change_pretty}, '
-                                      f'{procentual_change:.1f}%)')
-                    cursor.execute(vacuum_query)
-            except Exception as e:
-                self.stderr.write(f'Error vacuuming: {e}')
-
-            if i % 10 == 0:
-                self.stdout.write(f'sleeping for: {self.style.SUCCESS(sleep)}')
-                time.sleep(sleep)
-            else:
-                self.stdout.write(f'sleeping for: {self.style.SUCCESS(0.1)}')
-                time.sleep(0.1)
-
-        self.stdout.write(self.style.SUCCESS('Finished'))
\ No newline at end of file
+            if 'size_after' in result:
+                reclaimed = result['size_before'] - result['size_after']
+                line += (
+                    f", {filesizeformat(result['size_before'])} -> "
+                    f"{filesizeformat(result['size_after'])}, "
+                    f"reclaimed {filesizeformat(reclaimed)}"
+                )
+            self.stdout.write(f"{line} in {result['seconds']:.1f}s")
+
+        removed = sum(max(0, r['dead_before'] - r['dead_after']) for r in report)
+        summary = f'Processed {len(report)} partitions, removed {removed} dead rows'
+        rewritten = [r for r in report if 'size_after' in r]
+        if rewritten:
+            reclaimed = sum(r['size_before'] - r['size_after'] for r in rewritten)
+            summary += (
+                f', reclaimed {filesizeformat(reclaimed)} by rewriting '
+                f'{len(rewritten)} partitions'
+            )
+        self.stdout.write(self.style.SUCCESS(summary))
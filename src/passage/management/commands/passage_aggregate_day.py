@@ -0,0 +1,124 @@
+import datetime
+import logging
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from passage.aggregation import add_backfill_arguments, run_days, to_utc_bounds
+from passage.aggregations import AGGREGATIONS
+from passage.archive import create_passage_table
+
+log = logging.getLogger(__name__)
+
+# the aggregations which are calculated per day, from a single scan of the
+# passages of that day.
+DAY_AGGREGATIONS = [
+    'passage_hour_aggregation',
+    'passage_igor_hour_aggregation',
+    'passage_taxi_hour_aggregation',
+    'passage_zwaar_verkeer_hour_aggregation_v2',
+    'passage_zwaar_verkeer_minute_aggregation',
+]
+
+DAY_TABLE = 'passage_day'
+
+
+def get_day_bounds(run_date, aggregations):
+    """
+    :return: Tuple with the (naive UTC) start and end of the passages which
+        are needed to aggregate the given day for all given aggregations, in
+        their own time zone.
+    """
+    bounds = [
+        to_utc_bounds(run_date, run_date + timedelta(days=1), aggregation.time_zone)
+        for aggregation in aggregations
+    ]
+    return min(start for start, _ in bounds), max(end for _, end in bounds)
+
+
+def get_default_days(aggregations):
+    """
+    :return: List of (date, aggregations) tuples, oldest first, with the days
+        the given aggregations are run for by default: the last
+        ``default_days`` days of each aggregation, to pick up late arrivals.
+    """
+    days = max(aggregation.default_days for aggregation in aggregations)
+    return [
+        (
+            date.today() - timedelta(days=i),
+            [
+                aggregation
+                for aggregation in aggregations
+                if aggregation.default_days >= i
+            ],
+        )
+        for i in range(days, 0, -1)
+    ]
+
+
+def aggregate_day(run_date, aggregations):
+    """
+    Copy the passages of the given day into a temporary table, using a single
+    scan of the (one or two) partitions, or archives, of that day, and run all
+    aggregations from that table, in a single transaction.
+    """
+    start, end = get_day_bounds(run_date, aggregations)
+    started = time.monotonic()
+
+    with transaction.atomic():
+        create_passage_table(DAY_TABLE, start, end)
+        for aggregation in aggregations:
+            aggregation.run(run_date, passage_table=DAY_TABLE)
+
+    log.info(f"Aggregated {run_date} in {time.monotonic() - started:.1f}s")
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the daily aggregations from a single scan of the passages of '
+        'each day, by default for the last days of each aggregation'
+    )
+
+    def add_arguments(self, parser):
+        # Named (optional) argument
+        parser.add_argument(
+            '--from-date',
+            type=datetime.date.fromisoformat,
+            help='Run the aggregations from this date',
+        )
+        parser.add_argument(
+            '--aggregation',
+            action='append',
+            choices=DAY_AGGREGATIONS,
+            help='Only run this aggregation (can be given multiple times)',
+        )
+        add_backfill_arguments(parser)
+
+    def handle(self, *args, **options):
+        aggregations = [
+            AGGREGATIONS[name] for name in options['aggregation'] or DAY_AGGREGATIONS
+        ]
+
+        def run_day(run_date):
+            aggregate_day(run_date, aggregations)
+
+        if options['from_date']:
+            run_date = options['from_date']
+            dates = []
+            while run_date < date.today():
+                dates.append(run_date)
+                run_date = run_date + timedelta(days=1)
+            run_days(
+                'passage_aggregate_day',
+                run_day,
+                dates,
+                jobs=options['jobs'],
+                backfill=True,
+                resume=options['resume'],
+            )
+
+        else:
+            for run_date, day_aggregations in get_default_days(aggregations):
+                aggregate_day(run_date, day_aggregations)
@@ -8,6 +8,8 @@ from django.conf import settings
 from django.db import transaction
 from django.apps import apps
 
+from passage.aggregations import refresh_camera_gebieden
+
 log = logging.getLogger(__name__)
 
 class Command(BaseCommand):
@@ -31,6 +33,9 @@ class Command(BaseCommand):
                     inserts.append(hulptabelModel(**row))
 
             hulptabelModel.objects.bulk_create(inserts)
+            # the gebieden of the camera names may have changed
+            resolved = refresh_camera_gebieden()
+            log.info(f"Resolved {resolved} camera gebieden")
             return hulptabelModel.objects.count()
 
     def handle(self, *args, **options):
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from passage.minute_counts import update_minute_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Add the new passages to the per camera per minute counts, to be run '
+        'at a short interval'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lookback-days',
+            type=int,
+            default=7,
+            help='The number of days passages are allowed to arrive late',
+        )
+
+    def handle(self, *args, **options):
+        update_minute_counts(options['lookback_days'])
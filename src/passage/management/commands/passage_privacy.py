@@ -8,6 +8,8 @@ from django.db.models import Case, F, Max, Min, Value, When
 from django.db.models.functions import TruncDay, TruncYear
 from django.db.utils import ProgrammingError
 from passage.models import Passage
+from passage.partitions import get_partition_days
+from passage.privacy import rewrite_partition
 
 logger = logging.getLogger(__name__)
 
@@ -15,11 +17,33 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--sleep', nargs='?', default=1, type=int)
+        parser.add_argument(
+            '--rewrite',
+            action='store_true',
+            help=(
+                'Replace each partition which is not scrubbed yet by a scrubbed '
+                'copy, instead of updating it in place (and VACUUM FULL)'
+            ),
+        )
+
+    def rewrite(self):
+        for day in get_partition_days():
+            rewritten = rewrite_partition(day)
+            if rewritten is None:
+                self.stdout.write(f"Skipped {day:%Y-%m-%d}: already scrubbed")
+            else:
+                self.stdout.write(
+                    f"Rewrote {day:%Y-%m-%d}: {self.style.SUCCESS(rewritten)}"
+                )
+        self.stdout.write(self.style.SUCCESS('Finished'))
 
     def handle(self, **options):
         verbosity = int(options['verbosity'])
         logger.info("message")
 
+        if options['rewrite']:
+            return self.rewrite()
+
         sleep = options['sleep']
 
         dates = Passage.objects.aggregate(
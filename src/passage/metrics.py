@@ -0,0 +1,34 @@
+import threading
+from collections import Counter
+
+from .case_converters import to_camelcase_cached, to_snakecase_cached
+
+# Simple in-process counters. Note that every (uwsgi) worker process has its
+# own counters.
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def increment(name, value=1):
+    """Increment the counter with the given name."""
+    with _lock:
+        _counters[name] += value
+
+
+def get_metrics():
+    """
+    :return: Dictionary with the counters and the hits and misses of the
+        memoised key converters of the current process.
+    """
+    with _lock:
+        metrics = dict(_counters)
+
+    for name, func in (
+        ('to_snakecase', to_snakecase_cached),
+        ('to_camelcase', to_camelcase_cached),
+    ):
+        info = func.cache_info()
+        metrics[f'{name}_cache_hits'] = info.hits
+        metrics[f'{name}_cache_misses'] = info.misses
+        metrics[f'{name}_cache_size'] = info.currsize
+    return metrics
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0038_heavytraffichouraggregationv2_aantal_staanplaatsen_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AggregationWatermark",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("watermark", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
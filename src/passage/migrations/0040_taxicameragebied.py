@@ -0,0 +1,21 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0039_aggregationwatermark"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaxiCameraGebied",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("camera_naam", models.CharField(db_index=True, max_length=255)),
+                ("gebiedstype", models.CharField(max_length=255, null=True)),
+                ("gebied", models.CharField(max_length=255, null=True)),
+            ],
+        ),
+    ]
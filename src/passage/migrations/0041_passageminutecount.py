@@ -0,0 +1,29 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+import datetimeutc.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0040_taxicameragebied"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PassageMinuteCount",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("camera_id", models.CharField(default="", max_length=255)),
+                ("camera_naam", models.CharField(default="", max_length=255)),
+                (
+                    "passage_at_minute",
+                    datetimeutc.fields.DateTimeUTCField(db_index=True),
+                ),
+                ("count", models.IntegerField()),
+            ],
+            options={
+                "unique_together": {("passage_at_minute", "camera_id", "camera_naam")},
+            },
+        ),
+    ]
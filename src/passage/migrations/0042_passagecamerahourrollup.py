@@ -0,0 +1,43 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+import datetimeutc.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0041_passageminutecount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PassageCameraHourRollup",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("bucket", datetimeutc.fields.DateTimeUTCField(db_index=True)),
+                ("year", models.IntegerField()),
+                ("week", models.IntegerField()),
+                ("camera_id", models.CharField(max_length=255)),
+                ("camera_naam", models.CharField(max_length=255)),
+                ("count", models.IntegerField()),
+            ],
+        ),
+        # roll up the existing hour aggregations
+        migrations.RunSQL(
+            """
+            INSERT INTO passage_passagecamerahourrollup (
+                bucket, year, week, camera_id, camera_naam, count
+            )
+            SELECT
+                date + make_interval(hours => hour),
+                year,
+                week,
+                camera_id,
+                camera_naam,
+                sum(count)
+            FROM passage_passagehouraggregation
+            GROUP BY 1, 2, 3, 4, 5
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
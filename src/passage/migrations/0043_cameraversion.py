@@ -0,0 +1,44 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0042_passagecamerahourrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CameraVersion",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="passage",
+            name="cordon",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="passage",
+            name="richting",
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="passage",
+            name="rijrichting_correct",
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="passage",
+            name="order_kaart",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="passage",
+            name="order_naam",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
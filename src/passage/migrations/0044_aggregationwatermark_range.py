@@ -0,0 +1,22 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0043_cameraversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aggregationwatermark",
+            name="from_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="aggregationwatermark",
+            name="to_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0044_aggregationwatermark_range"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportVersion",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("key", models.CharField(max_length=255, unique=True)),
+                ("version", models.IntegerField(default=1)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0045_exportversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PassageArchive",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("day", models.DateField(db_index=True)),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("passages", models.IntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
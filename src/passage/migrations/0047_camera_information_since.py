@@ -0,0 +1,22 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+def add_first_version(apps, schema_editor):
+    # the passages are written with the camera information from now on, the
+    # aggregations of the days before fall back to the helper table (see
+    # passage.camera_cache.get_enriched_since)
+    CameraVersion = apps.get_model("passage", "CameraVersion")
+    if not CameraVersion.objects.exists():
+        CameraVersion.objects.create()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("passage", "0046_passagearchive"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_first_version, migrations.RunPython.noop),
+    ]
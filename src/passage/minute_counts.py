@@ -0,0 +1,114 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .aggregation import to_utc_naive
+from .models import AggregationWatermark
+
+log = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'passage_minute_counts'
+
+
+def get_changed_minutes(since, lookback_start):
+    """
+    :param since: Only consider the passages created (created_at) after this
+        (aware) datetime, or all passages when None.
+    :param lookback_start: The (aware) datetime of the oldest passage_at.
+
+    :return: Sorted list of the (naive UTC) minutes (passage_at) which received
+        passages.
+    """
+    conditions = ["passage_at >= %s"]
+    params = [to_utc_naive(lookback_start)]
+    if since is not None:
+        conditions.append("created_at > %s")
+        params.append(to_utc_naive(since))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT date_trunc('minute', passage_at)
+            FROM passage_passage
+            WHERE {' AND '.join(conditions)}
+            """,
+            params,
+        )
+        return sorted(minute for minute, in cursor.fetchall())
+
+
+def update_minute_counts(lookback_days=7):
+    """
+    Recalculate the per camera per minute counts (passage_passageminutecount)
+    of the minutes which received passages since the previous update.
+
+    The changed minutes are those of the passages created after the watermark
+    minus settings.PASSAGE_MINUTE_COUNTS_OVERLAP_SECONDS. The counts of these
+    minutes are deleted and counted again (as the hour aggregations do), so
+    counting a minute again is harmless, and the passages which were committed
+    (or whose created_at was behind the clock of the update) up to the overlap
+    late are counted by the next update. The counts are up to date until the
+    update. Only passages from the last ``lookback_days`` (passage_at) are
+    considered, this bounds the number of partitions that have to be scanned.
+
+    :return: The number of updated counts.
+    """
+    started = time.monotonic()
+    until = timezone.now()
+    overlap = timedelta(seconds=settings.PASSAGE_MINUTE_COUNTS_OVERLAP_SECONDS)
+
+    with transaction.atomic():
+        watermark = (
+            AggregationWatermark.objects.select_for_update()
+            .filter(name=WATERMARK_NAME)
+            .first()
+        )
+        # on the first run, count the passages within the lookback window
+        since = watermark.watermark - overlap if watermark else None
+        minutes = get_changed_minutes(
+            since, lookback_start=until - timedelta(days=lookback_days)
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                DELETE FROM passage_passageminutecount
+                WHERE passage_at_minute = ANY(%s::timestamp[])
+                """,
+                [minutes],
+            )
+            # every minute is counted using the passage_at index, of the
+            # partition(s) of that minute only
+            cursor.execute(
+                """
+                INSERT INTO passage_passageminutecount (
+                    camera_id, camera_naam, passage_at_minute, count
+                )
+                SELECT
+                    coalesce(p.camera_id, ''),
+                    coalesce(p.camera_naam, ''),
+                    m.minute,
+                    count(*)
+                FROM unnest(%s::timestamp[]) AS m(minute)
+                JOIN passage_passage AS p
+                    ON p.passage_at >= m.minute
+                    AND p.passage_at < m.minute + interval '1 minute'
+                GROUP BY 1, 2, 3
+                """,
+                [minutes],
+            )
+            updated = cursor.rowcount
+
+        AggregationWatermark.objects.update_or_create(
+            name=WATERMARK_NAME, defaults=dict(watermark=until)
+        )
+
+    log.info(
+        f"Updated {updated} counts of {len(minutes)} minutes until {until} "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return updated
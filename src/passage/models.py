@@ -78,6 +78,14 @@ class Passage(models.Model):
 	co2_uitstoot_gewogen = models.FloatField(null=True, blank=True)
 	milieuklasse_eg_goedkeuring_zwaar = models.CharField(max_length=255, null=True, blank=True)
 
+	# the camera information of the Camera helper table which is used by the
+	# aggregations, set when the passage is written, see passage.camera_cache
+	cordon = models.CharField(max_length=255, null=True, blank=True)
+	richting = models.CharField(max_length=10, null=True, blank=True)
+	rijrichting_correct = models.BooleanField(null=True, blank=True)
+	order_kaart = models.IntegerField(null=True, blank=True)
+	order_naam = models.CharField(max_length=255, null=True, blank=True)
+
 	class Meta:
 		# create a unique index for (passage_id, volgnummer).
 		# passage_at is included as it is required; it is used to partition
@@ -132,6 +140,15 @@ class Camera(models.Model):
 	azimuth = models.FloatField(null=True, blank=True)
 
 
+class CameraVersion(models.Model):
+	"""
+	The versions of the Camera helper table, a version is added by every
+	import of the table (camera_hulptable_import).
+	"""
+	id = models.AutoField(primary_key=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+
 class HourAggregationBase(models.Model):
 	id = models.AutoField(primary_key=True)
 	passage_at_timestamp = DateTimeUTCField()
@@ -265,3 +282,86 @@ class HulptabelCameragebiedenTaxidashboard (models.Model):
 	gebied = models.CharField(max_length=255, null=False)
 	camera_id = models.CharField(max_length=255, null=False)
 
+
+class TaxiCameraGebied(models.Model):
+	"""
+	The gebieden of the camera names of the passages, resolved from the
+	(substring) camera_id of HulptabelCameragebiedenTaxidashboard. Camera
+	names without gebied are stored without gebied (NULL), so they are only
+	resolved once.
+	"""
+	id = models.AutoField(primary_key=True)
+	camera_naam = models.CharField(max_length=255, db_index=True)
+	gebiedstype = models.CharField(max_length=255, null=True)
+	gebied = models.CharField(max_length=255, null=True)
+
+
+
+class AggregationWatermark(models.Model):
+	"""
+	The created_at up to which the passages have been aggregated by an
+	incremental aggregation run (per aggregation command), or the first date
+	which has not been completed by a backfill (from_date until to_date).
+	"""
+	id = models.AutoField(primary_key=True)
+	name = models.CharField(max_length=255, unique=True)
+	watermark = models.DateTimeField()
+	from_date = models.DateField(null=True, blank=True)
+	to_date = models.DateField(null=True, blank=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+
+class PassageArchive(models.Model):
+	"""
+	An archive (Parquet file in settings.PASSAGE_ARCHIVE_DIR) of the passages
+	of a dropped partition, see passage.archive. A day has more than one
+	archive when its partition was recreated (by late passages) and archived
+	again.
+	"""
+	id = models.AutoField(primary_key=True)
+	day = models.DateField(db_index=True)
+	name = models.CharField(max_length=255, unique=True)
+	passages = models.IntegerField()
+	created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ExportVersion(models.Model):
+	"""
+	The version of the (cached) exports of a week, which is incremented when
+	the hour aggregation of one of its days is recalculated (see
+	passage.export_cache).
+	"""
+	id = models.AutoField(primary_key=True)
+	key = models.CharField(max_length=255, unique=True)
+	version = models.IntegerField(default=1)
+	updated_at = models.DateTimeField(auto_now=True)
+
+
+class PassageMinuteCount(models.Model):
+	"""
+	The number of passages per camera per minute (passage_at, UTC), which is
+	kept up to date incrementally by the passage_minute_counts command.
+	"""
+	id = models.AutoField(primary_key=True)
+	camera_id = models.CharField(max_length=255, default='')
+	camera_naam = models.CharField(max_length=255, default='')
+	passage_at_minute = DateTimeUTCField(db_index=True)
+	count = models.IntegerField()
+
+	class Meta:
+		unique_together = ('passage_at_minute', 'camera_id', 'camera_naam')
+
+
+class PassageCameraHourRollup(models.Model):
+	"""
+	The number of passages per camera per hour, rolled up from the
+	PassageHourAggregation by the passage_hour_aggregation (for the export).
+	The bucket is the (UTC) date and hour of the hour aggregation.
+	"""
+	id = models.AutoField(primary_key=True)
+	bucket = DateTimeUTCField(db_index=True)
+	year = models.IntegerField()
+	week = models.IntegerField()
+	camera_id = models.CharField(max_length=255)
+	camera_naam = models.CharField(max_length=255)
+	count = models.IntegerField()
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import json
+import uuid
+
+from django.contrib.gis.geos import GEOSGeometry
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+
+class PassageJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, GEOSGeometry):
+            return json.loads(o.geojson)
+        return super().default(o)
+
+
+class PassageKeysetPagination:
+    """
+    Keyset pagination of the passages on (passage_at, id).
+
+    Unlike offset (or the regular cursor) pagination, every page is selected
+    with a range condition on passage_at (which prunes the partitions) and id,
+    and the page is streamed from a server-side cursor, so it is never loaded
+    into memory as a whole. The link to the next page is written after the
+    results.
+    """
+
+    page_size = 50
+    max_page_size = 10000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # the number of passages fetched from the database (and written) at once
+    chunk_size = 1000
+
+    # the fields of the listed passages: those of the data requests (see
+    # export_passages), not the fields the privacy rules of the passage
+    # serializer are about (e.g. kenteken_hash, merk and the dates of the
+    # vehicle registration).
+    fields = [
+        'id',
+        'passage_id',
+        'passage_at',
+        'created_at',
+        'volgnummer',
+        'version',
+        'straat',
+        'rijrichting',
+        'rijstrook',
+        'camera_id',
+        'camera_naam',
+        'camera_kijkrichting',
+        'camera_locatie',
+        'kenteken_land',
+        'kenteken_nummer_betrouwbaarheid',
+        'kenteken_land_betrouwbaarheid',
+        'kenteken_karakters_betrouwbaarheid',
+        'automatisch_verwerkbaar',
+        'voertuig_soort',
+        'inrichting',
+        'toegestane_maximum_massa_voertuig',
+        'europese_voertuigcategorie',
+        'europese_voertuigcategorie_toevoeging',
+        'brandstoffen',
+        'extra_data',
+        'diesel',
+        'gasoline',
+        'electric',
+        'indicatie_snelheid',
+    ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, passage_at, pk):
+        value = json.dumps([passage_at.isoformat(), str(pk)])
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, request):
+        """
+        :return: Tuple with the passage_at and id of the last passage of the
+            previous page, or None for the first page.
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            passage_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            passage_at = parse_datetime(passage_at)
+            pk = uuid.UUID(pk)
+        except (AttributeError, binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if passage_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return passage_at, pk
+
+    def paginate_queryset(self, queryset, request):
+        """
+        :return: The queryset of the values of the passages of the page, and
+            one more to find out whether there is a next page.
+        """
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            passage_at, pk = cursor
+            queryset = queryset.filter(passage_at__gte=passage_at).filter(
+                Q(passage_at__gt=passage_at) | Q(pk__gt=pk)
+            )
+        page_size = self.get_page_size(request)
+        return queryset.order_by('passage_at', 'pk').values(*self.fields)[
+            : page_size + 1
+        ]
+
+    def _stream(self, rows, request, page_size):
+        url = request.build_absolute_uri()
+        encoder = PassageJSONEncoder()
+        last = None
+        has_next = False
+        separator = ''
+        chunk = []
+
+        yield '{"results": ['
+        for count, row in enumerate(rows):
+            if count == page_size:
+                has_next = True
+                break
+            # the passage_id is returned as id, like the passage serializer
+            pk = row.pop('id')
+            last = row['passage_at'], pk
+            chunk.append(encoder.encode({'id': row.pop('passage_id'), **row}))
+            if len(chunk) == self.chunk_size:
+                yield separator + ','.join(chunk)
+                separator = ','
+                chunk = []
+        if chunk:
+            yield separator + ','.join(chunk)
+
+        next_url = None
+        if has_next:
+            next_url = replace_query_param(
+                url, self.cursor_query_param, self.encode_cursor(*last)
+            )
+        links = {'self': {'href': url}, 'next': {'href': next_url}}
+        yield f'], "_links": {encoder.encode(links)}}}'
+
+    def get_streaming_response(self, queryset, request):
+        page_size = self.get_page_size(request)
+        rows = self.paginate_queryset(queryset, request).iterator(
+            chunk_size=self.chunk_size
+        )
+        return StreamingHttpResponse(
+            self._stream(rows, request, page_size), content_type='application/json'
+        )
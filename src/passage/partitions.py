@@ -0,0 +1,174 @@
+"""
+Management of the (daily) partitions of the passage table.
+"""
+import datetime
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from psycopg2.errorcodes import CHECK_VIOLATION
+
+from .metrics import increment
+
+log = logging.getLogger(__name__)
+
+PARENT_TABLE = 'passage_passage'
+
+
+def partition_name(day):
+    return f'{PARENT_TABLE}_{day:%Y%m%d}'
+
+
+def get_partitions():
+    """
+    :return: Dict with the name of each partition of the passage table and
+        its total size in bytes.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT c.relname, pg_total_relation_size(c.oid)
+            FROM pg_inherits AS i
+            JOIN pg_class AS c ON c.oid = i.inhrelid
+            WHERE i.inhparent = '{PARENT_TABLE}'::regclass
+            ORDER BY c.relname
+            """
+        )
+        return dict(cursor.fetchall())
+
+
+def get_partition_days():
+    """
+    :return: Sorted list of the days which have a (daily) partition.
+    """
+    prefix = f'{PARENT_TABLE}_'
+    return sorted(
+        datetime.datetime.strptime(name[len(prefix):], '%Y%m%d').date()
+        for name in get_partitions()
+    )
+
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+def partition_exists(day):
+    with connection.cursor() as cursor:
+        return _table_exists(cursor, partition_name(day))
+
+
+def create_partition(day):
+    """
+    Create the partition of the given day, if it does not exist yet.
+
+    Creating partitions is serialized using an advisory lock (per partition).
+
+    :return: Whether the partition was created.
+    """
+    name = partition_name(day)
+    start, end = day, day + timedelta(days=1)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [name])
+        if _table_exists(cursor, name):
+            return False
+        cursor.execute(
+            f"""
+            CREATE TABLE {name}
+            PARTITION OF {PARENT_TABLE}
+            FOR VALUES FROM ('{start}') TO ('{end}')
+            """
+        )
+
+    log.info(f"Created {name}")
+    return True
+
+
+def detach_partition(name):
+    """
+    Detach the given partition from the passage table, and drop it.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+        log.info(f"Dropped {name}")
+
+
+def manage_partitions(today, horizon_days, retention_days=0):
+    """
+    Make sure there are partitions for today and the next ``horizon_days``
+    days, and detach the partitions of the days before the retention window
+    (if ``retention_days`` is set).
+
+    There is no default partition: the partition of a day which does not
+    have one is created when its first passage is written, see
+    retry_missing_partition.
+
+    :return: Tuple with the lists of created and detached partitions.
+    """
+    created = [
+        partition_name(day)
+        for day in (today + timedelta(days=i) for i in range(horizon_days + 1))
+        if create_partition(day)
+    ]
+
+    detached = []
+    if retention_days:
+        oldest = today - timedelta(days=retention_days)
+        for day in get_partition_days():
+            if day < oldest:
+                detach_partition(partition_name(day))
+                detached.append(partition_name(day))
+
+    return created, detached
+
+
+def is_missing_partition_error(error):
+    """
+    :return: Whether the given IntegrityError was raised because there is no
+        partition for (the passage_at of) the inserted row: a check violation
+        which, unlike that of a CHECK constraint, has no constraint name.
+    """
+    cause = error.__cause__
+    return (
+        getattr(cause, 'pgcode', None) == CHECK_VIOLATION
+        and cause.diag.constraint_name is None
+    )
+
+
+def get_partition_day(passage_at):
+    """
+    :return: The day of the partition of the given passage_at (in UTC).
+    """
+    if passage_at.tzinfo:
+        passage_at = passage_at.astimezone(datetime.timezone.utc)
+    return passage_at.date()
+
+
+def retry_missing_partition(write, passage_ats):
+    """
+    Call ``write()``, which inserts passages with the given passage_at values.
+    When that fails because the partition of one of the passages does not
+    exist (the partitions are normally created ahead by manage_partitions),
+    create the partitions and call it again.
+
+    :param passage_ats: Iterable of the passage_at values, which is only
+        consumed when a partition is missing.
+    """
+    try:
+        if connection.in_atomic_block:
+            # roll back to a savepoint, so the transaction can be retried
+            with transaction.atomic():
+                return write()
+        return write()
+    except IntegrityError as e:
+        if not is_missing_partition_error(e):
+            raise
+        log.warning(f"Missing partition, creating it: {e}")
+
+    increment('passage_missing_partition')
+    for day in {get_partition_day(passage_at) for passage_at in passage_ats}:
+        if create_partition(day):
+            increment('passage_partition_created')
+    return write()
@@ -0,0 +1,192 @@
+"""
+Privacy scrubbing of the passages which were stored before the privacy
+transformations of the PassageDetailSerializer (its validate methods) existed.
+"""
+import logging
+import re
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+
+from .partitions import PARENT_TABLE, partition_name
+
+log = logging.getLogger(__name__)
+
+# the privacy transformations of PassageDetailSerializer, as SQL expressions
+PRIVACY_COLUMNS = {
+    'datum_eerste_toelating': "date_trunc('year', datum_eerste_toelating)::date",
+    'datum_tenaamstelling': "NULL",
+    'toegestane_maximum_massa_voertuig': """CASE
+        WHEN toegestane_maximum_massa_voertuig <= 3500 THEN 1500
+        ELSE toegestane_maximum_massa_voertuig
+    END""",
+    'europese_voertuigcategorie_toevoeging': """CASE
+        WHEN toegestane_maximum_massa_voertuig <= 3500 THEN NULL
+        ELSE europese_voertuigcategorie_toevoeging
+    END""",
+    'inrichting': """CASE
+        WHEN lower(voertuig_soort) = 'personenauto' THEN 'Personenauto'
+        ELSE inrichting
+    END""",
+    'merk': """CASE
+        WHEN toegestane_maximum_massa_voertuig <= 3500 THEN NULL
+        ELSE merk
+    END""",
+}
+
+# selects the passages which are not scrubbed (yet)
+NOT_SCRUBBED = """
+    datum_eerste_toelating != date_trunc('year', datum_eerste_toelating)::date
+    OR datum_tenaamstelling IS NOT NULL
+    OR (
+        toegestane_maximum_massa_voertuig <= 3500
+        AND (
+            toegestane_maximum_massa_voertuig != 1500
+            OR europese_voertuigcategorie_toevoeging IS NOT NULL
+            OR merk IS NOT NULL
+        )
+    )
+    OR (
+        lower(voertuig_soort) = 'personenauto'
+        AND inrichting IS DISTINCT FROM 'Personenauto'
+    )
+"""
+
+
+def is_scrubbed(name):
+    """
+    :return: Whether all passages of the given partition are scrubbed. The
+        probe stops at the first passage which is not.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {name} WHERE {NOT_SCRUBBED})")
+        return cursor.fetchone()[0]
+
+
+def get_indexes(cursor, name):
+    """
+    :return: List of (name, definition, is_constraint) of the indexes of the
+        given table. The definition of the indexes of a (primary key or unique)
+        constraint is the constraint definition, that of other indexes the
+        CREATE INDEX statement.
+    """
+    cursor.execute(
+        """
+        SELECT
+            i.relname,
+            coalesce(pg_get_constraintdef(c.oid), pg_get_indexdef(i.oid)),
+            c.oid IS NOT NULL
+        FROM pg_index AS x
+        JOIN pg_class AS i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint AS c
+            ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+        WHERE x.indrelid = %s::regclass
+        ORDER BY i.relname
+        """,
+        [name],
+    )
+    return cursor.fetchall()
+
+
+def create_indexes(cursor, indexes, table):
+    """
+    Create the given indexes (see get_indexes) on the given table, named
+    {table}_{i}.
+
+    :return: List of (name, original name) of the created indexes.
+    """
+    names = []
+    for i, (index, definition, is_constraint) in enumerate(indexes):
+        new = f'{table}_{i}'
+        if is_constraint:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {new} {definition}")
+        else:
+            cursor.execute(
+                re.sub(
+                    r'^(CREATE (?:UNIQUE )?INDEX) \S+ ON (?:ONLY )?\S+',
+                    lambda match: f'{match.group(1)} {new} ON {table}',
+                    definition,
+                )
+            )
+        names.append((new, index))
+    return names
+
+
+def rewrite_partition(day):
+    """
+    Replace the partition of the given day by a scrubbed copy, unless it is
+    scrubbed already.
+
+    The copy is filled with a single INSERT ... SELECT into a table without
+    indexes, after which the indexes of the old partition are built on it and
+    it is swapped in (detach and attach) in the same transaction. Unlike an
+    UPDATE (and VACUUM FULL) no dead rows are left behind. The old partition
+    is locked against writes during the copy, reading it remains possible
+    until the swap. Attaching only attaches the existing indexes of the copy
+    to those of the parent table, so the swap holds the ACCESS EXCLUSIVE lock
+    on the parent table briefly.
+
+    :return: The number of rewritten passages, or None if the partition does
+        not exist or is scrubbed already.
+    """
+    name = partition_name(day)
+    copy = f'{name}_privacy'
+    start, end = day, day + timedelta(days=1)
+    started = time.monotonic()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        if not cursor.fetchone()[0] or is_scrubbed(name):
+            return None
+
+        cursor.execute(f"LOCK TABLE {name} IN EXCLUSIVE MODE")
+        columns = [
+            column.name
+            for column in connection.introspection.get_table_description(cursor, name)
+        ]
+        select = ',\n'.join(
+            f"{PRIVACY_COLUMNS.get(column, column)} AS {column}" for column in columns
+        )
+        cursor.execute(
+            f"""
+            CREATE TABLE {copy}
+            (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            """
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {copy} ({', '.join(columns)})
+            SELECT {select}
+            FROM {name}
+            """
+        )
+        rewritten = cursor.rowcount
+        indexes = create_indexes(cursor, get_indexes(cursor, name), copy)
+
+        # the constraint proves the bounds, so attaching does not scan the copy
+        cursor.execute(
+            f"""
+            ALTER TABLE {copy} ADD CONSTRAINT {copy}_bounds
+            CHECK (passage_at >= '{start}' AND passage_at < '{end}')
+            """
+        )
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        cursor.execute(
+            f"""
+            ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {copy}
+            FOR VALUES FROM ('{start}') TO ('{end}')
+            """
+        )
+        cursor.execute(f"DROP TABLE {name}")
+        cursor.execute(f"ALTER TABLE {copy} RENAME TO {name}")
+        cursor.execute(f"ALTER TABLE {name} DROP CONSTRAINT {copy}_bounds")
+        # the constraints rename their indexes as well
+        for new, index in indexes:
+            cursor.execute(f"ALTER INDEX {new} RENAME TO {index}")
+
+    log.info(
+        f"Rewrote {rewritten} passages of {name} "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return rewritten
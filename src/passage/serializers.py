@@ -1,13 +1,18 @@
 import logging
 from datetime import date
+from functools import partial
 
 from datapunt_api.rest import DisplayField, HALSerializer
+from django.conf import settings
 from django.db import IntegrityError
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from .buffer import ACK_ENQUEUE, get_buffer
+from .camera_cache import CAMERA_FIELDS, enrich_data
 from .errors import DuplicateIdError
 from .models import Passage
+from .partitions import retry_missing_partition
 
 log = logging.getLogger(__name__)
 
@@ -38,16 +43,25 @@ class PassageDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Passage
         # exclude passage_id. We map id (on the serializer) to passage_id (on the model)
-        # therefore we are practically excluding the Passage.id field
-        exclude = ['passage_id']
+        # therefore we are practically excluding the Passage.id field.
+        # The camera information is set when the passage is written.
+        exclude = ['passage_id', *CAMERA_FIELDS]
         validators = [
             # Disable UniqueTogetherValidator for (passage_id, volgnummer)
             # for performance
         ]
 
     def create(self, validated_data):
+        if settings.PASSAGE_BUFFER_ENABLED:
+            return self._create_buffered(validated_data)
+
+        enrich_data(validated_data)
         try:
-            return super().create(validated_data)
+            # a missing partition (also an IntegrityError) is created on demand
+            return retry_missing_partition(
+                partial(super().create, validated_data),
+                [validated_data['passage_at']],
+            )
         except IntegrityError as e:
             # this is pretty nasty to check the string like this, however when
             # a partition does not exist an IntegrityError is raised - in this
@@ -60,6 +74,17 @@ class PassageDetailSerializer(serializers.ModelSerializer):
             else:
                 raise
 
+    def _create_buffered(self, validated_data):
+        # Add the passage to the write-behind buffer, which writes it together
+        # with other passages in a single insert. Depending on the
+        # acknowledgement setting, either wait until it is written (which
+        # raises DuplicateIdError for duplicates) or return immediately.
+        passage = Passage(**validated_data)
+        future = get_buffer().submit(passage)
+        if settings.PASSAGE_BUFFER_ACK == ACK_ENQUEUE:
+            return passage
+        return future.result(timeout=settings.PASSAGE_BUFFER_TIMEOUT)
+
     def validate_datum_eerste_toelating(self, value):
         if value is None:
             return None
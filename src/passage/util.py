@@ -1,3 +1,6 @@
+from .case_converters import to_snakecase_cached
+
+
 def keymap(callable, dictionary):
     """
     Recursively map the keys of ``dictionary`` using ``callable``. When the
@@ -34,3 +37,19 @@ def keyfilter(callable, dictionary):
         for key, value in dictionary.items()
         if callable(key)
     }
+
+
+def keymap_snakecase(dictionary):
+    """
+    Recursively convert the keys of ``dictionary`` to snakecase, the same as
+    ``keymap(to_snakecase, dictionary)`` but using the memoised converter.
+    """
+    return keymap(to_snakecase_cached, dictionary)
+
+
+def keyfilter_snakecase(callable, dictionary):
+    """
+    The same as ``keyfilter``, but ``callable`` is called with the key
+    converted to snakecase (using the memoised converter).
+    """
+    return keyfilter(lambda key: callable(to_snakecase_cached(key)), dictionary)
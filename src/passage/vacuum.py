@@ -0,0 +1,191 @@
+"""
+Maintenance (VACUUM and ANALYZE) of the passage partitions, planned using the
+statistics of the partitions, so only the partitions which need it are
+processed.
+"""
+import logging
+import time
+
+from django.db import connection
+
+from .partitions import PARENT_TABLE
+
+log = logging.getLogger(__name__)
+
+VACUUM = 'VACUUM (ANALYZE)'
+VACUUM_FULL = 'VACUUM (FULL, ANALYZE)'
+ANALYZE = 'ANALYZE'
+
+# the (estimated) size of the header of a row (tuple header and item pointer)
+ROW_OVERHEAD = 28
+
+
+def get_partition_stats():
+    """
+    :return: List with a dict of the statistics of each partition of the
+        passage table: the number of live and dead rows, the number of rows
+        modified since the last analyze, whether it was (ever) analyzed, the
+        (heap and total) size in bytes and the estimated size of the rows.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT
+                c.relname,
+                coalesce(s.n_live_tup, 0),
+                coalesce(s.n_dead_tup, 0),
+                coalesce(s.n_mod_since_analyze, 0),
+                s.last_analyze IS NOT NULL OR s.last_autoanalyze IS NOT NULL,
+                pg_relation_size(c.oid),
+                pg_total_relation_size(c.oid),
+                (
+                    SELECT sum(avg_width)
+                    FROM pg_stats
+                    WHERE schemaname = n.nspname AND tablename = c.relname
+                )
+            FROM pg_inherits AS i
+            JOIN pg_class AS c ON c.oid = i.inhrelid
+            JOIN pg_namespace AS n ON n.oid = c.relnamespace
+            LEFT JOIN pg_stat_user_tables AS s ON s.relid = c.oid
+            WHERE i.inhparent = '{PARENT_TABLE}'::regclass
+            ORDER BY c.relname
+            """
+        )
+        columns = [
+            'name',
+            'live',
+            'dead',
+            'modified',
+            'analyzed',
+            'size',
+            'total_size',
+            'row_width',
+        ]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def get_dead_ratio(stats):
+    total = stats['live'] + stats['dead']
+    return stats['dead'] / total if total else 0
+
+
+def get_bloat_ratio(stats):
+    """
+    :return: The estimated fraction of the heap of the partition which is
+        bloat (free or dead space), or None when there are no statistics of
+        the width of the rows (yet).
+    """
+    if not stats['row_width'] or not stats['size']:
+        return None
+    expected = stats['live'] * (stats['row_width'] + ROW_OVERHEAD)
+    return max(0, 1 - expected / stats['size'])
+
+
+def plan_maintenance(stats, dead_ratio, analyze_ratio, full_bloat_ratio=None):
+    """
+    :param stats: The statistics of the partitions, see get_partition_stats.
+    :param dead_ratio: Vacuum the partitions with at least this fraction of
+        dead rows.
+    :param analyze_ratio: Analyze the partitions which were never analyzed,
+        or of which at least this fraction of the rows was modified since.
+    :param full_bloat_ratio: Rewrite (VACUUM FULL) the partitions with at
+        least this (estimated) fraction of bloat, None to never rewrite.
+
+    :return: List of (partition name, command) tuples, with the partitions
+        with the most dead rows first.
+    """
+    plan = []
+    for partition in sorted(stats, key=lambda p: p['dead'], reverse=True):
+        bloat = get_bloat_ratio(partition)
+        live = partition['live']
+        if None not in (full_bloat_ratio, bloat) and bloat >= full_bloat_ratio:
+            command = VACUUM_FULL
+        elif partition['dead'] and get_dead_ratio(partition) >= dead_ratio:
+            command = VACUUM
+        elif live and (
+            not partition['analyzed'] or partition['modified'] / live >= analyze_ratio
+        ):
+            command = ANALYZE
+        else:
+            continue
+        plan.append((partition['name'], command))
+    return plan
+
+
+def get_total_size(name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_total_relation_size(%s::regclass)", [name])
+        return cursor.fetchone()[0]
+
+
+def get_dead_rows(name):
+    """
+    :return: The number of dead rows of the given table, according to the
+        statistics collector.
+    """
+    with connection.cursor() as cursor:
+        # read the current statistics, not the snapshot of this transaction
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute("SELECT pg_stat_get_dead_tuples(%s::regclass)", [name])
+        return cursor.fetchone()[0]
+
+
+def run_maintenance(plan, max_seconds=None, cost_delay_ms=None):
+    """
+    Run the planned commands (which cannot run in a transaction), until they
+    are all done or ``max_seconds`` have passed.
+
+    A plain VACUUM removes the dead rows, which makes their space reusable by
+    the partition, but it does not return the space to the operating system.
+    Only a rewrite (VACUUM FULL) does, so only its size is reported.
+
+    :param cost_delay_ms: The vacuum_cost_delay, which throttles the IO of the
+        (plain) VACUUM and ANALYZE commands.
+
+    :return: List with a dict per processed partition with its name, the
+        command, the number of dead rows before and after, the duration and,
+        of a rewrite, the total size before and after.
+    """
+    started = time.monotonic()
+    report = []
+
+    with connection.cursor() as cursor:
+        if cost_delay_ms is not None:
+            cursor.execute(f"SET vacuum_cost_delay = {float(cost_delay_ms)}")
+
+        for name, command in plan:
+            if max_seconds is not None and time.monotonic() - started >= max_seconds:
+                log.info(
+                    f"Time budget of {max_seconds}s used, skipping "
+                    f"{len(plan) - len(report)} partitions"
+                )
+                break
+
+            full = command == VACUUM_FULL
+            dead = get_dead_rows(name)
+            size = get_total_size(name) if full else None
+            command_started = time.monotonic()
+            cursor.execute(f"{command} {name}")
+            result = dict(
+                name=name,
+                command=command,
+                dead_before=dead,
+                dead_after=get_dead_rows(name),
+                seconds=time.monotonic() - command_started,
+            )
+            message = (
+                f"{command} {name} in {result['seconds']:.1f}s, dead rows "
+                f"{result['dead_before']} -> {result['dead_after']}"
+            )
+            if full:
+                result.update(size_before=size, size_after=get_total_size(name))
+                message += (
+                    f", reclaimed {result['size_before'] - result['size_after']} bytes"
+                )
+            log.info(message)
+            report.append(result)
+
+        if cost_delay_ms is not None:
+            cursor.execute("RESET vacuum_cost_delay")
+
+    return report
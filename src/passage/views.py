@@ -1,23 +1,46 @@
 # std
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
 # 3rd party
 from contrib.rest_framework.authentication import SimpleTokenAuthentication
-from datapunt_api.pagination import HALCursorPagination
-from django.db.models import DateTimeField, ExpressionWrapper, F, Sum
+from django.db.models import F
 from django.utils import timezone
 from django_filters.filterset import filterset_factory
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
-from rest_framework import mixins, viewsets
+from django.conf import settings
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 # iotsignals
-from passage.conversion import convert_to_v1
-from passage.case_converters import to_snakecase
-from passage.expressions import HoursInterval
-from writers import CSVExport
+from passage.bulk import write_passages
+from passage.conversion import normalize_v2
+from passage.case_converters import to_snakecase_cached
+from passage.deserializer import get_deserializer
+from passage.errors import DuplicateIdError
+from passage.export import (
+    CSV,
+    FORMATS,
+    PARQUET,
+    copy_csv,
+    download_response,
+    export as write_export,
+    get_arrow_schema,
+    queryset_rows,
+)
+from passage.export_cache import (
+    cached_download_response,
+    get_monday_key,
+    get_week_end,
+    get_week_key,
+    is_closed,
+)
+from passage.pagination import PassageKeysetPagination
+from passage.parsers import NDJSONParser
 
 from . import models, serializers
-from .util import keymap
 
 
 class PassageFilter(FilterSet):
@@ -36,7 +59,7 @@ class PassageFilter(FilterSet):
             'taxi_indicator': ['exact'],
             'maximale_constructie_snelheid_bromsnorfiets': ['exact'],
             'created_at': ['exact', 'lt', 'gt'],
-            'passage_at': ['exact', 'lt', 'gt'],
+            'passage_at': ['exact', 'lt', 'lte', 'gt', 'gte'],
             'diesel': ['isnull', 'exact', 'lt', 'gt'],
             'gasoline': ['isnull', 'exact', 'lt', 'gt'],
             'electric': ['isnull', 'exact', 'lt', 'gt'],
@@ -50,18 +73,6 @@ utcnow = datetime.datetime.utcnow().replace(tzinfo=tz.gettz('UTC'))
 """
 
 
-class PassagePager(HALCursorPagination):
-    """Sidcon pagination configuration.
-
-    Fill-levels will be many. So we use cursor based pagination.
-    """
-
-    count_table = False
-    page_size = 50
-    max_page_size = 10000
-    ordering = "-passage_at"
-
-
 class PassageViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     serializer_class = serializers.PassageDetailSerializer
     serializer_detail_class = serializers.PassageDetailSerializer
@@ -69,16 +80,125 @@ class PassageViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     queryset = models.Passage.objects.all().order_by('passage_at')
 
     filter_backends = (DjangoFilterBackend,)
-    filter_class = PassageFilter
+    filterset_class = PassageFilter
+
+    pagination_class = PassageKeysetPagination
+
+    def get_authenticators(self):
+        # reading the (raw) passages requires the token, posting does not
+        action_map = getattr(self, 'action_map', {})
+        if action_map.get(self.request.method.lower()) == 'list':
+            return [SimpleTokenAuthentication()]
+        return super().get_authenticators()
+
+    def get_permissions(self):
+        if self.action == 'list':
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    def get_passage_data(self, data):
+        """
+        Convert a single passage payload to the (flat, snakecase) data
+        expected by the serializer.
+        """
+        return {to_snakecase_cached(k): v for k, v in data.items()}
 
-    pagination_class = PassagePager
+    def list(self, request, *args, **kwargs):
+        """
+        Stream a page of the (filtered) passages, ordered by passage_at and
+        paginated with a keyset cursor. Filter on passage_at to only read the
+        partitions of those days.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.paginator.get_streaming_response(queryset, request)
 
-    # override create to convert request.data from camelcase to snakecase.
     def create(self, request, *args, **kwargs):
-        tmp = {to_snakecase(k): v for k, v in request.data.items()}
-        request.data.clear()
-        request.data.update(tmp)
-        return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=self.get_passage_data(request.data))
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+        )
+
+    @action(
+        methods=['post'],
+        detail=False,
+        url_path='bulk',
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create a batch of passages (a JSON array or newline-delimited JSON)
+        using a single multi-row insert (or COPY), and report the status per item:
+        201 (created), 409 (duplicate) or 400 (invalid).
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of passages.')
+        if len(items) > settings.PASSAGE_BULK_MAX_SIZE:
+            raise ValidationError(
+                f'Too many passages, at most {settings.PASSAGE_BULK_MAX_SIZE} '
+                f'are allowed per request.'
+            )
+
+        # the fast-path deserializer results in the same data as the
+        # serializer, without constructing the serializer fields per item.
+        deserializer = get_deserializer()
+        results = [None] * len(items)
+        passages = []
+        for index, item in enumerate(items):
+            try:
+                data = self.get_passage_data(item)
+                passage = deserializer.to_passage(data)
+            except ValidationError as e:
+                results[index] = dict(
+                    index=index, status=status.HTTP_400_BAD_REQUEST, errors=e.detail
+                )
+                continue
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                results[index] = dict(
+                    index=index,
+                    status=status.HTTP_400_BAD_REQUEST,
+                    errors=[f'Malformed passage: {e!r}'],
+                )
+                continue
+            passages.append((index, passage))
+
+        inserted = write_passages([passage for _, passage in passages])
+
+        for index, passage in passages:
+            result = dict(
+                index=index, id=passage.passage_id, volgnummer=passage.volgnummer
+            )
+            if passage.pk in inserted:
+                result['status'] = status.HTTP_201_CREATED
+            else:
+                result['status'] = status.HTTP_409_CONFLICT
+                result['detail'] = DuplicateIdError.default_detail
+            results[index] = result
+
+        created, duplicates, invalid = (
+            sum(1 for result in results if result['status'] == code)
+            for code in (
+                status.HTTP_201_CREATED,
+                status.HTTP_409_CONFLICT,
+                status.HTTP_400_BAD_REQUEST,
+            )
+        )
+        return Response(
+            dict(
+                created=created,
+                duplicates=duplicates,
+                invalid=invalid,
+                results=results,
+            ),
+            status=(
+                status.HTTP_201_CREATED
+                if created == len(results)
+                else status.HTTP_207_MULTI_STATUS
+            ),
+        )
 
     @action(
         methods=['get'],
@@ -88,47 +208,90 @@ class PassageViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
         permission_classes=[IsAuthenticated],
     )
     def export(self, request, *args, **kwargs):
+        export_format = request.GET.get('export_format', CSV)
+        if export_format not in FORMATS:
+            raise ValidationError(
+                {'export_format': f"Choose one of {', '.join(FORMATS)}"}
+            )
+
         # 1. Get the iterator of the QuerySet
         previous_week = timezone.now() - timedelta(days=timezone.now().weekday(), weeks=1)
-        year = previous_week.year
-        week = previous_week.isocalendar()[1]
 
         Filter = filterset_factory(
-            models.PassageHourAggregation, fields=['year', 'week']
+            models.PassageCameraHourRollup, fields=['year', 'week']
         )
         qs = Filter(request.GET).qs
 
+        # The exports of closed weeks are cached (until the hour aggregation
+        # of the week is recalculated), other exports are not.
+        cache_key = None
+
         # If no date has been given, we return the data of last week
         # Since the last week of the year can contain days of both years
         # we will search in both years.
         if not request.GET.get('year') and not request.GET.get('week'):
-            monday = previous_week
-            sunday = monday + timedelta(days=6)
-            qs = qs.filter(date__gte=monday, date__lte=sunday)
+            monday = previous_week.date()
+            # the buckets are UTC dates and hours, stored as naive values
+            start = datetime.combine(monday, time(), tzinfo=dt_timezone.utc)
+            qs = qs.filter(bucket__gte=start, bucket__lt=start + timedelta(days=7))
+            cache_key = get_monday_key(monday)
+        else:
+            try:
+                year, week = int(request.GET['year']), int(request.GET['week'])
+            except (KeyError, ValueError):
+                pass
+            else:
+                if is_closed(get_week_end(year, week)):
+                    cache_key = get_week_key(year, week)
 
         qs = (
-            qs.annotate(
-                bucket=ExpressionWrapper(
-                    F("date") + HoursInterval(F("hour")), output_field=DateTimeField()
-                ),
-            )
-            .values("camera_id", "camera_naam", "bucket")
-            .annotate(sum=Sum("count"))
+            qs.annotate(sum=F("count"))
+            .values("camera_id", "camera_naam", "bucket", "sum")
             .order_by("bucket")
         )
 
-        # 2. Create the instance of our CSVExport class
-        csv_export = CSVExport()
+        # 2. Export (download) the file, streamed from a server-side cursor
+        def get_chunks():
+            if export_format == CSV:
+                # an export without rows is empty (without header)
+                if not qs.exists():
+                    return iter([])
+                # the CSV is written by Postgres (COPY), without per row work.
+                # The bucket is written with its UTC offset, as str() of the
+                # (aware) datetime is.
+                query, params = qs.query.sql_with_params()
+                return copy_csv(
+                    f"""
+                    SELECT
+                        camera_id,
+                        camera_naam,
+                        to_char(bucket, 'YYYY-MM-DD HH24:MI:SS') || '+00:00'
+                            AS bucket,
+                        "sum"
+                    FROM ({query}) AS export
+                    ORDER BY export.bucket
+                    """,
+                    params,
+                )
+            columns, rows = queryset_rows(
+                qs, ['camera_id', 'camera_naam', 'bucket', 'sum']
+            )
+            schema = None
+            if export_format == PARQUET:
+                schema = get_arrow_schema(
+                    models.PassageCameraHourRollup, columns, sum='count'
+                )
+            return write_export(columns, rows, export_format, schema)
 
-        # 3. Export (download) the file
-        return csv_export.export("export", qs.iterator(), streaming=True)
+        if cache_key is None:
+            return download_response('export', get_chunks(), export_format)
+        return cached_download_response(
+            request, cache_key, 'export', export_format, get_chunks
+        )
 
 
 class PassageViewSetVersion2(PassageViewSet):
 
-    def create(self, request, *args, **kwargs):
+    def get_passage_data(self, data):
         # convert to snakecase, and downgrade to a flattened structure.
-        passage_v1 = keymap(to_snakecase, request.data)
-        passage_v2 = convert_to_v1(passage_v1)
-        request.data.update(passage_v2)
-        return super().create(request, *args, **kwargs)
+        return normalize_v2(data)
@@ -1,6 +1,22 @@
 import pytest
+from django.core.cache import caches
 from rest_framework.test import APIClient
 
 @pytest.fixture
 def api_client():
     return APIClient()
+
+
+@pytest.fixture(autouse=True)
+def export_cache():
+    caches['export'].clear()
+    yield caches['export']
+
+
+@pytest.fixture(autouse=True)
+def camera_cache():
+    from passage.camera_cache import get_cache
+
+    get_cache().clear()
+    yield get_cache()
+    get_cache().clear()
@@ -10,3 +10,11 @@ class TestTestUWSGIGzipMiddlewareTest(TestCase):
         middleware = UWSGIGZipMiddleware(lambda request: {})
         response = middleware(request)
         assert response['uWSGI-Encoding'] == 'gzip'
+
+    def test_middleware_compressed(self):
+        request = RequestFactory()
+        middleware = UWSGIGZipMiddleware(
+            lambda request: {'Content-Encoding': 'gzip'}
+        )
+        response = middleware(request)
+        assert 'uWSGI-Encoding' not in response
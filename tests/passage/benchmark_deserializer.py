@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark comparing the PassageDetailSerializer with the fast-path
+PassageDeserializer, in passages (requests) per second. Only the
+deserialization is measured, not the database.
+
+Run from the src directory:
+
+    python ../tests/passage/benchmark_deserializer.py -n 10000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+import django  # noqa: E402
+
+django.setup()
+
+from passage.deserializer import PassageDeserializer  # noqa: E402
+from passage.serializers import PassageDetailSerializer  # noqa: E402
+
+
+def generate_data():
+    return {
+        "version": "passage-v1",
+        "id": str(uuid.uuid4()),
+        "passage_at": datetime.now(timezone.utc).isoformat(),
+        "straat": "Spaarndammerdijk",
+        "rijstrook": 1,
+        "rijrichting": 1,
+        "camera_id": "ddddffff-4444-aaaa-7777-aaaaeeee1111",
+        "camera_naam": "Spaarndammerdijk [Z]",
+        "camera_kijkrichting": 0,
+        "camera_locatie": {"type": "Point", "coordinates": [4.845423, 52.386831]},
+        "kenteken_land": "NL",
+        "kenteken_nummer_betrouwbaarheid": 640,
+        "kenteken_land_betrouwbaarheid": 690,
+        "kenteken_karakters_betrouwbaarheid": [
+            {"betrouwbaarheid": 650, "positie": 1},
+            {"betrouwbaarheid": 630, "positie": 2},
+        ],
+        "indicatie_snelheid": 23.2,
+        "automatisch_verwerkbaar": True,
+        "voertuig_soort": "Bromfiets",
+        "merk": "SYM",
+        "inrichting": "N.V.t.",
+        "datum_eerste_toelating": "2015-03-06",
+        "datum_tenaamstelling": "2015-03-06",
+        "toegestane_maximum_massa_voertuig": 249,
+        "europese_voertuigcategorie": "L1",
+        "europese_voertuigcategorie_toevoeging": "e",
+        "taxi_indicator": True,
+        "maximale_constructie_snelheid_bromsnorfiets": 25,
+        "brandstoffen": [{"brandstof": "Benzine", "volgnummer": 1}],
+        "extra_data": {"foo": "bar"},
+        "diesel": 0,
+        "gasoline": 1,
+        "electric": 0,
+        "versit_klasse": "test klasse",
+    }
+
+
+def serializer(data):
+    # the way the serializer is used per request by the view
+    serializer = PassageDetailSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def benchmark(name, func, payloads):
+    start = time.perf_counter()
+    for data in payloads:
+        func(data)
+    duration = time.perf_counter() - start
+    rate = len(payloads) / duration
+    print(f'{name:<25} {duration:8.3f}s {rate:12.0f} passages/s')
+    return rate
+
+
+def main(args):
+    payloads = [generate_data() for _ in range(args.number)]
+    deserializer = PassageDeserializer()
+
+    serializer_rate = benchmark('PassageDetailSerializer', serializer, payloads)
+    deserializer_rate = benchmark('PassageDeserializer', deserializer.to_row, payloads)
+    print(f'speedup: {deserializer_rate / serializer_rate:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--number', type=int, default=10000, help='number of passages'
+    )
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the latency of the v2 ingest (conversion and deserialization of
+a single payload, without the database), comparing the previous conversion
+(keymap + convert_to_v1) with normalize_v2.
+
+Run from the src directory:
+
+    python ../tests/passage/benchmark_v2_ingest.py -n 10000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.serializers.json import DjangoJSONEncoder  # noqa: E402
+from passage.case_converters import to_snakecase  # noqa: E402
+from passage.conversion import convert_to_v1, normalize_v2  # noqa: E402
+from passage.deserializer import PassageDeserializer  # noqa: E402
+from passage.util import keymap  # noqa: E402
+from tests.passage.factories import PayloadVersion2  # noqa: E402
+
+
+def keymap_convert_to_v1(payload):
+    return convert_to_v1(keymap(to_snakecase, payload))
+
+
+def benchmark(name, convert, payloads, deserializer):
+    latencies = []
+    for payload in payloads:
+        start = time.perf_counter()
+        deserializer.to_row(convert(payload))
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    mean = statistics.mean(latencies) * 1e6
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f'{name:<25} mean {mean:8.1f}us  p50 {p50:8.1f}us  p99 {p99:8.1f}us')
+    return mean
+
+
+def main(args):
+    # the payloads as they are received: json
+    payloads = [
+        json.loads(json.dumps(PayloadVersion2(), cls=DjangoJSONEncoder))
+        for _ in range(args.number)
+    ]
+    deserializer = PassageDeserializer()
+
+    before = benchmark('keymap + convert_to_v1', keymap_convert_to_v1, payloads, deserializer)
+    after = benchmark('normalize_v2', normalize_v2, payloads, deserializer)
+    print(f'speedup: {before / after:.2f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--number', type=int, default=10000, help='number of passages'
+    )
+    main(parser.parse_args())
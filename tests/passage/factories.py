@@ -10,6 +10,7 @@ from factory import fuzzy
 from factory.django import DjangoModelFactory
 
 # iotsignals
+from passage.camera_cache import enrich_passages
 from passage.models import Passage, HulptabelCameragebiedenTaxidashboard
 
 
@@ -98,6 +99,15 @@ class PassageFactory(DjangoModelFactory):
     maximale_constructie_snelheid_bromsnorfiets = fuzzy.FuzzyInteger(0, 500)
     brandstoffen = factory.LazyFunction(get_brandstoffen_v1)
 
+    @classmethod
+    def _create(cls, model_class, *args, **kwargs):
+        # like the passages which are ingested, set the camera information
+        passage = model_class(*args, **kwargs)
+        enrich_passages([passage])
+        passage.save(force_insert=True)
+        return passage
+
+
 class HulptabelCameragebiedenTaxidashboardFactory(DjangoModelFactory):
     class Meta:
         model = HulptabelCameragebiedenTaxidashboard
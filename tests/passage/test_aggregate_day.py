@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+import time_machine
+from django.core.management import call_command
+from django.utils import timezone
+
+from passage.management.commands.make_partitions import make_partitions
+from passage.management.commands.passage_aggregate_day import (
+    DAY_AGGREGATIONS,
+    get_day_bounds,
+    get_default_days,
+)
+from passage.aggregations import AGGREGATIONS
+from passage.models import (
+    Camera,
+    HeavyTrafficHourAggregationV2,
+    HeavyTrafficMinuteAggregation,
+    IGORHourAggregation,
+    PassageHourAggregation,
+    TaxiHourAggregation,
+)
+from .factories import PassageFactory
+
+MODELS = [
+    PassageHourAggregation,
+    IGORHourAggregation,
+    TaxiHourAggregation,
+    HeavyTrafficHourAggregationV2,
+    HeavyTrafficMinuteAggregation,
+]
+
+
+def get_aggregations():
+    return {
+        model: sorted(
+            model.objects.values_list(
+                *[field.name for field in model._meta.fields if field.name != 'id']
+            ),
+            key=str,
+        )
+        for model in MODELS
+    }
+
+
+@pytest.mark.django_db
+class TestAggregateDay:
+    def test_get_day_bounds(self):
+        aggregations = [AGGREGATIONS[name] for name in DAY_AGGREGATIONS]
+        # the local (summer) day starts two hours before the UTC day
+        start, end = get_day_bounds(datetime(2023, 7, 1).date(), aggregations)
+        assert start == datetime(2023, 6, 30, 22)
+        assert end == datetime(2023, 7, 2)
+
+    @time_machine.travel(datetime(2023, 7, 10, 12), tick=False)
+    def test_get_default_days(self):
+        aggregations = [AGGREGATIONS[name] for name in DAY_AGGREGATIONS]
+        days = get_default_days(aggregations)
+
+        # the same days as the separate commands
+        assert [run_date for run_date, _ in days] == [
+            date(2023, 7, 7),
+            date(2023, 7, 8),
+            date(2023, 7, 9),
+        ]
+        for i, (_, day_aggregations) in enumerate(days):
+            assert day_aggregations == [
+                aggregation
+                for aggregation in aggregations
+                if aggregation.default_days >= 3 - i
+            ]
+        assert AGGREGATIONS['passage_hour_aggregation'] in days[-1][1]
+        assert AGGREGATIONS['passage_hour_aggregation'] not in days[0][1]
+
+    @time_machine.travel(datetime.today() + timedelta(days=1), tick=False)
+    def test_aggregate_day(self):
+        camera = Camera.objects.filter(rijrichting_correct=True).first()
+        yesterday = timezone.now() - timedelta(days=1)
+        make_partitions([yesterday - timedelta(days=1)])
+
+        for passage_at in [
+            yesterday,
+            yesterday.replace(hour=0, minute=30),
+            yesterday.replace(hour=23, minute=30),
+        ]:
+            PassageFactory.create_batch(
+                size=3,
+                passage_at=passage_at,
+                camera_id=camera.id,
+                camera_naam=camera.camera_naam,
+                camera_kijkrichting=camera.camera_kijkrichting,
+                rijrichting=camera.rijrichting,
+                toegestane_maximum_massa_voertuig=7500,
+            )
+
+        # the aggregations of the separate commands
+        for name in DAY_AGGREGATIONS:
+            call_command(name, from_date=yesterday.date())
+        expected = get_aggregations()
+        assert expected[PassageHourAggregation]
+        assert expected[HeavyTrafficMinuteAggregation]
+
+        for model in MODELS:
+            model.objects.all().delete()
+
+        call_command('passage_aggregate_day', from_date=yesterday.date())
+        assert get_aggregations() == expected
+
+        # running again replaces the aggregations
+        call_command('passage_aggregate_day')
+        assert get_aggregations() == expected
@@ -0,0 +1,182 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from django.db import connection
+
+from passage.aggregation import (
+    CAMERA_FALLBACK_JOIN,
+    Aggregation,
+    get_bounds,
+    to_utc_bounds,
+    to_utc_naive,
+)
+from passage.aggregations import AGGREGATIONS
+from passage.camera_cache import CAMERA_FIELDS, get_enriched_since, load_cameras
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import HeavyTrafficHourAggregationV2, Passage
+from .factories import PassageFactory
+
+
+class ExampleAggregation(Aggregation):
+    name = 'example'
+    table = 'example_table'
+    date_column = 'date'
+    hour_column = 'hour'
+    time_zone = 'Europe/Amsterdam'
+    dimensions = [
+        ('date', "DATE({passage_at})"),
+        ('camera_id', "camera_id"),
+    ]
+    measures = [('count', "COUNT(*)")]
+    extra_group_by = ["breedte > 140"]
+    filters = ["voertuig_soort = 'Bus'"]
+    order_by = ['camera_id']
+
+
+class TestAggregation:
+    def test_aggregation_query(self):
+        query = ExampleAggregation().get_aggregation_query(
+            date(2024, 1, 1), date(2024, 1, 2)
+        )
+        passage_at = "p.passage_at at time zone 'utc' at time zone 'Europe/Amsterdam'"
+
+        assert 'INSERT INTO example_table (\n            date, camera_id, count' in query
+        assert f"DATE({passage_at}) AS date" in query
+        # the local day is selected using UTC passage_at bounds
+        assert "p.passage_at >= '2023-12-31 23:00:00'" in query
+        assert "p.passage_at < '2024-01-01 23:00:00'" in query
+        assert "AND voertuig_soort = 'Bus'" in query
+        assert 'GROUP BY 1, 2, breedte > 140' in query
+        assert query.rstrip().endswith('ORDER BY camera_id')
+
+    def test_delete_query(self):
+        aggregation = ExampleAggregation()
+        assert "date = '2024-01-01'" in aggregation.get_delete_query(date(2024, 1, 1))
+        assert 'AND hour = 3' in aggregation.get_delete_query(date(2024, 1, 1), 3)
+
+    def test_get_bounds(self):
+        start, end = get_bounds(date(2024, 1, 1), 23)
+        assert (start.day, start.hour) == (1, 23)
+        assert (end.day, end.hour) == (2, 0)
+
+    @pytest.mark.parametrize(
+        'start,end,expected_start,expected_end',
+        [
+            # summer time
+            (
+                date(2023, 7, 1),
+                date(2023, 7, 2),
+                datetime(2023, 6, 30, 22),
+                datetime(2023, 7, 1, 22),
+            ),
+            # the day the clock goes back has 25 hours
+            (
+                date(2023, 10, 29),
+                date(2023, 10, 30),
+                datetime(2023, 10, 28, 22),
+                datetime(2023, 10, 29, 23),
+            ),
+            # the (local) hour which occurs twice
+            (
+                datetime(2023, 10, 29, 2),
+                datetime(2023, 10, 29, 3),
+                datetime(2023, 10, 29),
+                datetime(2023, 10, 29, 2),
+            ),
+            # the (local) hour which does not exist
+            (
+                datetime(2023, 3, 26, 2),
+                datetime(2023, 3, 26, 3),
+                datetime(2023, 3, 26, 1),
+                datetime(2023, 3, 26, 1),
+            ),
+        ],
+    )
+    def test_to_utc_bounds(self, start, end, expected_start, expected_end):
+        assert to_utc_bounds(start, end, 'Europe/Amsterdam') == (
+            expected_start,
+            expected_end,
+        )
+        assert to_utc_bounds(date(2023, 7, 1), date(2023, 7, 2)) == (
+            datetime(2023, 7, 1),
+            datetime(2023, 7, 2),
+        )
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(
+        'name',
+        [
+            'passage_zwaar_verkeer_hour_aggregation_v2',
+            'passage_zwaar_verkeer_minute_aggregation',
+        ],
+    )
+    def test_partition_pruning(self, name):
+        run_date = date(2023, 7, 10)
+        make_partitions(
+            [datetime(2023, 7, 10) + timedelta(days=i) for i in range(-3, 4)]
+        )
+        query = AGGREGATIONS[name].get_aggregation_query(
+            run_date, run_date + timedelta(days=1)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {query}")
+            plan = '\n'.join(row for row, in cursor.fetchall())
+
+        # the local day only needs the partitions of the day and the day before
+        assert 'passage_passage_20230709' in plan
+        assert 'passage_passage_20230710' in plan
+        for day in ['20230707', '20230708', '20230711', '20230712', '20230713']:
+            assert f'passage_passage_{day}' not in plan
+
+    @pytest.mark.django_db
+    def test_camera_fallback_query(self):
+        aggregation = AGGREGATIONS['passage_zwaar_verkeer_hour_aggregation_v2']
+        first_day = to_utc_naive(get_enriched_since()).date()
+
+        # the passages of the days before the camera information was stored
+        # fall back to the helper table
+        query = aggregation.get_aggregation_query(
+            first_day - timedelta(days=1), first_day
+        )
+        assert CAMERA_FALLBACK_JOIN in query
+        assert 'coalesce(p.cordon, c.cordon) AS cordon' in query
+
+        # the later days only use the information of the passages
+        query = aggregation.get_aggregation_query(
+            first_day + timedelta(days=2), first_day + timedelta(days=3)
+        )
+        assert CAMERA_FALLBACK_JOIN not in query
+        assert 'p.cordon AS cordon' in query
+
+    @pytest.mark.django_db
+    def test_camera_fallback(self):
+        (naam, rijrichting, kijkrichting), camera = next(
+            (key, camera)
+            for key, camera in load_cameras().items()
+            if camera['rijrichting_correct'] and camera['cordon']
+        )
+        make_partitions([datetime(2023, 7, 9), datetime(2023, 7, 10)])
+        PassageFactory.create(
+            passage_at=datetime(2023, 7, 10, 12),
+            camera_naam=naam,
+            rijrichting=rijrichting,
+            camera_kijkrichting=kijkrichting,
+            toegestane_maximum_massa_voertuig=7500,
+        )
+        # a passage which was written before the information was stored
+        Passage.objects.update(**dict.fromkeys(CAMERA_FIELDS))
+
+        AGGREGATIONS['passage_zwaar_verkeer_hour_aggregation_v2'].run(
+            date(2023, 7, 10)
+        )
+        aggregation = HeavyTrafficHourAggregationV2.objects.get()
+        assert aggregation.cordon == camera['cordon']
+        assert aggregation.count == 1
+
+    @pytest.mark.parametrize('name', AGGREGATIONS)
+    def test_names(self, name):
+        # the names are the names of the commands, which are used for the
+        # incremental watermarks
+        aggregation = AGGREGATIONS[name]
+        assert aggregation.name == name
+        assert len(aggregation.dimensions) > 0
@@ -1,18 +1,27 @@
 # std
+import base64
 import csv
+import gzip
+import json
 import logging
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone, date
 from itertools import cycle
+from urllib.parse import urlencode
 # 3rd party
+import factory
 import pytest
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import connection
 from django.test import override_settings
 from django.urls import reverse
 from django.utils.dateparse import parse_datetime
 from model_bakery import baker
 # iotsignals
+from passage.aggregations import PassageHourAggregation, update_camera_hour_rollup
 from passage.conversion import convert_to_v1, NEW_FIELDS, RIJRICHTING_MAPPING
+from passage.metrics import get_metrics
+from passage.export_cache import get_version, get_week_key
 from main import PayloadVersion, to_api_version
 from passage.case_converters import to_snakecase
 from passage.models import Passage
@@ -201,10 +210,78 @@ class TestPassageAPI_Versions_1_2(TestPassageAPI):
         res = self.post(payload)
         assert res.status_code == 409, res.data
 
-    def test_get_passages_not_allowed(self, payload_version: PayloadVersion):
+    def test_post_missing_partition(self, payload_version: PayloadVersion):
+        """Test posting a passage for a day without partition"""
+        payload = self.payload(payload_version)
+        key = 'passageAt' if payload_version == 'passage-v1' else 'timestamp'
+        payload[key] = datetime(2002, 5, 5, 12, tzinfo=timezone.utc)
+        before = get_metrics().get('passage_missing_partition', 0)
+
+        res = self.post(payload)
+
+        # the partition is created and the passage is stored in it
+        assert res.status_code == 201, res.data
+        assert get_num_records_in_partition('20020505') == 1
+        assert get_metrics()['passage_missing_partition'] == before + 1
+
+    @override_settings(AUTHORIZATION_TOKEN='foo')
+    def test_get_passages_requires_auth(self, payload_version: PayloadVersion):
         PassageFactory.create()
         response = self.client.get(self.url(payload_version))
-        assert response.status_code == 405
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = self.client.get(
+            self.url(payload_version), HTTP_AUTHORIZATION='Token bar'
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @override_settings(AUTHORIZATION_TOKEN='foo')
+    def test_list_passages(self, payload_version: PayloadVersion):
+        start = datetime(2018, 10, 16, 8, tzinfo=timezone.utc)
+        # the passages at the same passage_at are ordered by id
+        passages = sorted(
+            PassageFactory.create_batch(
+                5, passage_at=factory.Iterator([start, start + timedelta(hours=1)])
+            ),
+            key=lambda passage: (passage.passage_at, str(passage.id)),
+        )
+        PassageFactory.create(passage_at=start - timedelta(hours=1))
+
+        query = urlencode({'passage_at__gte': start.isoformat(), 'page_size': 2})
+        url = f'{self.url(payload_version)}?{query}'
+        ids = []
+        while url:
+            response = self.client.get(url, HTTP_AUTHORIZATION='Token foo')
+            assert response.status_code == 200
+            data = json.loads(b''.join(response.streaming_content))
+            assert len(data['results']) <= 2
+            ids += [result['id'] for result in data['results']]
+            url = data['_links']['next']['href']
+
+        assert ids == [str(passage.passage_id) for passage in passages]
+        # the privacy sensitive fields are not listed
+        assert 'kenteken_hash' not in data['results'][0]
+        assert 'merk' not in data['results'][0]
+
+    @override_settings(AUTHORIZATION_TOKEN='foo')
+    def test_list_passages_invalid_cursor(self, payload_version: PayloadVersion):
+        response = self.client.get(
+            self.url(payload_version),
+            {'cursor': 'invalid'},
+            HTTP_AUTHORIZATION='Token foo',
+        )
+        assert response.status_code == 404
+
+        # a cursor with an invalid id
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(['2018-10-16T08:00:00+00:00', 'invalid']).encode()
+        ).decode()
+        response = self.client.get(
+            self.url(payload_version),
+            {'cursor': cursor},
+            HTTP_AUTHORIZATION='Token foo',
+        )
+        assert response.status_code == 404
 
     def test_update_passages_not_allowed(self, payload_version: PayloadVersion):
         # first post a record
@@ -275,6 +352,7 @@ class TestPassageAPI_Versions_1_2(TestPassageAPI):
                         taxi_indicator=True,
                         _quantity=readings_per_camera,
                     )
+            update_camera_hour_rollup((start_date + timedelta(days=day)).date())
 
         # first post a record
         api_version = to_api_version(payload_version)
@@ -282,7 +360,7 @@ class TestPassageAPI_Versions_1_2(TestPassageAPI):
         response = self.client.get(url, HTTP_AUTHORIZATION='Token foo')
         assert response.status_code == 200
 
-        lines = [line.decode() for line in response.streaming_content]
+        lines = b''.join(response.streaming_content).decode().splitlines()
         content = list(csv.reader(lines))
         header = content.pop(0)
         assert header == ['camera_id', 'camera_naam', 'bucket', 'sum']
@@ -298,7 +376,7 @@ class TestPassageAPI_Versions_1_2(TestPassageAPI):
                     expected_row = [
                         str(camera),
                         f'Camera: {camera}',
-                        expected_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+                        expected_datetime.strftime('%Y-%m-%d %H:%M:%S+00:00'),
                         str(reading_count * readings_per_camera),
                     ]
                     expected_content.append(tuple(expected_row))
@@ -321,31 +399,114 @@ class TestPassageAPI_Versions_1_2(TestPassageAPI):
             hour=1,
             _quantity=100,
         )
+        update_camera_hour_rollup(date.date())
         api_version = to_api_version(payload_version)
         url = reverse(f'{api_version}:passage-export')
         response = self.client.get(
             url, dict(year=2019, week=12), HTTP_AUTHORIZATION='Token foo'
         )
         assert response.status_code == 200
-        lines = [x for x in response.streaming_content]
+        lines = b''.join(response.streaming_content).splitlines()
         assert len(lines) == 0
 
         response = self.client.get(
             url, dict(year=2019, week=11), HTTP_AUTHORIZATION='Token foo'
         )
         assert response.status_code == 200
-        lines = [x for x in response.streaming_content]
+        lines = b''.join(response.streaming_content).splitlines()
 
         # Expect the header and 3 lines
         assert len(lines) == 4
 
         response = self.client.get(url, dict(year=2019), HTTP_AUTHORIZATION='Token foo')
         assert response.status_code == 200
-        lines = [x for x in response.streaming_content]
+        lines = b''.join(response.streaming_content).splitlines()
 
         # Expect the header and 3 lines
         assert len(lines) == 4
 
+    @override_settings(AUTHORIZATION_TOKEN='foo')
+    def test_passage_export_ndjson(self, payload_version: PayloadVersion):
+        date = datetime.fromisocalendar(2019, 11, 1)
+        baker.make(
+            'passage.PassageHourAggregation',
+            camera_id='1',
+            camera_naam='Camera: 1',
+            date=date,
+            year=date.year,
+            week=date.isocalendar()[1],
+            hour=1,
+            count=2,
+            _quantity=3,
+        )
+        update_camera_hour_rollup(date.date())
+        api_version = to_api_version(payload_version)
+        url = reverse(f'{api_version}:passage-export')
+        response = self.client.get(
+            url,
+            dict(year=2019, week=11, export_format='ndjson'),
+            HTTP_AUTHORIZATION='Token foo',
+        )
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).splitlines()
+        assert len(lines) == 1
+        row = json.loads(lines[0])
+        assert row['camera_id'] == '1'
+        assert row['sum'] == 6
+
+        response = self.client.get(
+            url, dict(export_format='xlsx'), HTTP_AUTHORIZATION='Token foo'
+        )
+        assert response.status_code == 400
+
+    @override_settings(AUTHORIZATION_TOKEN='foo')
+    def test_passage_export_cache(self, payload_version: PayloadVersion):
+        date = datetime.fromisocalendar(2019, 11, 1)
+        baker.make(
+            'passage.PassageHourAggregation',
+            camera_id=cycle(range(1, 4)),
+            camera_naam=cycle(f'Camera: {i}' for i in range(1, 4)),
+            date=date,
+            year=date.year,
+            week=date.isocalendar()[1],
+            hour=1,
+            _quantity=3,
+        )
+        update_camera_hour_rollup(date.date())
+        api_version = to_api_version(payload_version)
+        url = reverse(f'{api_version}:passage-export')
+        params = dict(year=2019, week=11)
+        headers = dict(HTTP_AUTHORIZATION='Token foo')
+
+        response = self.client.get(url, params, **headers)
+        assert response.status_code == 200
+        assert 'ETag' not in response
+        content = b''.join(response.streaming_content)
+        assert len(content.splitlines()) == 4
+
+        # the closed week is cached once it has been downloaded
+        response = self.client.get(url, params, **headers)
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert b''.join(response.streaming_content) == content
+
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag, **headers)
+        assert response.status_code == 304
+
+        response = self.client.get(url, params, HTTP_ACCEPT_ENCODING='gzip', **headers)
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.content) == content
+
+        # recalculating the aggregation of a day of the week invalidates it,
+        # in the database, so in the cache of every container
+        PassageHourAggregation().run(date.date() + timedelta(days=2))
+        assert get_version(get_week_key(2019, 11)) == 1
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag, **headers)
+        assert response.status_code == 200
+        assert 'ETag' not in response
+
     def test_privacy_maximum_massa(self, payload_version: PayloadVersion):
         payload = self.payload(payload_version)
         if payload_version == 'passage-v1':
@@ -393,6 +554,94 @@ class TestPassageAPI_Versions_1_2(TestPassageAPI):
             assert_response(res.data, payload)
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize('payload_version', ["passage-v1", "passage-v2"])
+class TestPassageBulkAPI:
+    """Test the bulk passage endpoint (both versions 0 and 2)."""
+
+    @pytest.fixture(autouse=True)
+    def inject_api_client(self, api_client):
+        self.client = api_client
+
+    def url(self, payload_version: PayloadVersion):
+        return f'/{to_api_version(payload_version)}/milieuzone/passage/'
+
+    def bulk_url(self, payload_version: PayloadVersion):
+        return f'{self.url(payload_version)}bulk/'
+
+    def post(self, body):
+        return self.client.post(self.url(body['version']), body, format='json')
+
+    def payload(self, payload_version: PayloadVersion) -> dict:
+        return TestPassageAPI.payload(payload_version)
+
+    def test_post_bulk(self, payload_version: PayloadVersion):
+        payloads = [self.payload(payload_version) for _ in range(3)]
+        res = self.client.post(
+            self.bulk_url(payload_version), payloads, format='json'
+        )
+        assert res.status_code == 201, res.data
+        assert res.data['created'] == 3
+        assert Passage.objects.count() == 3
+        for index, (payload, result) in enumerate(zip(payloads, res.data['results'])):
+            assert result['index'] == index
+            assert str(result['id']) == payload['id']
+            assert result['status'] == 201
+            assert Passage.objects.get(passage_id=payload['id'])
+
+    def test_post_bulk_missing_partition(self, payload_version: PayloadVersion):
+        payloads = [self.payload(payload_version) for _ in range(2)]
+        key = 'passageAt' if payload_version == 'passage-v1' else 'timestamp'
+        payloads[1][key] = datetime(2002, 6, 6, 12, tzinfo=timezone.utc)
+
+        res = self.client.post(
+            self.bulk_url(payload_version), payloads, format='json'
+        )
+        assert res.status_code == 201, res.data
+        assert Passage.objects.count() == 2
+        assert get_num_records_in_partition('20020606') == 1
+
+    def test_post_bulk_duplicate_and_invalid(self, payload_version: PayloadVersion):
+        existing, new, invalid = (self.payload(payload_version) for _ in range(3))
+        res = self.post(existing)
+        assert res.status_code == 201, res.data
+
+        if payload_version == 'passage-v1':
+            invalid["kentekenNummerBetrouwbaarheid"] = -1
+        else:
+            invalid["voertuig"]["kenteken"]["betrouwbaarheid"][
+                "kentekenBetrouwbaarheid"
+            ] = -1
+
+        res = self.client.post(
+            self.bulk_url(payload_version), [existing, new, invalid], format='json'
+        )
+        assert res.status_code == 207, res.data
+        assert [result['status'] for result in res.data['results']] == [409, 201, 400]
+        assert (res.data['created'], res.data['duplicates'], res.data['invalid']) == (
+            1,
+            1,
+            1,
+        )
+        assert Passage.objects.count() == 2
+
+    def test_post_bulk_ndjson(self, payload_version: PayloadVersion):
+        payloads = [self.payload(payload_version) for _ in range(2)]
+        body = '\n'.join(json.dumps(payload, cls=DjangoJSONEncoder) for payload in payloads)
+        res = self.client.post(
+            self.bulk_url(payload_version), body, content_type='application/x-ndjson'
+        )
+        assert res.status_code == 201, res.data
+        assert Passage.objects.count() == 2
+
+    def test_post_bulk_requires_list(self, payload_version: PayloadVersion):
+        res = self.client.post(
+            self.bulk_url(payload_version), self.payload(payload_version), format='json'
+        )
+        assert res.status_code == 400, res.data
+        assert Passage.objects.count() == 0
+
+
 @pytest.mark.django_db
 class TestPassageAPI_Version_2(TestPassageAPI):
     """Test the passage version 2 endpoint."""
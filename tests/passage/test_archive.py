@@ -0,0 +1,114 @@
+import csv
+from datetime import date, datetime
+
+import pytest
+from django.core.management import call_command
+
+from passage import archive
+from passage.archive import get_archive_path, get_archived_days
+from passage.management.commands.make_partitions import make_partitions
+from passage.management.commands.passage_aggregate_day import aggregate_day
+from passage.aggregations import AGGREGATIONS
+from passage.models import PassageArchive, PassageHourAggregation
+from passage.partitions import create_partition, partition_exists
+from .factories import PassageFactory
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.mark.django_db
+class TestArchive:
+    @pytest.fixture(autouse=True)
+    def archive_dir(self, settings, tmp_path):
+        settings.PASSAGE_ARCHIVE_DIR = str(tmp_path / 'archive')
+        return tmp_path / 'archive'
+
+    def test_archive_partitions(self, archive_dir, tmp_path, monkeypatch):
+        # the archives are read in batches
+        monkeypatch.setattr(archive, 'BATCH_SIZE', 2)
+        day = date(2021, 3, 1)
+        make_partitions([day, date.today()])
+        PassageFactory.create_batch(
+            size=3, passage_at=datetime(2021, 3, 1, 12), camera_id='1'
+        )
+        PassageFactory.create(passage_at=datetime(2021, 3, 1, 13), camera_id='2')
+
+        call_command('archive_partitions', days=28)
+
+        assert not partition_exists(day)
+        assert partition_exists(date.today())
+        assert get_archived_days() == [day]
+        assert (archive_dir / 'passage_passage_20210301.parquet').exists()
+        assert get_archive_path(day).endswith('passage_passage_20210301.parquet')
+
+        # the exports read the archive
+        call_command(
+            'export_passages',
+            from_date='2021-03-01',
+            to_date='2021-03-02',
+            camera_id=['1'],
+            fields=['passage_at', 'camera_id'],
+            output=str(tmp_path),
+        )
+        with open(tmp_path / 'passage_passage_20210301.csv', newline='') as f:
+            content = list(csv.reader(f))
+        assert content[0] == ['passage_at', 'camera_id']
+        assert len(content) == 4
+
+        # and so do the aggregations
+        aggregate_day(day, [AGGREGATIONS['passage_hour_aggregation']])
+        assert sum(
+            PassageHourAggregation.objects.filter(date=day).values_list(
+                'count', flat=True
+            )
+        ) == 4
+
+        # and so does a single aggregation, which does not replace the
+        # aggregations of the archived passages by nothing
+        AGGREGATIONS['passage_hour_aggregation'].run(day)
+        assert sum(
+            PassageHourAggregation.objects.filter(date=day).values_list(
+                'count', flat=True
+            )
+        ) == 4
+
+    def test_archive_late_passages(self, archive_dir):
+        day = date(2021, 3, 1)
+        make_partitions([day])
+        PassageFactory.create_batch(size=3, passage_at=datetime(2021, 3, 1, 12))
+        call_command('archive_partitions', days=28)
+
+        # a late passage recreates the partition of the archived day, whose
+        # passages are read from both
+        create_partition(day)
+        PassageFactory.create(passage_at=datetime(2021, 3, 1, 13))
+        assert get_archived_days() == [day]
+        AGGREGATIONS['passage_hour_aggregation'].run(day)
+        assert sum(
+            PassageHourAggregation.objects.filter(date=day).values_list(
+                'count', flat=True
+            )
+        ) == 4
+
+        # archiving the recreated partition adds an archive of the day
+        call_command('archive_partitions', days=28)
+        assert not partition_exists(day)
+        assert (archive_dir / 'passage_passage_20210301.1.parquet').exists()
+        archives = PassageArchive.objects.filter(day=day).order_by('id')
+        assert list(archives.values_list('passages', flat=True)) == [3, 1]
+        aggregate_day(day, [AGGREGATIONS['passage_hour_aggregation']])
+        assert sum(
+            PassageHourAggregation.objects.filter(date=day).values_list(
+                'count', flat=True
+            )
+        ) == 4
+
+    def test_manage_partitions_archive(self, archive_dir):
+        day = date(2021, 3, 1)
+        make_partitions([day])
+        PassageFactory.create(passage_at=datetime(2021, 3, 1, 12))
+
+        call_command('manage_partitions', days=1, retention_days=28, archive=True)
+
+        assert not partition_exists(day)
+        assert get_archived_days() == [day]
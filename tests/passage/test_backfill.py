@@ -0,0 +1,111 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+import pytest
+import time_machine
+from django.core.management import call_command
+from django.utils import timezone
+
+from passage.aggregation import run_days
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import AggregationWatermark, PassageHourAggregation
+from .factories import PassageFactory
+
+
+def midnight(day):
+    return datetime.combine(day, time(), tzinfo=dt_timezone.utc)
+
+
+def create_passages(days):
+    for day in days:
+        passage_at = midnight(day) + timedelta(hours=12)
+        make_partitions([passage_at])
+        PassageFactory.create(passage_at=passage_at)
+
+
+class TestBackfill:
+    @pytest.mark.django_db
+    def test_progress(self):
+        days = [date(2023, 1, 1), date(2023, 1, 2), date(2023, 1, 3)]
+        done = []
+
+        def run_day(run_date):
+            if run_date == days[1]:
+                raise ValueError('failed')
+            done.append(run_date)
+
+        with pytest.raises(ValueError):
+            run_days('test', run_day, days, backfill=True)
+
+        # the failed day is the first day which is not completed
+        watermark = AggregationWatermark.objects.get(name='test_backfill')
+        assert watermark.watermark == midnight(days[1])
+        assert (watermark.from_date, watermark.to_date) == (days[0], days[-1])
+
+        done.clear()
+        run_days('test', done.append, days, backfill=True, resume=True)
+        assert done == days[1:]
+        watermark.refresh_from_db()
+        assert watermark.watermark == midnight(days[2] + timedelta(days=1))
+
+    @pytest.mark.django_db
+    def test_resume_other_range(self):
+        days = [date(2023, 1, 1), date(2023, 1, 2), date(2023, 1, 3)]
+        AggregationWatermark.objects.create(
+            name='test_backfill',
+            watermark=midnight(days[2]),
+            from_date=days[1],
+            to_date=days[2],
+        )
+
+        # the watermark of the backfill from another date is ignored
+        done = []
+        run_days('test', done.append, days, backfill=True, resume=True)
+        assert done == days
+        watermark = AggregationWatermark.objects.get(name='test_backfill')
+        assert (watermark.from_date, watermark.to_date) == (days[0], days[-1])
+
+    @pytest.mark.django_db
+    def test_no_backfill(self):
+        run_days('test', lambda run_date: None, [date(2023, 1, 1)])
+        assert not AggregationWatermark.objects.exists()
+
+    @pytest.mark.django_db
+    @time_machine.travel(datetime.today() + timedelta(days=1), tick=False)
+    def test_resume(self):
+        today = timezone.now().date()
+        days = [today - timedelta(days=i) for i in range(3, 0, -1)]
+        create_passages(days)
+        # interrupted when the backfill ran yesterday
+        AggregationWatermark.objects.create(
+            name='passage_hour_aggregation_backfill',
+            watermark=midnight(days[1]),
+            from_date=days[0],
+            to_date=days[1],
+        )
+
+        call_command('passage_hour_aggregation', from_date=days[0], resume=True)
+
+        assert sorted(PassageHourAggregation.objects.values_list('date', flat=True)) == (
+            days[1:]
+        )
+        watermark = AggregationWatermark.objects.get(
+            name='passage_hour_aggregation_backfill'
+        )
+        assert watermark.watermark == midnight(today)
+
+    # the days are processed in other threads, using other connections, so
+    # the data has to be committed.
+    @pytest.mark.django_db(transaction=True, serialized_rollback=True)
+    @time_machine.travel(datetime.today() + timedelta(days=1), tick=False)
+    def test_jobs(self, settings):
+        settings.AGGREGATION_MAX_JOBS = 2
+        today = timezone.now().date()
+        days = [today - timedelta(days=i) for i in range(4, 0, -1)]
+        create_passages(days)
+
+        call_command('passage_hour_aggregation', from_date=days[0], jobs=8)
+
+        assert sorted(PassageHourAggregation.objects.values_list('date', flat=True)) == (
+            days
+        )
+        assert PassageHourAggregation.objects.filter(count=1).count() == len(days)
@@ -0,0 +1,108 @@
+import pytest
+
+from passage.buffer import PassageBuffer
+from passage.errors import DuplicateIdError
+from passage.metrics import get_metrics
+from passage.models import Passage
+from .factories import PassageFactory
+
+
+class FakeWriter:
+    """Records the written batches, treats passages in `duplicates` as such."""
+
+    def __init__(self, duplicates=()):
+        self.batches = []
+        self.duplicates = {passage.pk for passage in duplicates}
+
+    def __call__(self, passages):
+        self.batches.append(passages)
+        return {p.pk for p in passages if p.pk not in self.duplicates}
+
+
+class TestPassageBuffer:
+    def test_flush_on_max_size(self):
+        writer = FakeWriter()
+        buffer = PassageBuffer(max_size=3, max_delay_ms=60_000, writer=writer)
+        passages = PassageFactory.build_batch(size=3)
+
+        futures = [buffer.submit(passage) for passage in passages]
+
+        assert [f.result(timeout=5) for f in futures] == passages
+        assert writer.batches == [passages]
+
+    def test_flush_on_max_delay(self):
+        writer = FakeWriter()
+        buffer = PassageBuffer(max_size=100, max_delay_ms=10, writer=writer)
+        passage = PassageFactory.build()
+
+        assert buffer.submit(passage).result(timeout=5) == passage
+        assert writer.batches == [[passage]]
+
+    def test_duplicate(self):
+        passages = PassageFactory.build_batch(size=2)
+        writer = FakeWriter(duplicates=passages[:1])
+        buffer = PassageBuffer(max_size=2, max_delay_ms=60_000, writer=writer)
+
+        duplicate, new = [buffer.submit(passage) for passage in passages]
+
+        with pytest.raises(DuplicateIdError):
+            duplicate.result(timeout=5)
+        assert new.result(timeout=5) == passages[1]
+
+    def test_writer_error(self):
+        calls = []
+
+        def writer(passages):
+            calls.append(passages)
+            raise RuntimeError('boom')
+
+        failed = get_metrics().get('passage_buffer_failed', 0)
+        buffer = PassageBuffer(
+            max_size=100,
+            max_delay_ms=60_000,
+            writer=writer,
+            retries=2,
+            retry_delay_ms=0,
+        )
+        future = buffer.submit(PassageFactory.build())
+        buffer.flush()
+
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+        assert len(calls) == 3
+        assert get_metrics()['passage_buffer_failed'] == failed + 1
+
+    def test_writer_retry(self):
+        writer = FakeWriter()
+        calls = []
+
+        def flaky_writer(passages):
+            calls.append(passages)
+            if len(calls) == 1:
+                raise RuntimeError('boom')
+            return writer(passages)
+
+        buffer = PassageBuffer(
+            max_size=100,
+            max_delay_ms=60_000,
+            writer=flaky_writer,
+            retries=1,
+            retry_delay_ms=0,
+        )
+        passage = PassageFactory.build()
+        future = buffer.submit(passage)
+        buffer.flush()
+
+        assert future.result(timeout=5) == passage
+        assert len(calls) == 2
+        assert writer.batches == [[passage]]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_insert_passages(self):
+        buffer = PassageBuffer(max_size=100, max_delay_ms=60_000)
+        passages = PassageFactory.build_batch(size=5)
+        futures = [buffer.submit(passage) for passage in passages]
+        buffer.flush()
+
+        assert all(future.done() for future in futures)
+        assert Passage.objects.count() == 5
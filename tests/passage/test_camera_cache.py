@@ -0,0 +1,105 @@
+from datetime import date, datetime, time
+
+import pytest
+from django.core.management import call_command
+
+from passage.bulk import write_passages
+from passage.camera_cache import (
+    CAMERA_FIELDS,
+    add_version,
+    get_cache,
+    get_version,
+)
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import Camera, Passage
+from .factories import PassageFactory
+
+
+def get_helper_camera():
+    return Camera.objects.filter(
+        cordon__isnull=False,
+        rijrichting__isnull=False,
+        camera_kijkrichting__isnull=False,
+    ).order_by('id').first()
+
+
+def build_passage(camera, **kwargs):
+    return PassageFactory.build(
+        camera_naam=camera.camera_naam,
+        rijrichting=camera.rijrichting,
+        camera_kijkrichting=camera.camera_kijkrichting,
+        **kwargs,
+    )
+
+
+def get_camera_information(passage):
+    return Passage.objects.filter(id=passage.id).values(*CAMERA_FIELDS).get()
+
+
+@pytest.mark.django_db
+class TestCameraCache:
+    @pytest.mark.parametrize('writer', ['insert', 'copy'])
+    def test_write_passages(self, writer, settings):
+        settings.PASSAGE_BULK_WRITER = writer
+        camera = get_helper_camera()
+        known = build_passage(camera)
+        unknown = PassageFactory.build(camera_naam='unknown')
+        write_passages([known, unknown])
+
+        assert get_camera_information(known) == {
+            field: getattr(camera, field) for field in CAMERA_FIELDS
+        }
+        assert get_camera_information(unknown) == dict.fromkeys(CAMERA_FIELDS)
+
+    def test_reload(self, settings):
+        settings.PASSAGE_CAMERA_CACHE_CHECK_SECONDS = 0
+        camera = get_helper_camera()
+        key = (camera.camera_naam, camera.rijrichting, camera.camera_kijkrichting)
+        assert get_cache().get_cameras()[key]['cordon'] == camera.cordon
+
+        # the cache is only reloaded for a new version
+        Camera.objects.filter(id=camera.id).update(cordon='test')
+        assert get_cache().get_cameras()[key]['cordon'] == camera.cordon
+        add_version()
+        assert get_cache().get_cameras()[key]['cordon'] == 'test'
+
+    def test_import_updates_passages(self):
+        today = datetime.combine(date.today(), time(12))
+        make_partitions([datetime(2021, 3, 1), today])
+        camera = get_helper_camera()
+        passage = build_passage(camera, passage_at=today)
+        old = build_passage(camera, passage_at=datetime(2021, 3, 1, 12))
+        write_passages([passage, old])
+
+        # the import of the helper table reverts this change of the camera
+        Camera.objects.filter(id=camera.id).update(cordon='test')
+        Passage.objects.update(cordon='test')
+
+        version = get_version()
+        call_command('camera_hulptable_import')
+        assert get_version() != version
+        assert get_camera_information(passage)['cordon'] == camera.cordon
+        # the old passages are left to enrich_passages
+        assert get_camera_information(old)['cordon'] == 'test'
+
+    def test_enrich_passages(self):
+        make_partitions([datetime(2021, 3, 1)])
+        camera = get_helper_camera()
+        known = PassageFactory.create(
+            passage_at=datetime(2021, 3, 1, 12),
+            camera_naam=camera.camera_naam,
+            rijrichting=camera.rijrichting,
+            camera_kijkrichting=camera.camera_kijkrichting,
+        )
+        unknown = PassageFactory.create(passage_at=datetime(2021, 3, 1, 12))
+        # passages which were written before the information was stored
+        Passage.objects.update(**dict.fromkeys(CAMERA_FIELDS))
+        Passage.objects.filter(id=unknown.id).update(cordon='test')
+
+        call_command('enrich_passages', to_date='2021-03-01')
+        assert get_camera_information(unknown)['cordon'] == 'test'
+
+        call_command('enrich_passages', from_date='2021-03-01')
+
+        assert get_camera_information(known)['cordon'] == camera.cordon
+        assert get_camera_information(unknown) == dict.fromkeys(CAMERA_FIELDS)
@@ -0,0 +1,43 @@
+import pytest
+
+from passage.case_converters import (
+    seed_snakecase_cache,
+    to_snakecase,
+    to_snakecase_cached,
+)
+from passage.conversion import V2_KEYS
+from passage.metrics import get_metrics, increment
+from passage.util import keyfilter, keyfilter_snakecase, keymap, keymap_snakecase
+
+
+class TestCaseConverters:
+    @pytest.mark.parametrize('key', V2_KEYS + ['camelCase', 'HTTPResponse', 'a1B'])
+    def test_to_snakecase_cached(self, key):
+        assert to_snakecase_cached(key) == to_snakecase(key)
+
+    def test_cache_hits(self):
+        seed_snakecase_cache(['someUnseenKey'])
+        info = to_snakecase_cached.cache_info()
+
+        assert to_snakecase_cached('someUnseenKey') == 'some_unseen_key'
+        assert to_snakecase_cached.cache_info().hits == info.hits + 1
+        assert to_snakecase_cached.cache_info().misses == info.misses
+
+    def test_keymap_snakecase(self):
+        data = {'fooBar': {'bazQux': 1}, 'lijst': [{'fooBar': 1}]}
+        assert keymap_snakecase(data) == keymap(to_snakecase, data)
+
+    def test_keyfilter_snakecase(self):
+        data = {'fooBar': 1, 'bazQux': {'fooBar': 2, 'quuxQuuz': 3}}
+        result = keyfilter_snakecase(lambda key: key != 'foo_bar', data)
+
+        assert result == keyfilter(lambda key: key != 'fooBar', data)
+        assert result == {'bazQux': {'quuxQuuz': 3}}
+
+    def test_metrics(self):
+        increment('test_counter', 2)
+        metrics = get_metrics()
+
+        assert metrics['test_counter'] >= 2
+        assert metrics['to_snakecase_cache_hits'] >= 0
+        assert metrics['to_snakecase_cache_misses'] >= 0
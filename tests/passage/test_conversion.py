@@ -0,0 +1,78 @@
+from copy import deepcopy
+
+import pytest
+
+from passage.case_converters import to_snakecase
+from passage.conversion import convert_to_v1, normalize_v2
+from passage.util import keymap
+from .factories import PayloadVersion2
+
+
+def convert(payload):
+    return convert_to_v1(keymap(to_snakecase, payload))
+
+
+class TestNormalizeV2:
+    @pytest.mark.parametrize('_', range(10))
+    def test_equivalence(self, _):
+        payload = PayloadVersion2()
+        assert normalize_v2(payload) == convert(payload)
+
+    @pytest.mark.parametrize(
+        'path',
+        [
+            ('automatischVerwerkbaar',),
+            ('rijstrook',),
+            ('rijrichting',),
+            ('camera', 'locatie'),
+            ('camera', 'locatie', 'latitude'),
+            ('camera', 'naam'),
+            ('voertuig', 'kenteken'),
+            ('voertuig', 'kenteken', 'betrouwbaarheid'),
+            ('voertuig', 'jaarEersteToelating'),
+            ('voertuig', 'brandstoffen'),
+            ('voertuig', 'indicatieSnelheid'),
+        ],
+    )
+    def test_equivalence_missing(self, path):
+        payload = PayloadVersion2()
+        *parents, key = path
+        parent = payload
+        for name in parents:
+            parent = parent[name]
+        del parent[key]
+
+        assert normalize_v2(payload) == convert(payload)
+
+    def test_equivalence_additional_fields(self):
+        payload = PayloadVersion2()
+        payload['camera']['extraGegevens'] = {'fooBar': {'bazQux': 1}}
+        payload['voertuig']['nieuwVeld'] = [{'fooBar': 1}]
+        payload['voertuig']['kenteken']['nieuwVeld'] = 1
+        payload['onbekendVeld'] = 1
+
+        result = normalize_v2(payload)
+        assert result == convert(payload)
+        assert result['extra_gegevens'] == {'foo_bar': {'baz_qux': 1}}
+        assert result['nieuw_veld'] == [{'fooBar': 1}]
+
+    def test_empty_fuels(self):
+        payload = PayloadVersion2()
+        payload['voertuig']['brandstoffen'] = []
+
+        result = normalize_v2(payload)
+        assert result == convert(payload)
+        assert result['diesel'] is None
+
+    def test_payload_is_not_modified(self):
+        payload = PayloadVersion2()
+        expected = deepcopy(payload)
+        normalize_v2(payload)
+        assert payload == expected
+
+    @pytest.mark.parametrize('key', ['id', 'volgnummer', 'timestamp', 'camera'])
+    def test_missing_required(self, key):
+        payload = PayloadVersion2()
+        del payload[key]
+        with pytest.raises(KeyError):
+            normalize_v2(payload)
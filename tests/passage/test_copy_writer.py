@@ -0,0 +1,68 @@
+import pytest
+from django.db import transaction
+from django.utils import timezone
+
+from passage.copy_writer import copy_passages
+from passage.models import Passage
+from .factories import PassageFactory
+
+
+@pytest.mark.django_db
+class TestCopyWriter:
+    def test_copy_passages(self):
+        passages = PassageFactory.build_batch(size=5)
+        assert copy_passages(passages) == 5
+        assert Passage.objects.count() == 5
+
+        for expected in passages:
+            actual = Passage.objects.get(pk=expected.pk)
+            assert actual.created_at is not None
+            assert actual.passage_at == expected.passage_at
+            assert actual.brandstoffen == expected.brandstoffen
+            assert (
+                actual.kenteken_karakters_betrouwbaarheid
+                == expected.kenteken_karakters_betrouwbaarheid
+            )
+            assert actual.camera_locatie.coords == pytest.approx(
+                expected.camera_locatie.coords
+            )
+            assert actual.camera_locatie.srid == 4326
+            assert actual.taxi_indicator == expected.taxi_indicator
+            assert actual.datum_eerste_toelating == expected.datum_eerste_toelating
+
+    def test_copy_passages_null_values(self):
+        passage = PassageFactory.build(
+            camera_locatie=None, brandstoffen=None, straat='', merk=None
+        )
+        copy_passages([passage])
+
+        actual = Passage.objects.get(pk=passage.pk)
+        assert actual.camera_locatie is None
+        assert actual.brandstoffen is None
+        assert actual.straat == ''
+        assert actual.merk is None
+
+    def test_copy_passages_ignore_conflicts(self):
+        existing = PassageFactory.create()
+        duplicate = PassageFactory.build(
+            passage_id=existing.passage_id,
+            volgnummer=existing.volgnummer,
+            passage_at=existing.passage_at,
+        )
+        new = PassageFactory.build(passage_at=timezone.now())
+
+        inserted = copy_passages([duplicate, new], ignore_conflicts=True)
+
+        assert inserted == {new.pk}
+        assert Passage.objects.count() == 2
+
+    def test_copy_passages_ignore_conflicts_twice(self):
+        first = PassageFactory.build(passage_at=timezone.now())
+        second = PassageFactory.build(passage_at=timezone.now())
+
+        # the temporary table is reused within the transaction
+        with transaction.atomic():
+            assert copy_passages([first], ignore_conflicts=True) == {first.pk}
+            assert copy_passages([second], ignore_conflicts=True) == {second.pk}
+
+        assert Passage.objects.count() == 2
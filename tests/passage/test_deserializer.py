@@ -0,0 +1,100 @@
+import json
+import uuid
+
+import pytest
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import ValidationError
+
+from passage.case_converters import to_snakecase
+from passage.copy_writer import COLUMNS
+from passage.deserializer import PassageDeserializer
+from passage.serializers import PassageDetailSerializer
+from .factories import PayloadVersion1
+
+
+def get_data(**kwargs):
+    payload = PayloadVersion1(**kwargs)
+    # the way the data is received: json
+    payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+    return {to_snakecase(k): v for k, v in payload.items()}
+
+
+def serialize(data):
+    serializer = PassageDetailSerializer(data=data)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, serializer.errors
+
+
+def deserialize(data):
+    try:
+        return PassageDeserializer().to_internal_value(data), None
+    except ValidationError as e:
+        return None, e.detail
+
+
+class TestPassageDeserializer:
+    @pytest.mark.parametrize(
+        'kwargs',
+        [
+            {},
+            # privacy rules
+            dict(toegestaneMaximumMassaVoertuig=3500, voertuigSoort='Personenauto'),
+            dict(toegestaneMaximumMassaVoertuig=3501, voertuigSoort='Bus'),
+            # coercion
+            dict(straat='  Spaarndammerdijk  ', merk=''),
+            dict(straat='Straße', cameraNaam=12),
+            dict(rijstrook='3', rijrichting='1.0', volgnummer=2),
+            dict(cameraKijkrichting='12.5', indicatieSnelheid=30),
+            dict(automatischVerwerkbaar='true', taxiIndicator=0),
+            dict(merk=None, brandstoffen=None, cameraLocatie=None),
+            dict(datumEersteToelating=None),
+            # invalid
+            dict(kentekenNummerBetrouwbaarheid=-1, kentekenLand='NLD'),
+            dict(rijstrook='a', taxiIndicator='maybe', straat=['a']),
+            dict(version='', id='not-a-uuid', passageAt='yesterday'),
+            dict(version=None, straat='\x00'),
+        ],
+    )
+    def test_equivalence(self, kwargs):
+        data = get_data(**kwargs)
+        assert deserialize(data) == serialize(data)
+
+    @pytest.mark.parametrize('missing', ['id', 'version', 'passage_at', 'straat'])
+    def test_equivalence_missing(self, missing):
+        data = get_data()
+        del data[missing]
+        assert deserialize(data) == serialize(data)
+
+    @pytest.mark.parametrize('data', [[], 'foo'])
+    def test_invalid_data(self, data):
+        assert deserialize(data) == serialize(data)
+
+    def test_to_row(self):
+        data = get_data(volgnummer=3)
+        row = PassageDeserializer().to_row(data)
+
+        assert len(row) == len(COLUMNS)
+        row = dict(zip(COLUMNS, row))
+        assert isinstance(row['id'], uuid.UUID)
+        assert row['passage_id'] == uuid.UUID(data['id'])
+        assert row['volgnummer'] == 3
+        assert row['created_at'] is not None
+        assert row['datum_tenaamstelling'] is None
+
+    def test_to_row_defaults(self):
+        data = get_data()
+        data.pop('volgnummer', None)
+        del data['straat']
+        row = dict(zip(COLUMNS, PassageDeserializer().to_row(data)))
+
+        assert row['volgnummer'] == 1
+        assert row['straat'] is None
+
+    def test_to_passage(self):
+        data = get_data()
+        passage = PassageDeserializer().to_passage(data)
+        validated_data = serialize(data)[0]
+
+        for key, value in validated_data.items():
+            assert getattr(passage, key) == value
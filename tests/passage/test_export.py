@@ -0,0 +1,181 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from passage import export
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import Passage, PassageCameraHourRollup
+from .factories import PassageFactory
+
+
+class TestWriters:
+    def test_csv_chunks(self, monkeypatch):
+        monkeypatch.setattr(export, 'CHUNK_SIZE', 100)
+        rows = [(i, f'camera {i}') for i in range(100)]
+        chunks = list(export.write_csv(['id', 'camera'], iter(rows)))
+
+        # the rows are written in chunks of (about) CHUNK_SIZE, not per row
+        assert 1 < len(chunks) < len(rows)
+        content = list(csv.reader(''.join(chunks).splitlines()))
+        assert content[0] == ['id', 'camera']
+        assert content[1:] == [[str(i), camera] for i, camera in rows]
+
+    def test_csv_no_rows(self):
+        assert list(export.write_csv(['id'], iter([]))) == ['id\r\n']
+
+    def test_ndjson(self, monkeypatch):
+        monkeypatch.setattr(export, 'CHUNK_SIZE', 100)
+        rows = [(i, datetime(2021, 1, 1, i)) for i in range(10)]
+        chunks = list(export.write_ndjson(['id', 'passage_at'], iter(rows)))
+
+        assert 1 < len(chunks) < len(rows)
+        lines = ''.join(chunks).splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {'id': i, 'passage_at': f'2021-01-01T{i:02}:00:00'} for i in range(10)
+        ]
+
+    def test_parquet(self):
+        pq = pytest.importorskip('pyarrow.parquet')
+        import pyarrow as pa
+
+        rows = [(i, f'camera {i}', None, {'a': i}) for i in range(5)]
+        columns = ['id', 'camera', 'empty', 'extra']
+        schema = pa.schema(
+            [
+                ('id', pa.int32()),
+                ('camera', pa.string()),
+                ('empty', pa.float64()),
+                ('extra', pa.string()),
+            ]
+        )
+        chunks = list(
+            export.write_parquet(columns, iter(rows), schema, row_group_size=2)
+        )
+        table = pq.read_table(pa.BufferReader(b''.join(chunks)))
+
+        assert table.num_rows == 5
+        assert table.schema == schema
+        assert table.column('camera').to_pylist()[-1] == 'camera 4'
+        assert table.column('extra').to_pylist()[0] == '{"a": 0}'
+
+    def test_parquet_null_first_batch(self):
+        pq = pytest.importorskip('pyarrow.parquet')
+        import pyarrow as pa
+
+        # the column has no values in the first row group, but does in the next
+        rows = [(None, None), (None, None), (1.5, {'a': 1})]
+        columns = ['camera_kijkrichting', 'extra_data']
+        schema = export.get_arrow_schema(Passage, columns)
+        chunks = list(
+            export.write_parquet(columns, iter(rows), schema, row_group_size=2)
+        )
+        table = pq.read_table(pa.BufferReader(b''.join(chunks)))
+
+        assert table.schema == schema
+        assert table.column('camera_kijkrichting').to_pylist() == [None, None, 1.5]
+        assert table.column('extra_data').to_pylist()[-1] == '{"a": 1}'
+
+    def test_arrow_schema(self):
+        pa = pytest.importorskip('pyarrow')
+
+        schema = export.get_arrow_schema(
+            Passage,
+            [
+                'id',
+                'passage_at',
+                'rijrichting',
+                'camera_locatie',
+                'datum_tenaamstelling',
+            ],
+        )
+        assert schema.types == [
+            pa.string(),
+            pa.timestamp('us'),
+            pa.int16(),
+            pa.string(),
+            pa.date32(),
+        ]
+
+        schema = export.get_arrow_schema(
+            PassageCameraHourRollup, ['bucket', 'sum'], sum='count'
+        )
+        assert schema.names == ['bucket', 'sum']
+        assert schema.types == [pa.timestamp('us'), pa.int32()]
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            export.export(['id'], iter([]), 'xlsx')
+
+
+@pytest.mark.django_db
+class TestCopyCSV:
+    def test_copy_csv(self, monkeypatch):
+        monkeypatch.setattr(export, 'CHUNK_SIZE', 1000)
+        chunks = list(
+            export.copy_csv(
+                "SELECT n, %s AS name FROM generate_series(1, %s) n", ['a', 1000]
+            )
+        )
+
+        assert all(isinstance(chunk, bytes) for chunk in chunks)
+        assert len(chunks) > 1
+        content = list(csv.reader(b''.join(chunks).decode().splitlines()))
+        assert content[0] == ['n', 'name']
+        assert content[1:] == [[str(n), 'a'] for n in range(1, 1001)]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_copy_csv_stop(self, monkeypatch):
+        monkeypatch.setattr(export, 'CHUNK_SIZE', 1000)
+        chunks = export.copy_csv("SELECT generate_series(1, 100000) n")
+        assert next(chunks)
+        # stop reading, like a client which disconnects
+        chunks.close()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            assert cursor.fetchone() == (1,)
+
+    def test_copy_csv_error(self):
+        with pytest.raises(Exception):
+            list(export.copy_csv("SELECT 1 / 0"))
+
+
+@pytest.mark.django_db
+class TestExportPassages:
+    def test_export_passages(self, tmp_path):
+        day = datetime(2021, 3, 1)
+        make_partitions([day, day + timedelta(days=1)])
+        PassageFactory.create_batch(size=3, passage_at=day, camera_id='1')
+        PassageFactory.create(passage_at=day, camera_id='2')
+        PassageFactory.create(passage_at=day + timedelta(days=1), camera_id='1')
+
+        call_command(
+            'export_passages',
+            from_date='2021-03-01',
+            to_date='2021-03-03',
+            camera_id=['1'],
+            fields=['passage_at', 'camera_id'],
+            output=str(tmp_path),
+        )
+
+        with open(tmp_path / 'passage_passage_20210301.csv', newline='') as f:
+            content = list(csv.reader(f))
+        assert content[0] == ['passage_at', 'camera_id']
+        assert len(content) == 4
+        assert {row[1] for row in content[1:]} == {'1'}
+
+        with open(tmp_path / 'passage_passage_20210302.csv', newline='') as f:
+            assert len(list(csv.reader(f))) == 2
+
+    def test_export_passages_unknown_field(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command(
+                'export_passages',
+                from_date='2021-03-01',
+                fields=['kenteken'],
+                output=str(tmp_path),
+            )
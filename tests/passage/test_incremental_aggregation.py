@@ -0,0 +1,86 @@
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+import pytest
+import time_machine
+from django.core.management import call_command
+from django.utils import timezone
+
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import (
+    AggregationWatermark,
+    PassageCameraHourRollup,
+    PassageHourAggregation,
+)
+from .factories import PassageFactory
+
+
+@pytest.mark.django_db
+class TestIncrementalAggregation:
+    def aggregate(self):
+        call_command('passage_hour_aggregation', incremental=True)
+
+    def test_incremental(self):
+        now = (timezone.now() + timedelta(days=1)).replace(
+            hour=12, minute=30, second=0, microsecond=0
+        )
+        yesterday = now - timedelta(days=1)
+        other_hour = yesterday - timedelta(hours=2)
+        today = now - timedelta(hours=1)
+        make_partitions([yesterday, today])
+
+        with time_machine.travel(now, tick=False):
+            PassageFactory.create_batch(size=3, passage_at=yesterday)
+            PassageFactory.create_batch(size=2, passage_at=other_hour)
+            PassageFactory.create(passage_at=today)
+
+        # no watermark yet: the default (yesterday) is aggregated, and the
+        # hours of today
+        with time_machine.travel(now + timedelta(minutes=10), tick=False):
+            self.aggregate()
+
+        watermark = AggregationWatermark.objects.get(name='passage_hour_aggregation')
+        assert watermark.watermark == now + timedelta(minutes=5)
+        other = PassageHourAggregation.objects.get(hour=other_hour.hour)
+        assert other.count == 2
+        assert PassageHourAggregation.objects.get(hour=yesterday.hour).count == 3
+        assert PassageHourAggregation.objects.get(hour=today.hour).count == 1
+
+        # a late arrival for yesterday
+        with time_machine.travel(now + timedelta(minutes=20), tick=False):
+            PassageFactory.create(passage_at=yesterday)
+
+        with time_machine.travel(now + timedelta(minutes=30), tick=False):
+            self.aggregate()
+
+        assert PassageHourAggregation.objects.get(hour=yesterday.hour).count == 4
+        # the other hour did not change, so it is not recalculated
+        assert PassageHourAggregation.objects.get(hour=other_hour.hour).id == other.id
+        # the camera hour rollup (of the export) follows the aggregation
+        hour = PassageHourAggregation.objects.get(hour=yesterday.hour)
+        bucket = datetime.combine(hour.date, time(hour.hour), tzinfo=dt_timezone.utc)
+        assert PassageCameraHourRollup.objects.count() == 3
+        assert PassageCameraHourRollup.objects.get(bucket=bucket).count == 4
+
+        # nothing changed
+        with time_machine.travel(now + timedelta(minutes=40), tick=False):
+            self.aggregate()
+
+        assert PassageHourAggregation.objects.count() == 3
+        assert PassageHourAggregation.objects.get(hour=yesterday.hour).count == 4
+
+    @time_machine.travel(datetime.today() + timedelta(days=1), tick=False)
+    def test_outside_lookback(self):
+        AggregationWatermark.objects.create(
+            name='passage_hour_aggregation',
+            watermark=timezone.now() - timedelta(days=1),
+        )
+        ten_days_ago = timezone.now() - timedelta(days=10)
+        make_partitions([ten_days_ago])
+        PassageFactory.create(passage_at=ten_days_ago)
+
+        with time_machine.travel(timezone.now() + timedelta(minutes=10)):
+            call_command(
+                'passage_hour_aggregation', incremental=True, lookback_days=7
+            )
+        assert PassageHourAggregation.objects.count() == 0
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+import pytest
+import time_machine
+from django.core.management import call_command
+from django.utils import timezone
+
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import PassageMinuteCount
+from .factories import PassageFactory
+
+
+def get_counts():
+    return {
+        (count.camera_naam, count.passage_at_minute): count.count
+        for count in PassageMinuteCount.objects.all()
+    }
+
+
+@pytest.mark.django_db
+class TestMinuteCounts:
+    def test_minute_counts(self, settings):
+        settings.PASSAGE_MINUTE_COUNTS_OVERLAP_SECONDS = 5 * 60
+        now = (timezone.now() + timedelta(days=1)).replace(
+            hour=12, minute=30, second=0, microsecond=0
+        )
+        minute = now - timedelta(minutes=20)
+        make_partitions([now])
+
+        with time_machine.travel(now, tick=False):
+            PassageFactory.create_batch(
+                size=3, passage_at=minute + timedelta(seconds=10), camera_naam='a'
+            )
+            PassageFactory.create(passage_at=minute, camera_naam='b')
+            PassageFactory.create(passage_at=minute, camera_naam=None)
+
+        with time_machine.travel(now + timedelta(minutes=10), tick=False):
+            call_command('passage_minute_counts')
+
+        assert get_counts() == {('a', minute): 3, ('b', minute): 1, ('', minute): 1}
+
+        # new passages are counted by the next update
+        with time_machine.travel(now + timedelta(minutes=20), tick=False):
+            PassageFactory.create(passage_at=minute, camera_naam='a')
+            PassageFactory.create(passage_at=now, camera_naam='a')
+
+        with time_machine.travel(now + timedelta(minutes=20, seconds=5), tick=False):
+            call_command('passage_minute_counts')
+        assert get_counts()[('a', minute)] == 4
+
+        # a passage which was committed after the update, but created before
+        with time_machine.travel(now + timedelta(minutes=20, seconds=1), tick=False):
+            PassageFactory.create(passage_at=now, camera_naam='a')
+
+        with time_machine.travel(now + timedelta(minutes=30), tick=False):
+            call_command('passage_minute_counts')
+            # nothing changed, recounting does not change the counts
+            call_command('passage_minute_counts')
+
+        assert get_counts() == {
+            ('a', minute): 4,
+            ('a', now): 2,
+            ('b', minute): 1,
+            ('', minute): 1,
+        }
@@ -0,0 +1,70 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+
+from passage.models import Passage
+from passage.partitions import (
+    create_partition,
+    get_partition_days,
+    get_partitions,
+    is_missing_partition_error,
+    manage_partitions,
+    partition_name,
+)
+from .factories import PassageFactory
+
+
+@pytest.mark.django_db
+class TestPartitions:
+    def test_create_partition(self):
+        day = date(2001, 1, 1)
+        assert create_partition(day) is True
+        assert create_partition(day) is False
+        assert partition_name(day) in get_partitions()
+        assert day in get_partition_days()
+
+    def test_is_missing_partition_error(self):
+        passage_at = datetime(2001, 2, 1, 12, tzinfo=timezone.utc)
+        with pytest.raises(IntegrityError) as missing, transaction.atomic():
+            PassageFactory.create(passage_at=passage_at)
+        assert is_missing_partition_error(missing.value)
+
+        # the violation of a CHECK constraint is not
+        create_partition(passage_at.date())
+        with pytest.raises(IntegrityError) as check, transaction.atomic():
+            PassageFactory.create(passage_at=passage_at, volgnummer=-1)
+        assert not is_missing_partition_error(check.value)
+
+    def test_manage_partitions(self):
+        today = date(2001, 3, 10)
+        for i in range(1, 4):
+            create_partition(today - timedelta(days=i))
+        PassageFactory.create(
+            passage_at=datetime(2001, 3, 7, 12, tzinfo=timezone.utc)
+        )
+
+        created, detached = manage_partitions(today, horizon_days=2, retention_days=2)
+
+        assert created[:3] == [
+            'passage_passage_20010310',
+            'passage_passage_20010311',
+            'passage_passage_20010312',
+        ]
+        assert detached == ['passage_passage_20010307']
+        days = get_partition_days()
+        assert date(2001, 3, 7) not in days
+        assert date(2001, 3, 8) in days
+        # the detached partition is dropped, with its passages
+        assert partition_name(date(2001, 3, 7)) not in get_partitions()
+        assert Passage.objects.count() == 0
+
+    def test_command(self, capsys):
+        call_command('manage_partitions', days=1)
+        output = capsys.readouterr().out
+
+        today = date.today()
+        assert partition_name(today + timedelta(days=1)) in get_partitions()
+        assert 'daily partitions' in output
+        assert f'{partition_name(today)}: ' in output
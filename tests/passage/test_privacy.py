@@ -0,0 +1,87 @@
+from datetime import date, datetime
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import Passage
+from passage.partitions import get_partitions, partition_name
+from passage.privacy import is_scrubbed, rewrite_partition
+from .factories import PassageFactory
+
+
+def get_indexes(name):
+    """
+    :return: Dict with per index of the given partition whether it is attached
+        to an index of the parent table.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT i.relname, EXISTS (
+                SELECT 1 FROM pg_inherits WHERE inhrelid = x.indexrelid
+            )
+            FROM pg_index AS x
+            JOIN pg_class AS i ON i.oid = x.indexrelid
+            WHERE x.indrelid = %s::regclass
+            """,
+            [name],
+        )
+        return dict(cursor.fetchall())
+
+
+@pytest.mark.django_db
+class TestPrivacyRewrite:
+    def test_rewrite_partition(self):
+        day = datetime(2021, 3, 1)
+        name = partition_name(day)
+        make_partitions([day])
+        light = PassageFactory.create(
+            passage_at=day,
+            datum_eerste_toelating=date(2015, 6, 12),
+            datum_tenaamstelling=date(2019, 2, 3),
+            toegestane_maximum_massa_voertuig=2000,
+            europese_voertuigcategorie_toevoeging='a',
+            merk='Opel',
+            voertuig_soort='personenauto',
+            inrichting='stationwagen',
+        )
+        heavy = PassageFactory.create(
+            passage_at=day,
+            toegestane_maximum_massa_voertuig=12000,
+            europese_voertuigcategorie_toevoeging='b',
+            merk='DAF',
+            voertuig_soort='Bedrijfsauto',
+            inrichting='gesloten opbouw',
+        )
+        assert not is_scrubbed(name)
+        indexes = get_indexes(name)
+
+        call_command('passage_privacy', rewrite=True)
+
+        assert name in get_partitions()
+        assert is_scrubbed(name)
+        # the indexes are built on the copy and attached to those of the parent
+        assert get_indexes(name) == indexes
+        assert indexes and all(indexes.values())
+        light = Passage.objects.get(id=light.id)
+        assert light.datum_eerste_toelating == date(2015, 1, 1)
+        assert light.datum_tenaamstelling is None
+        assert light.toegestane_maximum_massa_voertuig == 1500
+        assert light.europese_voertuigcategorie_toevoeging is None
+        assert light.merk is None
+        assert light.inrichting == 'Personenauto'
+
+        heavy = Passage.objects.get(id=heavy.id)
+        assert heavy.toegestane_maximum_massa_voertuig == 12000
+        assert heavy.europese_voertuigcategorie_toevoeging == 'b'
+        assert heavy.merk == 'DAF'
+        assert heavy.inrichting == 'gesloten opbouw'
+
+        # the partition is scrubbed, so it is skipped
+        assert rewrite_partition(day) is None
+
+        # and passages can still be written to it
+        PassageFactory.create(passage_at=day)
+        assert Passage.objects.filter(passage_at__date=day.date()).count() == 3
@@ -5,7 +5,9 @@ import time_machine
 from django.core.management import call_command
 from django.utils import timezone
 
+from passage.aggregations import refresh_camera_gebieden
 from passage.models import HulptabelCameragebiedenTaxidashboard, TaxiHourAggregation, Camera, Passage
+from passage.models import TaxiCameraGebied
 from .factories import PassageFactory, HulptabelCameragebiedenTaxidashboardFactory
 import factory
 
@@ -91,3 +93,43 @@ class TestTaxiHourAggregation:
             for attr in helper_fields:
                 assert getattr(result, attr) == getattr(helper_table_row, attr)
 
+
+    @time_machine.travel(datetime.today() + timedelta(days=1), tick=False)
+    def test_camera_gebieden(self):
+        HulptabelCameragebiedenTaxidashboardFactory.create(
+            gebiedstype='type', gebied='centrum', camera_id='CAM-1'
+        )
+        HulptabelCameragebiedenTaxidashboardFactory.create(
+            gebiedstype='type', gebied='oost', camera_id=''
+        )
+        yesterday = timezone.now() - timedelta(days=1)
+        for camera_naam in ['Straat CAM-1 In', 'Straat CAM-2 In']:
+            PassageFactory.create(
+                passage_at=yesterday,
+                camera_naam=camera_naam,
+                taxi_indicator=True,
+                electric=1,
+            )
+
+        call_command('passage_taxi_hour_aggregation', from_date=yesterday.date())
+
+        # the camera names are resolved once, also without gebied
+        mapping = TaxiCameraGebied.objects.values_list('camera_naam', 'gebied')
+        assert sorted(mapping, key=str) == [
+            ('Straat CAM-1 In', 'centrum'),
+            ('Straat CAM-2 In', None),
+        ]
+        result = TaxiHourAggregation.objects.get()
+        assert result.gebied == 'centrum'
+        assert result.unieke_passages == 1
+
+        # a new helper table resolves the known camera names again
+        HulptabelCameragebiedenTaxidashboardFactory.create(
+            gebiedstype='type', gebied='west', camera_id='CAM-2'
+        )
+        assert refresh_camera_gebieden() == 2
+        call_command('passage_taxi_hour_aggregation', from_date=yesterday.date())
+
+        assert sorted(
+            TaxiHourAggregation.objects.values_list('gebied', flat=True)
+        ) == ['centrum', 'west']
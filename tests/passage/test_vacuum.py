@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from django.core.management import call_command
+
+from passage.management.commands.make_partitions import make_partitions
+from passage.models import Passage
+from passage.partitions import partition_name
+from passage.vacuum import (
+    ANALYZE,
+    VACUUM,
+    VACUUM_FULL,
+    get_bloat_ratio,
+    get_partition_stats,
+    plan_maintenance,
+    run_maintenance,
+)
+from .factories import PassageFactory
+
+
+def make_stats(name, live, dead=0, modified=0, analyzed=True, size=0, row_width=None):
+    return dict(
+        name=name,
+        live=live,
+        dead=dead,
+        modified=modified,
+        analyzed=analyzed,
+        size=size,
+        total_size=size,
+        row_width=row_width,
+    )
+
+
+class TestPlanMaintenance:
+    def test_plan(self):
+        stats = [
+            # cold and clean
+            make_stats('clean', live=1000, size=8192 * 20, row_width=100),
+            make_stats('few_dead', live=1000, dead=10),
+            make_stats('dead', live=1000, dead=200),
+            make_stats('more_dead', live=1000, dead=500),
+            make_stats('not_analyzed', live=1000, analyzed=False),
+            make_stats('modified', live=1000, modified=300),
+            make_stats('empty', live=0, analyzed=False),
+        ]
+        assert plan_maintenance(stats, dead_ratio=0.1, analyze_ratio=0.1) == [
+            ('more_dead', VACUUM),
+            ('dead', VACUUM),
+            ('not_analyzed', ANALYZE),
+            ('modified', ANALYZE),
+        ]
+
+    def test_plan_full(self):
+        bloated = make_stats('bloated', live=100, size=8192 * 100, row_width=100)
+        assert get_bloat_ratio(bloated) > 0.9
+        assert plan_maintenance([bloated], 0.1, 0.1) == []
+        assert plan_maintenance([bloated], 0.1, 0.1, full_bloat_ratio=0.5) == [
+            ('bloated', VACUUM_FULL)
+        ]
+
+
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+class TestRunMaintenance:
+    def test_run_maintenance(self):
+        day = datetime(2021, 3, 1)
+        name = partition_name(day)
+        make_partitions([day])
+        PassageFactory.create_batch(size=10, passage_at=day)
+        Passage.objects.all().delete()
+
+        assert name in {stats['name'] for stats in get_partition_stats()}
+
+        report = run_maintenance(
+            [(name, VACUUM_FULL), (name, ANALYZE)], cost_delay_ms=0
+        )
+        assert [result['command'] for result in report] == [VACUUM_FULL, ANALYZE]
+        assert report[0]['size_after'] <= report[0]['size_before']
+        # only the size of a rewrite is reported, plain commands report the
+        # dead rows
+        assert 'size_after' not in report[1]
+        assert {'dead_before', 'dead_after'} <= set(report[1])
+
+        # the time budget is used up before the first partition
+        assert run_maintenance([(name, VACUUM)], max_seconds=0) == []
+
+    def test_command(self):
+        make_partitions([datetime(2021, 3, 1)])
+        call_command('partitioned_vacuum', dry_run=True)
+        call_command('partitioned_vacuum', max_seconds=60)